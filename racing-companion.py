@@ -6,8 +6,13 @@
 
 import customtkinter as ctk
 import tkinter as tk
+import argparse
 import signal
-from rcfunc.data_utils import load_vehicles, load_data, load_maintenance_entries
+import time
+from concurrent.futures import ThreadPoolExecutor
+from rcfunc.data_utils import set_background_writer
+from rcfunc.background_writer import BackgroundWriter
+from rcfunc.data_store import DataStore
 from rctabs.welcome_tab import WelcomePage
 from rctabs.track_sessions_tab import TrackSessionsPage
 from rctabs.maintenance_tab import MaintenancePage
@@ -16,8 +21,17 @@ from rctabs.notebook_tab import NotebookPage
 ctk.set_appearance_mode("light")
 ctk.set_default_color_theme("blue")
 
+# Track days shown right away when (re)loading, the rest is loaded in batches from the main loop
+INITIAL_TRACK_DAY_BATCH = 30
+TRACK_DAY_BATCH_SIZE = 100
+# How often the main loop checks for storage files loaded in the background, in ms
+LOAD_POLL_INTERVAL = 10
+
 class RacingDiaryApp(ctk.CTk):
-    def __init__(self):
+    def __init__(self, show_timings=False):
+        self.show_timings = show_timings
+        self.startup_timings = {}
+        self._startup_time = time.perf_counter()
         super().__init__()
         self.title("Racing Companion")
         self.geometry("1100x850")
@@ -26,12 +40,19 @@ class RacingDiaryApp(ctk.CTk):
         self.app_version = "1.0.0"
         self.footer_template_text = f"dherslof | Racing Companion | version: {self.app_version} | Active Vehicle: None"
 
-        # Load data
-        self.vehicles, self.vehicle_data = load_vehicles()
-        self.track_days = load_data()
-        self.maintenance_entries = load_maintenance_entries()
+        # Storage writes run on a background thread, flushed when the app closes
+        self.background_writer = BackgroundWriter()
+        set_background_writer(self.background_writer)
 
+        # The data store owns everything loaded and hands out live views to the tabs. The three
+        # storage files are loaded on a thread pool while the window and tabs are built
         self.active_vehicle = None
+        self.track_days_loading = True
+        self.track_days_load_progress = 0.0
+        self._track_day_batches_scheduled = False
+        self.load_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="rc-load")
+        self.data_store = DataStore(executor=self.load_executor, progress=self._on_track_day_load_progress)
+
         self.weather_options = ["Sunny", "Cloudy", "Overcast", "Light Rain", "Heavy Rain", "Wet Track", "Mixed Conditions", "drying-up"]
 
         # Tab view
@@ -67,13 +88,128 @@ class RacingDiaryApp(ctk.CTk):
         self.protocol("WM_DELETE_WINDOW", self.on_app_close)
         self.report_callback_exception = self._report_callback_exception
 
+        self._record_startup_timing("window and tabs built")
+        self.update_footer()
+        self.after(1, self._poll_data_loading)
+
+    # Loaded data, owned by the data store
+    @property
+    def vehicles(self):
+        return self.data_store.vehicles
+
+    @vehicles.setter
+    def vehicles(self, vehicles):
+        self.data_store.set_vehicles(vehicles, self.data_store.vehicle_data)
+
+    @property
+    def vehicle_data(self):
+        return self.data_store.vehicle_data
+
+    @vehicle_data.setter
+    def vehicle_data(self, vehicle_data):
+        self.data_store.set_vehicles(self.data_store.vehicles, vehicle_data)
+
+    @property
+    def maintenance_entries(self):
+        return self.data_store.maintenance_entries
+
+    @property
+    def track_days(self):
+        return self.data_store.track_days
+
     # Global methods
     def update_footer(self):
         """Update the footer to display the active vehicle."""
         if self.active_vehicle:
-            self.footer_label.configure(text=f"dherslof | Racing Companion | version: {self.app_version} | Active Vehicle: {self.active_vehicle}")
+            footer_text = f"dherslof | Racing Companion | version: {self.app_version} | Active Vehicle: {self.active_vehicle}"
         else:
-            self.footer_label.configure(text=f"{self.footer_template_text}")
+            footer_text = f"{self.footer_template_text}"
+        if self.track_days_loading:
+            footer_text += f" | Loading track days: {self.track_days_load_progress:.0%}"
+        self._footer_load_progress = self.track_days_load_progress
+        self.footer_label.configure(text=footer_text)
+
+    def _record_startup_timing(self, step):
+        if step not in self.startup_timings:
+            self.startup_timings[step] = time.perf_counter() - self._startup_time
+
+    def print_startup_timings(self):
+        """Print where the start-up time went, the load times overlap with building the window."""
+        print("Start-up timings:")
+        for name, seconds in self.data_store.load_times.items():
+            print(f"  {name + ' loaded (background)':<36}{seconds * 1000:8.1f} ms")
+        for step, seconds in self.startup_timings.items():
+            print(f"  {step + ' after':<36}{seconds * 1000:8.1f} ms")
+
+    def _poll_data_loading(self):
+        """Hand the storage files loaded in the background over to the tabs."""
+        if self.is_closing:
+            return
+        for name in self.data_store.collect_loaded():
+            if name == "vehicles":
+                self.welcome_page.on_vehicles_loaded()
+                self.maintenance_page.on_vehicles_loaded()
+            elif name == "maintenance_entries":
+                self.maintenance_page.on_entries_loaded()
+            elif name == "track_days":
+                # The shards are parsed, streaming them into the list doesn't touch the disk
+                self.load_track_days()
+        if self.track_days_loading and self.track_days_load_progress != self._footer_load_progress:
+            self.update_footer()
+        if self.data_store.loading:
+            self.after(LOAD_POLL_INTERVAL, self._poll_data_loading)
+        else:
+            self.load_executor.shutdown(wait=False)
+
+    def _on_track_days_loaded(self):
+        self.sessions_page.on_track_days_loaded()
+        if "track days shown" not in self.startup_timings:
+            self._record_startup_timing("track days shown")
+            if self.show_timings:
+                self.print_startup_timings()
+
+    def load_track_days(self):
+        """(Re)load the track days of the active vehicle, or of all vehicles when none is active."""
+        self.track_days_loading = True
+        self.track_days_load_progress = 0.0
+        self._track_day_stream = self.data_store.iter_load_track_days(self.active_vehicle, progress=self._on_track_day_load_progress)
+        self._load_track_day_batch(INITIAL_TRACK_DAY_BATCH)
+
+        self.update_footer()
+        if not self.track_days_loading:
+            self._on_track_days_loaded()
+            return
+        # The first screen, the cards are shown again with the complete history
+        self.sessions_page.display_track_days()
+        self._record_startup_timing("first track days shown")
+        if not self._track_day_batches_scheduled:
+            self._track_day_batches_scheduled = True
+            self.after(1, self._continue_track_day_loading)
+
+    def _on_track_day_load_progress(self, loaded, total):
+        self.track_days_load_progress = loaded / total if total else 1.0
+
+    def _load_track_day_batch(self, batch_size):
+        """Load up to batch_size track days from the stream. Returns False when all are loaded."""
+        for _ in range(batch_size):
+            try:
+                next(self._track_day_stream)
+            except StopIteration:
+                self.track_days_loading = False
+                return False
+        return True
+
+    def _continue_track_day_loading(self):
+        """Load the next batch of track days and reschedule until the history is complete."""
+        if self.is_closing:
+            return
+        if self._load_track_day_batch(TRACK_DAY_BATCH_SIZE):
+            self.update_footer()
+            self.after(1, self._continue_track_day_loading)
+        else:
+            self._track_day_batches_scheduled = False
+            self.update_footer()
+            self._on_track_days_loaded()
 
     def on_app_close(self):
         """Perform deterministic app shutdown to avoid callback races on destroy."""
@@ -126,6 +262,11 @@ class RacingDiaryApp(ctk.CTk):
         except Exception:
             pass
 
+        # Make sure every queued save has reached the disk before exiting.
+        self.load_executor.shutdown(wait=True)
+        self.background_writer.close()
+        set_background_writer(None)
+
         self.destroy()
 
     def _report_callback_exception(self, exc, val, tb):
@@ -137,6 +278,10 @@ class RacingDiaryApp(ctk.CTk):
         super().report_callback_exception(exc, val, tb)
 
 if __name__ == "__main__":
-    app = RacingDiaryApp()
+    parser = argparse.ArgumentParser(description="Racing Companion")
+    parser.add_argument("--timings", action="store_true", help="print a breakdown of the start-up time")
+    args = parser.parse_args()
+
+    app = RacingDiaryApp(show_timings=args.timings)
     signal.signal(signal.SIGINT, lambda *_: app.on_app_close())
     app.mainloop()
\ No newline at end of file
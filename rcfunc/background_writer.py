@@ -0,0 +1,181 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Write-behind queue running storage writes on a worker thread.
+# License: TBD
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class _PendingWrite:
+   __slots__ = ("write", "appends", "queued_at")
+
+   def __init__(self, write=None):
+      self.write = write
+      self.appends = []
+      self.queued_at = time.monotonic()
+
+class BackgroundWriter:
+   """Coalescing write-behind queue.
+
+   Writes are keyed on the storage file they target. A full write replaces whatever is
+   still pending for the same key, so a burst of mutations ends up as a single write of
+   the latest data. Appends (journal records) are kept in order, unless a full write of
+   the key is pending or running, in which case they are folded into a new full write.
+
+   Writes run on the worker thread while the calling thread goes on changing the data, so
+   a write must only use data copied or serialized when it was submitted.
+   """
+
+   def __init__(self, coalesce_delay=0.05):
+      self.coalesce_delay = coalesce_delay
+      self._cond = threading.Condition()
+      self._pending = OrderedDict()
+      self._running_key = None
+      self._running_full_write = False
+      self._flushing = 0
+      self._closed = False
+      self._stats = {
+         "submitted": 0,
+         "coalesced": 0,
+         "writes": 0,
+         "failures": 0,
+         "queue_depth": 0,
+         "max_queue_depth": 0,
+         "last_latency": 0.0,
+         "max_latency": 0.0,
+      }
+      self._thread = threading.Thread(target=self._run, name="rc-background-writer", daemon=True)
+      self._thread.start()
+
+   def submit(self, key, write):
+      """Queue a full write for key, replacing any write still pending for it."""
+      with self._cond:
+         self._check_open()
+         self._stats["submitted"] += 1
+         pending = self._pending.get(key)
+         if pending:
+            self._stats["coalesced"] += 1
+            pending.write = write
+            pending.appends = []
+         else:
+            self._pending[key] = _PendingWrite(write)
+         self._update_queue_depth()
+         self._cond.notify_all()
+
+   def submit_append(self, key, append, full_write):
+      """Queue an incremental append for key.
+
+      When the append has to be folded into a full write, full_write() is called right away,
+      on the calling thread, to take a snapshot of the data and returns the write to queue.
+      """
+      with self._cond:
+         self._check_open()
+         self._stats["submitted"] += 1
+         pending = self._pending.get(key)
+         if pending and pending.write:
+            # The pending full write will contain the appended data
+            self._stats["coalesced"] += 1
+            pending.write = full_write()
+         elif key == self._running_key and self._running_full_write:
+            # The running full write was snapshotted before this append
+            self._pending[key] = _PendingWrite(full_write())
+         elif pending:
+            pending.appends.append(append)
+         else:
+            pending = _PendingWrite()
+            pending.appends.append(append)
+            self._pending[key] = pending
+         self._update_queue_depth()
+         self._cond.notify_all()
+
+   def flush(self, timeout=None):
+      """Block until every queued write is done. Returns False on timeout."""
+      deadline = None if timeout is None else time.monotonic() + timeout
+      with self._cond:
+         self._flushing += 1
+         self._cond.notify_all()
+         try:
+            while self._pending or self._running_key is not None:
+               remaining = None if deadline is None else deadline - time.monotonic()
+               if remaining is not None and remaining <= 0:
+                  return False
+               self._cond.wait(remaining)
+            return True
+         finally:
+            self._flushing -= 1
+
+   def close(self, timeout=None):
+      """Flush outstanding writes and stop the worker thread."""
+      flushed = self.flush(timeout)
+      with self._cond:
+         self._closed = True
+         self._cond.notify_all()
+      self._thread.join(timeout)
+      return flushed
+
+   def get_stats(self):
+      """Get a copy of the write counters, latencies are in seconds from first queue to done."""
+      with self._cond:
+         return dict(self._stats)
+
+   def _check_open(self):
+      if self._closed:
+         raise RuntimeError("Background writer is closed")
+
+   def _update_queue_depth(self):
+      depth = len(self._pending)
+      self._stats["queue_depth"] = depth
+      self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], depth)
+
+   def _next_pending(self):
+      """Wait for the oldest pending write to pass the coalesce delay and take it."""
+      while True:
+         if not self._pending:
+            if self._closed:
+               return None, None
+            self._cond.wait()
+            continue
+         key, pending = next(iter(self._pending.items()))
+         remaining = pending.queued_at + self.coalesce_delay - time.monotonic()
+         if remaining > 0 and not self._flushing and not self._closed:
+            self._cond.wait(remaining)
+            continue
+         del self._pending[key]
+         self._update_queue_depth()
+         return key, pending
+
+   def _run(self):
+      while True:
+         with self._cond:
+            key, pending = self._next_pending()
+            if key is None:
+               return
+            self._running_key = key
+            self._running_full_write = pending.write is not None
+
+         failed = False
+         try:
+            if pending.write:
+               pending.write()
+            else:
+               for append in pending.appends:
+                  append()
+         except Exception as e:
+            # Todo: Write a proper error log, displayed in the GUI somewhere.
+            failed = True
+            print(f"Error in background write of {key}: {e}")
+
+         with self._cond:
+            latency = time.monotonic() - pending.queued_at
+            if failed:
+               self._stats["failures"] += 1
+            else:
+               self._stats["writes"] += 1
+               self._stats["last_latency"] = latency
+               self._stats["max_latency"] = max(self._stats["max_latency"], latency)
+            self._running_key = None
+            self._running_full_write = False
+            self._update_queue_depth()
+            self._cond.notify_all()
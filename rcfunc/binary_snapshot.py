@@ -0,0 +1,75 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Binary (marshal) copies of the JSON storage files for fast loading.
+# License: TBD
+
+import json
+import marshal
+import os
+import struct
+import sys
+import tempfile
+
+# Set RC_BINARY_SNAPSHOTS=0 to only read and write the JSON files
+ENABLED = os.environ.get("RC_BINARY_SNAPSHOTS", "1") != "0"
+
+BINARY_SUFFIX = ".bin"
+MAGIC = "rc-binary-snapshot"
+# marshal data is only guaranteed to load in the Python version that wrote it
+FORMAT = (MAGIC, marshal.version, sys.version_info[:2])
+# The file starts with the length of the marshalled header, followed by header and data
+HEADER_LENGTH = struct.Struct("<I")
+
+def binary_file_for(filename):
+   return filename + BINARY_SUFFIX
+
+def _source_identity(filename):
+   stat = os.stat(filename)
+   return stat.st_size, stat.st_mtime_ns
+
+def write_binary(data, filename):
+   """Write the binary copy of a JSON file that was just written with data."""
+   if not ENABLED:
+      return
+   binary_file = binary_file_for(filename)
+   fd, tmp_filename = tempfile.mkstemp(dir=os.path.dirname(filename), prefix=os.path.basename(binary_file), suffix=".tmp")
+   try:
+      # The header ties the copy to the JSON file it was written with
+      header = marshal.dumps((FORMAT, _source_identity(filename)))
+      with os.fdopen(fd, "wb") as file:
+         file.write(HEADER_LENGTH.pack(len(header)))
+         file.write(header)
+         file.write(marshal.dumps(data))
+      os.replace(tmp_filename, binary_file)
+   except BaseException:
+      os.remove(tmp_filename)
+      raise
+
+def load_binary(filename):
+   """Get the content of a JSON file from its binary copy, or None if there is no up to date copy."""
+   if not ENABLED:
+      return None
+   try:
+      with open(binary_file_for(filename), "rb") as file:
+         (header_length,) = HEADER_LENGTH.unpack(file.read(HEADER_LENGTH.size))
+         if marshal.loads(file.read(header_length)) != (FORMAT, _source_identity(filename)):
+            return None
+         # Loading from bytes is a lot faster than marshal.load() on the file
+         return marshal.loads(file.read())
+   except (OSError, EOFError, ValueError, TypeError, struct.error):
+      return None
+
+def load_json(filename):
+   """Load a JSON file, from its binary copy when that is up to date."""
+   data = load_binary(filename)
+   if data is not None:
+      return data
+   with open(filename, "r") as file:
+      data = json.load(file)
+   try:
+      # Edited by hand or written with snapshots disabled, refresh the copy for the next start
+      write_binary(data, filename)
+   except (OSError, ValueError) as e:
+      # Todo: Write a proper error log, displayed in the GUI somewhere.
+      print(f"Error writing binary snapshot of {filename}: {e}")
+   return data
@@ -0,0 +1,170 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Batch CSV export of track days on a background worker pool.
+# License: TBD
+
+import csv
+import io
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from rcfunc.track_day_index import peek_sessions
+from rcfunc.track_session_mngr import CSV_FIELDNAMES, track_day_csv_rows, write_track_day_csv
+
+MAX_WORKERS = 4
+
+def export_file_name(track_day):
+   """Get the file name of a track day export, the one the export dialog suggests."""
+   name = f"{track_day.track or 'track_day'}_{track_day.date or 'unknown_date'}"
+   return re.sub(r'[\\/:*?"<>|]', "_", name) + ".csv"
+
+def _track_day_csv(track_day):
+   """Get the CSV export rows of a track day as text, without header."""
+   buffer = io.StringIO()
+   csv.DictWriter(buffer, fieldnames=CSV_FIELDNAMES).writerows(track_day_csv_rows(track_day, peek_sessions(track_day)))
+   return buffer.getvalue()
+
+def _export_track_day(track_day, file_path):
+   """Write a track day to its own file like TrackSessionMngr.export_track_day_to_csv()."""
+   try:
+      write_track_day_csv(track_day, file_path, peek_sessions(track_day))
+      return True
+   except Exception as e:
+      # Todo: Write a proper error log, displayed in the GUI somewhere.
+      print(f"Error exporting track day to CSV: {e}")
+      return False
+
+class BatchExport:
+   """CSV export of several track days, run on a worker pool in the background.
+
+   Every track day is written to its own file in the target directory, named by
+   export_file_name() with a number added for track days of the same track and date. With
+   combined, all track days are streamed into the single target file, with one header.
+
+   The track days are looked up when the export is created, on the thread owning them. The
+   workers only read them, sessions that aren't loaded are read with peek_sessions().
+
+   The GUI polls done, total and finished. cancel() stops the export once the track days
+   being written are done: files of finished track days are kept, a combined file is removed.
+   """
+
+   def __init__(self, track_session_mngr, track_day_ids, target, combined=False, max_workers=MAX_WORKERS):
+      self.track_session_mngr = track_session_mngr
+      self.track_day_ids = list(track_day_ids)
+      self._track_days = [(track_day_id, track_session_mngr.get_track_day(track_day_id)) for track_day_id in self.track_day_ids]
+      self.target = target
+      self.combined = combined
+      self.max_workers = max_workers
+      self.total = len(self.track_day_ids)
+      self.done = 0
+      # Written files and the ids of track days that couldn't be exported
+      self.files = []
+      self.failed = []
+      self.error = None
+      self._cancel = threading.Event()
+      self._finished = threading.Event()
+      self._thread = None
+
+   def start(self):
+      self._thread = threading.Thread(target=self._run, name="rc-csv-export", daemon=True)
+      self._thread.start()
+      return self
+
+   def cancel(self):
+      self._cancel.set()
+
+   @property
+   def cancelled(self):
+      return self._cancel.is_set()
+
+   @property
+   def finished(self):
+      return self._finished.is_set()
+
+   def wait(self, timeout=None):
+      """Wait for the export to finish, returns False on timeout."""
+      return self._finished.wait(timeout)
+
+   def _run(self):
+      try:
+         with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="rc-csv-export-worker") as executor:
+            if self.combined:
+               self._export_combined(executor)
+            else:
+               self._export_files(executor)
+      except Exception as e:
+         # Todo: Write a proper error log, displayed in the GUI somewhere.
+         print(f"Error exporting track days to CSV: {e}")
+         self.error = e
+      finally:
+         self._finished.set()
+
+   def _map(self, executor, function, items):
+      """Yield (item, function(item)) in the order of items, with at most two tasks per worker queued."""
+      pending = deque()
+
+      def next_result():
+         item, future = pending.popleft()
+         if self._cancel.is_set():
+            future.cancel()
+         if not future.cancelled():
+            return item, future.result()
+         return None
+
+      for item in items:
+         if self._cancel.is_set():
+            break
+         pending.append((item, executor.submit(function, item)))
+         if len(pending) >= self.max_workers * 2:
+            result = next_result()
+            if result:
+               yield result
+      while pending:
+         result = next_result()
+         if result:
+            yield result
+
+   def _export_files(self, executor):
+      os.makedirs(self.target, exist_ok=True)
+      jobs = []
+      names = set()
+      for track_day_id, track_day in self._track_days:
+         name = export_file_name(track_day) if track_day else f"{track_day_id}.csv"
+         base, extension = os.path.splitext(name)
+         number = 2
+         while name in names:
+            name = f"{base}_{number}{extension}"
+            number += 1
+         names.add(name)
+         jobs.append((track_day_id, track_day, os.path.join(self.target, name)))
+
+      def export(job):
+         _, track_day, path = job
+         return _export_track_day(track_day, path) if track_day else False
+      for (track_day_id, _, path), success in self._map(executor, export, jobs):
+         if success:
+            self.files.append(path)
+         else:
+            self.failed.append(track_day_id)
+         self.done += 1
+
+   def _export_combined(self, executor):
+      def render(job):
+         _, track_day = job
+         return _track_day_csv(track_day) if track_day else None
+
+      with open(self.target, mode="w", newline="", encoding="utf-8") as csvfile:
+         csv.DictWriter(csvfile, fieldnames=CSV_FIELDNAMES).writeheader()
+         for (track_day_id, _), text in self._map(executor, render, self._track_days):
+            if text is None:
+               self.failed.append(track_day_id)
+            else:
+               csvfile.write(text)
+            self.done += 1
+      if self.done < self.total:
+         os.remove(self.target)
+      else:
+         self.files.append(self.target)
@@ -0,0 +1,250 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Streaming import of track day sessions from CSV files, like the track day exports and lap timer files.
+# License: TBD
+
+import csv
+import itertools
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List
+
+from rcfunc.track_day_models import Session, TrackDay, parse_lap_time
+
+TRACK_DAY_COLUMNS = ("track", "date", "organizer", "vehicle")
+SESSION_COLUMNS = ("session_number", "laps", "weather", "tire_type", "tire_status", "best_lap_time", "comments")
+
+# Column names of lap timer files by the field they hold, compared in lower case without
+# spaces, dashes and underscores. The field names of the track day export match as well.
+COLUMN_ALIASES = {
+   "track": ("circuit", "venue", "trackname"),
+   "date": ("day", "sessiondate", "eventdate"),
+   "organizer": ("organiser", "event", "club"),
+   "vehicle": ("car", "bike", "kart", "vehiclename"),
+   "session_number": ("session", "sessionno", "sessionnr", "session#", "run", "heat"),
+   "laps": ("lapcount", "totallaps", "numberoflaps"),
+   "weather": ("conditions",),
+   "tire_type": ("tyre", "tyres", "tire", "tires", "tyretype", "compound"),
+   "tire_status": ("tyrestatus", "tirecondition", "tyrecondition"),
+   "best_lap_time": ("best", "bestlap", "fastestlap", "bestlaptime", "fastestlaptime"),
+   "comments": ("comment", "notes", "note"),
+   # One row per lap instead of per session, the laps of a session are counted
+   "lap_time": ("laptime", "time"),
+}
+
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%d/%m/%Y", "%d.%m.%Y", "%d-%m-%Y")
+
+# Sessions added per save
+BATCH_SIZE = 1000
+
+@dataclass
+class RejectedRow:
+   """A row that was not imported, line is the line number in the file"""
+   line: int
+   reason: str
+
+@dataclass
+class ImportResult:
+   """Outcome of a CSV import"""
+   track_days_created: int = 0
+   sessions_added: int = 0
+   rejected: List[RejectedRow] = field(default_factory=list)
+
+def _normalize(name):
+   return "".join(char for char in name.strip().lower() if char not in " _-")
+
+_COLUMNS = {_normalize(name): name for name in TRACK_DAY_COLUMNS + SESSION_COLUMNS}
+_COLUMNS.update({alias: name for name, aliases in COLUMN_ALIASES.items() for alias in aliases})
+
+def map_columns(header):
+   """Get the field of every column of a header, None for columns that aren't imported."""
+   fields = [_COLUMNS.get(_normalize(name)) for name in header]
+   # The first column of a field wins, a second one like 'Time of day' isn't mixed in
+   return [name if name not in fields[:position] else None for position, name in enumerate(fields)]
+
+def _sniff_delimiter(line):
+   return max(",;\t", key=line.count)
+
+def iso_date(text):
+   """Get a date in one of DATE_FORMATS as YYYY-MM-DD, None if it isn't one. A time after the date is ignored."""
+   text = text.strip().replace("T", " ").split(" ")[0]
+   for date_format in DATE_FORMATS:
+      try:
+         return datetime.strptime(text, date_format).date().isoformat()
+      except ValueError:
+         continue
+   return None
+
+def parse_rows(lines, defaults=None):
+   """Parse stage: yield (line number, row) for every data row of CSV lines.
+
+   Rows are dicts of the track day and session fields (plus lap_time for files with a
+   row per lap), with the values of defaults for fields missing or empty in the file.
+   """
+   lines = iter(lines)
+   header_line = next(lines, None)
+   if header_line is None:
+      return
+   reader = csv.reader(itertools.chain([header_line], lines), delimiter=_sniff_delimiter(header_line))
+   fields = map_columns(next(reader))
+   defaults = defaults or {}
+   for values in reader:
+      if not any(value.strip() for value in values):
+         continue
+      row = dict(defaults)
+      for name, value in zip(fields, values):
+         if name and value.strip():
+            row[name] = value.strip()
+      if "lap_time" in fields:
+         row.setdefault("lap_time", "")
+      yield reader.line_num, row
+
+def _is_track_day_row(row):
+   """Check for a row of a track day without sessions, like the export writes."""
+   return not row.get("session_number") and not row.get("laps") and "lap_time" not in row
+
+def validate_rows(rows, rejected, validate_session, vehicles, active_vehicle=None):
+   """Validate stage: pass on valid rows with the date in ISO format, add the others to rejected.
+
+   validate_session is TrackSessionMngr.validate_session_data, which a session must pass to be added.
+   With an active_vehicle, rows of other vehicles are rejected: only the track days of the active
+   vehicle are loaded, the rows couldn't be matched to the existing track days of another.
+   """
+   for line, row in rows:
+      if "lap_time" in row:
+         # A lap of a session, counted as a session of one lap until the laps are added up
+         row["laps"] = "1"
+         row["best_lap_time"] = row["lap_time"]
+      reason = None
+      date = iso_date(row.get("date", ""))
+      if not row.get("track"):
+         reason = "Missing track"
+      elif date is None:
+         reason = f"Invalid date: {row.get('date', '')}"
+      elif row.get("vehicle") not in vehicles:
+         reason = f"Unknown vehicle: {row.get('vehicle', '')}"
+      elif active_vehicle and row["vehicle"] != active_vehicle:
+         reason = f"Vehicle {row['vehicle']} is not the active vehicle {active_vehicle}"
+      elif _is_track_day_row(row):
+         pass
+      elif not row.get("laps", "").isdigit():
+         reason = f"Invalid number of laps: {row.get('laps', '')}"
+      elif row.get("best_lap_time") and parse_lap_time(row["best_lap_time"]) is None:
+         reason = f"Invalid lap time: {row['best_lap_time']}"
+      else:
+         valid, message = validate_session(row)
+         if not valid:
+            reason = message
+      if reason:
+         rejected.append(RejectedRow(line, reason))
+         continue
+      row["date"] = date
+      yield line, row
+
+def map_track_days(rows, rejected, track_days):
+   """Map stage: yield (track day, new_day, session) for the valid rows.
+
+   Rows go to the loaded track day with the same track, date and vehicle, or to a new
+   track day (new_day is only True the first time it is yielded, session is None for a
+   track day without sessions). A session number that
+   already exists in the track day is rejected. Consecutive rows of a file with a row per
+   lap are added up into one session.
+   """
+   days = {(day.track, day.date, day.vehicle): day for day in track_days}
+   # Session numbers by track day id, read from the track day on first use
+   numbers = {}
+   # Session of a file with a row per lap, yielded once its last lap is read
+   lap_session = None
+   for line, row in rows:
+      key = (row["track"], row["date"], row["vehicle"], row.get("session_number"))
+      if lap_session and "lap_time" in row and lap_session[3] == key:
+         session = lap_session[2]
+         session.laps = str(int(session.laps) + 1)
+         lap_ms = parse_lap_time(row["lap_time"]) if row["lap_time"] else None
+         if lap_ms is not None and (session.best_lap_ms is None or lap_ms < session.best_lap_ms):
+            session.update({"best_lap_time": row["lap_time"]})
+         continue
+      if lap_session:
+         yield lap_session[:3]
+         lap_session = None
+
+      track_day = days.get(key[:3])
+      new_day = track_day is None
+      if new_day:
+         track_day = days[key[:3]] = TrackDay(
+            track=row["track"], date=row["date"], organizer=row.get("organizer", ""), vehicle=row["vehicle"]
+         )
+      if _is_track_day_row(row):
+         if new_day:
+            yield track_day, new_day, None
+         continue
+      day_numbers = numbers.get(track_day.id)
+      if day_numbers is None:
+         day_numbers = numbers[track_day.id] = {session.session_number for session in track_day.sessions}
+      if row["session_number"] in day_numbers:
+         rejected.append(RejectedRow(line, f"Session {row['session_number']} of {row['track']} {row['date']} already exists"))
+         continue
+      day_numbers.add(row["session_number"])
+
+      session = Session.from_dict({name: row.get(name, "") for name in SESSION_COLUMNS + ("vehicle",)})
+      if "lap_time" in row:
+         lap_session = (track_day, new_day, session, key)
+      else:
+         yield track_day, new_day, session
+   if lap_session:
+      yield lap_session[:3]
+
+def insert_track_days(items, track_session_mngr, result, batch_size=BATCH_SIZE):
+   """Bulk insert stage: add the mapped sessions and track days, with one save per batch_size sessions.
+
+   A batch is validated completely before any of it is added, see TrackSessionMngr.apply_bulk().
+   """
+   # Track days created by this batch and sessions for track days that already exist, by id
+   new_days = {}
+   sessions = {}
+   pending = 0
+
+   def flush():
+      if new_days or sessions:
+         track_session_mngr.apply_bulk(list(new_days.values()), sessions)
+      result.track_days_created += len(new_days)
+      result.sessions_added += pending
+      new_days.clear()
+      sessions.clear()
+
+   for track_day, new_day, session in items:
+      if new_day:
+         new_days[track_day.id] = track_day
+      if session is None:
+         continue
+      if track_day.id in new_days:
+         track_day.sessions.append(session)
+      else:
+         sessions.setdefault(track_day.id, []).append(session)
+      pending += 1
+      if pending >= batch_size:
+         flush()
+         pending = 0
+   flush()
+
+def import_csv(file_path, track_session_mngr, defaults=None, batch_size=BATCH_SIZE):
+   """Import the sessions of a CSV file into the track days of a TrackSessionMngr.
+
+   The file is streamed through the parse, validate, map and bulk insert stages, so only
+   a batch of track days is held besides the imported data. defaults fills in fields the
+   file doesn't have, like the track and date of a lap timer file. When the manager holds
+   the track days of an active vehicle, rows of other vehicles are rejected.
+
+   Returns:
+      ImportResult: Numbers of created track days and added sessions, and the rejected rows.
+   """
+   result = ImportResult()
+   with open(file_path, newline="", encoding="utf-8-sig") as csvfile:
+      rows = parse_rows(csvfile, defaults)
+      rows = validate_rows(
+         rows, result.rejected, track_session_mngr.validate_session_data, track_session_mngr.vehicles,
+         track_session_mngr.active_vehicle
+      )
+      items = map_track_days(rows, result.rejected, track_session_mngr.track_days)
+      insert_track_days(items, track_session_mngr, result, batch_size)
+   return result
@@ -0,0 +1,210 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Shared owner of the data loaded by the Racing Companion application.
+# License: TBD
+
+import time
+from collections.abc import MutableSequence
+
+from rcfunc import data_utils
+from rcfunc.track_day_shards import TrackDayShards
+
+
+class LiveView(MutableSequence):
+   """List view of a DataStore collection, following it when the collection is replaced.
+
+   Changes made through the view increment the version of the store.
+   """
+
+   __slots__ = ("_store", "_name")
+
+   def __init__(self, store, name):
+      self._store = store
+      self._name = name
+
+   def _list(self):
+      return getattr(self._store, self._name)
+
+   def __len__(self):
+      return len(self._list())
+
+   def __getitem__(self, index):
+      return self._list()[index]
+
+   def __iter__(self):
+      return iter(self._list())
+
+   def __reversed__(self):
+      return reversed(self._list())
+
+   def __contains__(self, value):
+      return value in self._list()
+
+   def __eq__(self, other):
+      return self._list() == (other._list() if isinstance(other, LiveView) else other)
+
+   def copy(self):
+      return list(self._list())
+
+   def __repr__(self):
+      return f"LiveView({self._name}: {self._list()!r})"
+
+   def __setitem__(self, index, value):
+      self._list()[index] = value
+      self._store.changed()
+
+   def __delitem__(self, index):
+      del self._list()[index]
+      self._store.changed()
+
+   def insert(self, index, value):
+      self._list().insert(index, value)
+      self._store.changed()
+
+   def append(self, value):
+      self._list().append(value)
+      self._store.changed()
+
+   def remove(self, value):
+      # The list's own remove, compared in C instead of by MutableSequence.index()
+      self._list().remove(value)
+      self._store.changed()
+
+   def pop(self, index=-1):
+      value = self._list().pop(index)
+      self._store.changed()
+      return value
+
+class DataStore:
+   """Owns the loaded vehicles, maintenance entries and track days.
+
+   Every storage file is parsed once. Managers get live views of the collections (see
+   view()) instead of references that have to be updated, and version is incremented on
+   every change so caches can key on it.
+
+   Given an executor, the files are loaded on it and the collections stay empty until
+   collect_loaded() hands the results over, so the GUI can be built in the meantime.
+   """
+
+   def __init__(self, vehicles_file=data_utils.vehicles_file, maintenance_file=data_utils.maintenance_file, track_day_shards=None,
+                executor=None, progress=None):
+      self.version = 0
+      self.vehicles_file = vehicles_file
+      self.maintenance_file = maintenance_file
+      self.vehicles, self.vehicle_data = [], {}
+      self.maintenance_entries = []
+      self.track_day_shards = track_day_shards if track_day_shards is not None else TrackDayShards()
+      self.track_days = []
+      # Called with every journaled track day mutation, or with None when the track days were replaced
+      self.track_day_listeners = []
+      # Seconds spent loading each collection, on the thread that loaded it
+      self.load_times = {}
+      self._pending = {}
+
+      loaders = {
+         "vehicles": lambda: data_utils.load_vehicles(filename=vehicles_file),
+         "maintenance_entries": lambda: data_utils.load_maintenance_entries(filename=maintenance_file),
+         "track_days": lambda: self.track_day_shards.preload(progress=progress),
+      }
+      for name, load in loaders.items():
+         if executor is None:
+            self._apply(name, self._timed(name, load))
+         else:
+            self._pending[name] = executor.submit(self._timed, name, load)
+
+   def _timed(self, name, load):
+      start = time.perf_counter()
+      try:
+         return load()
+      finally:
+         self.load_times[name] = time.perf_counter() - start
+
+   def _apply(self, name, result):
+      if name == "vehicles":
+         self.vehicles, self.vehicle_data = result
+      elif name == "maintenance_entries":
+         self.maintenance_entries = result
+      # The parsed track day shards stay in track_day_shards until iter_load_track_days()
+      self.changed()
+
+   @property
+   def loading(self):
+      """True while a file loaded on the executor hasn't been collected yet."""
+      return bool(self._pending)
+
+   def is_loading(self, *names):
+      """True while any of the named collections hasn't been collected yet.
+
+      Until then the collection is empty, an edit of it would be saved over the file being
+      loaded and then be replaced by the loaded collection.
+      """
+      return any(name in self._pending for name in names)
+
+   def collect_loaded(self):
+      """Take over the collections that finished loading on the executor, returns their names."""
+      done = [name for name, future in self._pending.items() if future.done()]
+      for name in done:
+         self._collect(name)
+      return done
+
+   def _collect(self, name):
+      future = self._pending.pop(name)
+      try:
+         self._apply(name, future.result())
+      except Exception as e:
+         # Todo: Write a proper error log, displayed in the GUI somewhere.
+         print(f"Error loading {name}: {e}")
+
+   def changed(self):
+      """Mark the data as changed, for changes not made through a view."""
+      self.version += 1
+
+   def view(self, name):
+      """Get a live view of the 'vehicles', 'maintenance_entries' or 'track_days' list."""
+      if name not in ("vehicles", "maintenance_entries", "track_days"):
+         raise ValueError(f"Unknown data store collection: {name}")
+      return LiveView(self, name)
+
+   def set_vehicles(self, vehicles, vehicle_data):
+      self.vehicles = vehicles
+      self.vehicle_data = vehicle_data
+      self.changed()
+
+   def save_vehicles(self):
+      self.changed()
+      data_utils.save_vehicles(self.vehicles, self.vehicle_data, filename=self.vehicles_file)
+
+   def append_maintenance_record(self, record, maintenance_entries=None):
+      """Journal callback for MaintenanceMngr, the change is already applied to the maintenance entries."""
+      self.changed()
+      data_utils.append_maintenance_record(record, self.maintenance_entries, filename=self.maintenance_file)
+
+   def iter_load_track_days(self, vehicle=None, progress=None):
+      """Replace the track days with those of a vehicle (or all vehicles), yielding them as they load."""
+      if "track_days" in self._pending:
+         # The shards must not be read while they are parsed on the executor
+         self._pending["track_days"].result()
+         self._collect("track_days")
+      track_days = self.track_days = []
+      self.changed()
+      self._notify_track_day_listeners(None)
+      for track_day in self.track_day_shards.iter_load(vehicle, progress):
+         track_days.append(track_day)
+         self.changed()
+         yield track_day
+
+   def append_track_day_record(self, record, track_days=None):
+      """Journal callback for TrackSessionMngr, the mutation is already applied to the track days."""
+      self.changed()
+      self.track_day_shards.append_journal_record(record, self.track_days)
+      self._notify_track_day_listeners(record)
+
+   def save_track_days(self, track_days=None):
+      """Save callback for TrackSessionMngr."""
+      self.changed()
+      self.track_day_shards.save(self.track_days)
+      self._notify_track_day_listeners(None)
+
+   def _notify_track_day_listeners(self, record):
+      for listener in self.track_day_listeners:
+         listener(record)
@@ -1,48 +1,404 @@
 # Add description and author information
 
 import json
+import marshal
 import os
+import tempfile
+
+from rcfunc import storage_schema
+from rcfunc.binary_snapshot import load_json, write_binary
+from rcfunc.track_day_index import SessionStore, pin_sessions, snapshot_track_days, write_snapshot, write_track_day_snapshot
+from rcfunc.track_day_models import Session, TrackDay, encode_model
 
 BASE_DIR = os.path.join(os.path.expanduser("~"), ".local/racing-companion")
 data_file = os.path.join(BASE_DIR, ".rcstorage/track_sessions.json")
 vehicles_file = os.path.join(BASE_DIR, ".rcstorage/vehicles.json")
 maintenance_file = os.path.join(BASE_DIR, ".rcstorage/maintenance_entries.json")
+sqlite_file = os.path.join(BASE_DIR, ".rcstorage/racing_companion.db")
+# Track days are stored per vehicle and year in this directory, see track_day_shards.py.
+# data_file is split into it on first start.
+track_days_dir = os.path.join(BASE_DIR, ".rcstorage/track_days")
+
+# Storage backend for the default storage files, "json" or "sqlite".
+# Migrate existing JSON files with: python3 -m rcfunc.sqlite_storage migrate
+STORAGE_BACKEND = os.environ.get("RC_STORAGE_BACKEND", "json")
+
+# Track day mutations are appended to '<data file>.journal' as one JSON record per line.
+# The journal is folded into the snapshot when it reaches this many records.
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_COMPACT_THRESHOLD = 200
+
+_journal_lengths = {}
+
+# Number of track day session lists kept in memory by load_track_day_headers
+RESIDENT_SESSION_LISTS = 50
+
+# Parsed file content by absolute path, as (file identities, marshalled content)
+_parse_cache = {}
+
+# When set, writes are queued on this BackgroundWriter instead of running in the caller
+_background_writer = None
+
+def set_background_writer(writer):
+    global _background_writer
+    _background_writer = writer
+
+def journal_file_for(filename=data_file):
+    return filename + JOURNAL_SUFFIX
+
+def _sqlite_storage(filename, default_filename):
+    """Get the SQLite storage if it is the active backend for the given default storage file."""
+    if STORAGE_BACKEND != "sqlite" or filename != default_filename:
+        return None
+    from rcfunc.sqlite_storage import get_storage
+    return get_storage(sqlite_file)
+
+def _file_identity(filename):
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+def _load_cached(filename, load, *dependencies):
+    """Get the content of filename from the parse cache, or from load() on a miss.
+
+    Entries are keyed on path, mtime, size and inode of filename and its dependencies (like
+    the journal), so changes on disk are picked up. The cache holds a marshalled copy and
+    every caller gets objects of its own.
+    """
+    path = os.path.abspath(filename)
+    identity = tuple(_file_identity(name) for name in (filename,) + dependencies)
+    cached = _parse_cache.get(path)
+    if cached and cached[0] == identity:
+        return marshal.loads(cached[1])
+    data = load()
+    _parse_cache[path] = (identity, marshal.dumps(data))
+    return data
+
+def _invalidate_cache(filename):
+    _parse_cache.pop(os.path.abspath(filename), None)
+
+def clear_parse_cache():
+    _parse_cache.clear()
+
+def _write(key, write):
+    """Run a storage write, on the background writer if one is set.
+
+    A write on the background writer must only use data copied on the calling thread,
+    see _copy().
+    """
+    if _background_writer:
+        _background_writer.submit(key, write)
+    else:
+        write()
+
+def flush_writes(timeout=None):
+    """Wait for queued background writes. Returns False on timeout."""
+    if _background_writer:
+        return _background_writer.flush(timeout)
+    return True
+
+def _copy(data):
+    """Get a deep copy of JSON data, to be written while the original may change."""
+    return marshal.loads(marshal.dumps(data))
+
+def _copy_track_days(track_days):
+    return [TrackDay.from_dict(track_day.to_dict()) for track_day in track_days]
+
+def write_json(data, filename):
+    """Write a JSON file, on the background writer if one is set."""
+    data = _copy(data)
+    _write(filename, lambda: write_json_atomic(data, filename))
+
+def write_json_atomic(data, filename):
+    """Write JSON through a synced temporary file, so a crash never leaves a truncated file."""
+    directory = os.path.dirname(filename)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_filename = tempfile.mkstemp(dir=directory, prefix=os.path.basename(filename), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as file:
+            json.dump(data, file, indent=4)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        os.remove(tmp_filename)
+        raise
+    write_binary(data, filename)
 
 def load_data(filename=data_file):
+    storage = _sqlite_storage(filename, data_file)
+    if storage:
+        return storage.load_track_days()
+    journal_file = journal_file_for(filename)
+    # The parse cache holds the stored dicts, marshal can't hold model objects
+    records = _load_cached(filename, lambda: _load_track_days(filename, journal_file), journal_file)
+    return [TrackDay.from_dict(record) for record in records]
+
+def _load_track_days(filename, journal_file):
+    records = []
     if os.path.exists(filename):
         with open(filename, "r") as file:
-            return json.load(file)
-    return []
+            records = json.load(file)
+    if os.path.exists(journal_file):
+        track_days = [TrackDay.from_dict(record) for record in records]
+        _journal_lengths[filename] = replay_journal(track_days, journal_file)
+        records = [track_day.to_dict() for track_day in track_days]
+    return records
+
+def load_track_day_headers(filename=data_file, max_resident=RESIDENT_SESSION_LISTS):
+    """Load track days with only their headers in memory, sessions are read on first access.
+
+    The SQLite backend loads everything, like load_data.
+    """
+    if _sqlite_storage(filename, data_file) or not os.path.exists(filename):
+        return load_data(filename)
+    store = SessionStore(filename, max_resident)
+    track_days = store.load_headers()
+    if track_days is None:
+        # No index yet (or the file was edited by hand), rewrite the snapshot to create one
+        with open(filename, "r") as file:
+            track_days = [TrackDay.from_dict(record) for record in json.load(file)]
+        write_snapshot(track_days, filename)
+        track_days = store.load_headers()
+    journal_file = journal_file_for(filename)
+    if os.path.exists(journal_file):
+        _journal_lengths[filename] = replay_journal(track_days, journal_file)
+    return track_days
 
 def save_data(data, filename=data_file):
+    _invalidate_cache(filename)
+    storage = _sqlite_storage(filename, data_file)
+    if storage:
+        track_days = _copy_track_days(data)
+        _write(filename, lambda: storage.save_track_days(track_days))
+    else:
+        snapshot = snapshot_track_days(data)
+        # The snapshot contains every journaled mutation
+        _journal_lengths[filename] = 0
+        _write(filename, lambda: _write_track_days(snapshot, filename))
+
+def _write_track_days(snapshot, filename):
+    write_track_day_snapshot(snapshot, filename)
+    journal_file = journal_file_for(filename)
+    if os.path.exists(journal_file):
+        os.remove(journal_file)
+
+def apply_journal_record(track_days, record, by_id=None):
+    """Apply a single journaled mutation (as read from the journal) to a list of track days.
+
+    by_id maps the ids of track_days to the track days, it is kept up to date when given.
+    """
+    op = record.get("op")
+    if op == "create_track_day":
+        track_day = TrackDay.from_dict(record["track_day"])
+        track_days.append(track_day)
+        if by_id is not None:
+            by_id[track_day.id] = track_day
+    elif op == "delete_track_day":
+        track_day = _journaled_track_day(track_days, record, by_id)
+        # Identity, lazy track days must not be loaded to compare them
+        del track_days[next(i for i, day in enumerate(track_days) if day is track_day)]
+        if by_id is not None:
+            del by_id[track_day.id]
+    elif op == "add_session":
+        track_day = _journaled_track_day(track_days, record, by_id)
+        track_day.sessions.append(Session.from_dict(record["session"]))
+        pin_sessions(track_day)
+    elif op == "update_session":
+        track_day = _journaled_track_day(track_days, record, by_id)
+        for session in track_day.sessions:
+            if _is_journaled_session(session, record):
+                session.update(record["session"])
+                pin_sessions(track_day)
+                break
+    elif op == "add_bulk":
+        # New track days and the sessions added to existing ones, see TrackSessionMngr.apply_bulk
+        for data in record["track_days"]:
+            apply_journal_record(track_days, {"op": "create_track_day", "track_day": data}, by_id)
+        for track_day_id, sessions in record["sessions"].items():
+            track_day = _track_day_by_id(track_days, track_day_id, by_id)
+            track_day.sessions.extend(Session.from_dict(session) for session in sessions)
+            pin_sessions(track_day)
+    else:
+        raise ValueError(f"Unknown journal operation: {op}")
+
+def _journaled_track_day(track_days, record, by_id):
+    """Get the track day a journal record changes."""
+    if "track_day_id" not in record:
+        # Journals from before track day ids address track days by position
+        return track_days[record["index"]]
+    return _track_day_by_id(track_days, record["track_day_id"], by_id)
+
+def _track_day_by_id(track_days, track_day_id, by_id):
+    if by_id is None:
+        return next(day for day in track_days if day.id == track_day_id)
+    return by_id[track_day_id]
+
+def _is_journaled_session(session, record):
+    """Check if an update_session record is for a session."""
+    if "session_id" in record:
+        return session.id == record["session_id"]
+    # Journals from before session ids address sessions by number
+    return session.session_number == record["session_number"]
+
+def replay_journal(track_days, journal_file):
+    """Replay journal records on top of track_days. Returns the number of applied records."""
+    applied = 0
+    by_id = {track_day.id: track_day for track_day in track_days}
+    with open(journal_file, "r") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn tail from an interrupted append, nothing after it can be trusted
+                break
+            apply_journal_record(track_days, record, by_id)
+            applied += 1
+    return applied
+
+def append_journal_record(record, track_days, filename=data_file):
+    """Append a mutation record to the journal, compacting when the threshold is reached."""
+    # Serialize right away, the record refers to data that may change before it is written
+    line = json.dumps(record, default=encode_model) + "\n"
+    _invalidate_cache(filename)
+    storage = _sqlite_storage(filename, data_file)
+    if not storage:
+        # Counted here rather than on the background writer, the compaction snapshots track_days
+        _journal_lengths[filename] = _journal_length(filename) + 1
+        if _journal_lengths[filename] >= JOURNAL_COMPACT_THRESHOLD:
+            save_data(track_days, filename)
+            return
+
+    def append():
+        if storage:
+            storage.apply_journal_record(json.loads(line))
+        else:
+            _append_journal_line(line, filename)
+
+    def full_write():
+        if storage:
+            copies = _copy_track_days(track_days)
+            return lambda: storage.save_track_days(copies)
+        snapshot = snapshot_track_days(track_days)
+        return lambda: _write_track_days(snapshot, filename)
+
+    if _background_writer:
+        _background_writer.submit_append(filename, append, full_write)
+    else:
+        append()
+
+def _journal_length(filename):
+    """Get the number of records in the journal of a track day file."""
+    journal_file = journal_file_for(filename)
+    if not os.path.exists(journal_file):
+        _journal_lengths[filename] = 0
+    elif filename not in _journal_lengths:
+        with open(journal_file, "r") as file:
+            _journal_lengths[filename] = sum(1 for journal_line in file if journal_line.strip())
+    return _journal_lengths[filename]
+
+def _append_journal_line(line, filename):
     os.makedirs(os.path.dirname(filename), exist_ok=True)
-    with open(filename, "w") as file:
-        json.dump(data, file, indent=4)
+    with open(journal_file_for(filename), "a") as file:
+        file.write(line)
+
+def compact_data(filename=data_file):
+    """Fold the journal into the snapshot file."""
+    save_data(load_data(filename), filename)
 
 def load_vehicles(filename=vehicles_file):
+    storage = _sqlite_storage(filename, vehicles_file)
+    if storage:
+        return storage.load_vehicles()
     if os.path.exists(filename):
-        with open(filename, "r") as file:
-            data = json.load(file)
-            return data.get("vehicles", []), data.get("vehicle_data", {})
+        data = _load_cached(filename, lambda: _load_vehicles_file(filename))
+        return data["vehicles"], data["vehicle_data"]
     return [], {}
 
-def save_vehicles(vehicles, vehicle_data, filename=vehicles_file):
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
-    data_to_save = {
+def _vehicles_file_content(vehicles, vehicle_data):
+    return {
+        storage_schema.VERSION_KEY: storage_schema.SCHEMA_VERSION,
         "vehicles": vehicles,
         "vehicle_data": vehicle_data
     }
-    with open(filename, "w") as file:
-        json.dump(data_to_save, file, indent=4)
+
+def _load_vehicles_file(filename):
+    data = load_json(filename)
+    version = storage_schema.file_version(data)
+    storage_schema.check_version(version, filename)
+    if storage_schema.needs_upgrade(version):
+        vehicles, vehicle_data = storage_schema.upgrade_vehicles(
+            data.get("vehicles", []), data.get("vehicle_data", {}), version
+        )
+        data = _vehicles_file_content(vehicles, vehicle_data)
+        # Stored right away, so the migration only runs once
+        write_json_atomic(data, filename)
+    return data
+
+def save_vehicles(vehicles, vehicle_data, filename=vehicles_file):
+    _invalidate_cache(filename)
+    storage = _sqlite_storage(filename, vehicles_file)
+    if storage:
+        vehicles, vehicle_data = list(vehicles), _copy(vehicle_data)
+        _write(filename, lambda: storage.save_vehicles(vehicles, vehicle_data))
+        return
+    write_json(_vehicles_file_content(vehicles, vehicle_data), filename)
+
+def _maintenance_file_content(maintenance_entries):
+    return {
+        storage_schema.VERSION_KEY: storage_schema.SCHEMA_VERSION,
+        "maintenance_entries": maintenance_entries
+    }
 
 def save_maintenance_entries(maintenance_entries, filename=maintenance_file):
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
-    with open(filename, "w") as file:
-        json.dump(maintenance_entries, file, indent=4)
+    _invalidate_cache(filename)
+    storage = _sqlite_storage(filename, maintenance_file)
+    if storage:
+        entries = _copy(maintenance_entries)
+        _write(filename, lambda: storage.save_maintenance_entries(entries))
+    else:
+        write_json(_maintenance_file_content(maintenance_entries), filename)
+
+def append_maintenance_record(record, maintenance_entries, filename=maintenance_file):
+    """Store a single maintenance entry change (see MaintenanceMngr), already applied to maintenance_entries.
+
+    The SQLite backend only updates the row of the changed entry, the JSON file is written in full.
+    """
+    storage = _sqlite_storage(filename, maintenance_file)
+    if not storage:
+        save_maintenance_entries(maintenance_entries, filename=filename)
+        return
+    _invalidate_cache(filename)
+    if _background_writer:
+        record = _copy(record)
+
+        def full_write():
+            entries = _copy(maintenance_entries)
+            return lambda: storage.save_maintenance_entries(entries)
+        _background_writer.submit_append(filename, lambda: storage.apply_maintenance_record(record), full_write)
+    else:
+        storage.apply_maintenance_record(record)
 
 def load_maintenance_entries(filename=maintenance_file):
+    storage = _sqlite_storage(filename, maintenance_file)
+    if storage:
+        return storage.load_maintenance_entries()
     if os.path.exists(filename):
-        with open(filename, "r") as file:
-            return json.load(file)
+        return _load_cached(filename, lambda: _load_maintenance_file(filename))
     else:
-        return []
\ No newline at end of file
+        return []
+
+def _load_maintenance_file(filename):
+    data = load_json(filename)
+    version = storage_schema.file_version(data)
+    storage_schema.check_version(version, filename)
+    # Files from before versioning are a bare list of entries
+    maintenance_entries = data["maintenance_entries"] if version else data
+    if storage_schema.needs_upgrade(version):
+        storage_schema.upgrade_records("maintenance_entry", maintenance_entries, version)
+        write_json_atomic(_maintenance_file_content(maintenance_entries), filename)
+    return maintenance_entries
@@ -3,10 +3,12 @@
 # Description: Unit tests for functionality in the maintenance tab
 # License: TBD
 
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, MutableSequence, Callable
 import re
 from dataclasses import dataclass, field
 from rcfunc.data_utils import save_maintenance_entries, load_maintenance_entries
+from rcfunc.result_cache import ResultCache
+from rcfunc.storage_schema import new_id
 
 @dataclass
 class MaintenanceEntry:
@@ -18,10 +20,13 @@ class MaintenanceEntry:
    description: str
    handbook_ref: str = ""
    tags: List[str] = field(default_factory=list)
+   # Unique and persistent, set when the entry is created
+   id: str = field(default_factory=new_id)
 
    def to_dict(self) -> Dict[str, Any]:
       """Convert to dictionary for compatibility with existing data format"""
       return {
+         "id": self.id,
          "title": self.title,
          "vehicle": self.vehicle,
          "date": self.date,
@@ -33,15 +38,16 @@ class MaintenanceEntry:
 
    @classmethod
    def from_dict(cls, data: Dict[str, Any]) -> 'MaintenanceEntry':
-      """Create from dictionary"""
+      """Create from dictionary, all fields are present since schema version 1"""
       return cls(
-         title=data.get("title", ""),
-         vehicle=data.get("vehicle", ""),
-         date=data.get("date", ""),
-         duration=data.get("duration", ""),
-         description=data.get("description", ""),
-         handbook_ref=data.get("handbook_ref", ""),
-         tags=data.get("tags", [])
+         title=data["title"],
+         vehicle=data["vehicle"],
+         date=data["date"],
+         duration=data["duration"],
+         description=data["description"],
+         handbook_ref=data["handbook_ref"],
+         tags=data["tags"],
+         id=data.get("id") or new_id()
       )
 
 @dataclass
@@ -63,63 +69,96 @@ class MaintenanceStatistics:
 class MaintenanceMngr:
    """Business logic for maintenance management"""
 
-   def __init__(self, vehicles: List[str], active_vehicle: Optional[str] = None):
+   def __init__(self, vehicles: List[str], active_vehicle: Optional[str] = None,
+                entries: Optional[MutableSequence[Dict[str, Any]]] = None,
+                journal_callback: Optional[Callable[[Dict[str, Any], MutableSequence[Dict[str, Any]]], None]] = None,
+                data_version: Optional[Callable[[], int]] = None):
       self.vehicles = vehicles
       self.active_vehicle = active_vehicle
-      self._entries: List[MaintenanceEntry] = []
+      # Already loaded raw entries (like a DataStore view), kept up to date on every change
+      self._raw_entries = entries
+      # Called with a record of every change and the raw entries instead of saving all entries
+      self.journal_callback = journal_callback
+      # Entries and their raw entries by id, in the order of the raw entries
+      self._entries: Dict[str, MaintenanceEntry] = {}
+      self._raw_by_id: Dict[str, Dict[str, Any]] = {}
+      # Chart data by chart type, for the data version (like DataStore.version) it was computed for
+      self._cache = ResultCache(data_version)
       self._load_entries()
 
    def _load_entries(self) -> None:
       """Load maintenance entries from storage"""
       try:
-         raw_entries = load_maintenance_entries()
-         self._entries = [MaintenanceEntry.from_dict(entry) for entry in raw_entries]
+         raw_entries = self._raw_entries if self._raw_entries is not None else load_maintenance_entries()
+         self._entries = {}
+         self._raw_by_id = {}
+         for raw_entry in raw_entries:
+            entry = MaintenanceEntry.from_dict(raw_entry)
+            self._entries[entry.id] = entry
+            self._raw_by_id[entry.id] = raw_entry
       except Exception as e:
          print(f"Error loading maintenance entries: {e}")
-         self._entries = []
+         self._entries = {}
+         self._raw_by_id = {}
 
-   def _save_entries(self) -> None:
-      """Save maintenance entries to storage"""
+   def reload_entries(self) -> None:
+      """Reload the entries, after the shared entries were replaced"""
+      self._load_entries()
+
+   def _save_entries(self, record: Dict[str, Any]) -> None:
+      """Save a change to storage, only the changed entry when there is a journal callback"""
       try:
-         raw_entries = [entry.to_dict() for entry in self._entries]
-         save_maintenance_entries(raw_entries)
+         raw_entries = self._raw_entries
+         if raw_entries is None:
+            raw_entries = list(self._raw_by_id.values())
+         if self.journal_callback:
+            self.journal_callback(record, raw_entries)
+         else:
+            save_maintenance_entries(list(raw_entries))
       except Exception as e:
          print(f"Error saving maintenance entries: {e}")
 
    def add_entry(self, entry_data: Dict[str, Any]) -> MaintenanceEntry:
       """Add a new maintenance entry"""
       entry = MaintenanceEntry.from_dict(entry_data)
-      self._entries.append(entry)
-      self._save_entries()
+      self._entries[entry.id] = entry
+      raw_entry = self._raw_by_id[entry.id] = entry.to_dict()
+      if self._raw_entries is not None:
+         self._raw_entries.append(raw_entry)
+      self._save_entries({"op": "add_maintenance_entry", "entry": raw_entry})
       return entry
 
    def update_entry(self, old_entry: MaintenanceEntry, new_data: Dict[str, Any]) -> MaintenanceEntry:
-      """Update an existing maintenance entry"""
-      try:
-         index = self._entries.index(old_entry)
-         updated_entry = MaintenanceEntry.from_dict(new_data)
-         self._entries[index] = updated_entry
-         self._save_entries()
-         return updated_entry
-      except ValueError:
+      """Update an existing maintenance entry, it keeps its id"""
+      raw_entry = self._raw_by_id.get(old_entry.id)
+      if raw_entry is None:
          raise ValueError("Entry not found")
+      updated_entry = MaintenanceEntry.from_dict(dict(new_data, id=old_entry.id))
+      # Keeps its place in the dicts, the raw entry is updated in place so it needn't be looked up
+      self._entries[old_entry.id] = updated_entry
+      raw_entry.clear()
+      raw_entry.update(updated_entry.to_dict())
+      self._save_entries({"op": "update_maintenance_entry", "entry": raw_entry})
+      return updated_entry
 
    def delete_entry(self, entry: MaintenanceEntry) -> bool:
       """Delete a maintenance entry"""
-      try:
-         self._entries.remove(entry)
-         self._save_entries()
-         return True
-      except ValueError:
+      raw_entry = self._raw_by_id.pop(entry.id, None)
+      if raw_entry is None:
          return False
+      del self._entries[entry.id]
+      if self._raw_entries is not None:
+         self._raw_entries.remove(raw_entry)
+      self._save_entries({"op": "delete_maintenance_entry", "id": entry.id})
+      return True
 
    def get_all_entries(self) -> List[MaintenanceEntry]:
       """Get all maintenance entries"""
-      return self._entries.copy()
+      return list(self._entries.values())
 
    def filter_entries(self, filter_criteria: MaintenanceFilter, use_active_vehicle: bool = True) -> List[MaintenanceEntry]:
       """Filter maintenance entries based on criteria"""
-      filtered_entries = self._entries.copy()
+      filtered_entries = list(self._entries.values())
       if filter_criteria.search_text:
          search_text = filter_criteria.search_text.lower()
          filtered_entries = [
@@ -162,7 +201,7 @@ class MaintenanceMngr:
    def get_statistics(self) -> MaintenanceStatistics:
       """Calculate maintenance statistics"""
       stats = MaintenanceStatistics()
-      for entry in self._entries:
+      for entry in self._entries.values():
          vehicle = entry.vehicle or "Unknown"
          if vehicle not in stats.vehicles:
             stats.vehicles[vehicle] = {"count": 0, "time": 0}
@@ -185,7 +224,14 @@ class MaintenanceMngr:
       return hours * 60 + minutes
 
    def get_chart_data(self, chart_type: str) -> Dict[str, Any]:
-      """Get data formatted for specific chart types"""
+      """Get data formatted for specific chart types, cached until the data version changes"""
+      return self._cache.get(chart_type, lambda: self._chart_data(chart_type))
+
+   def cache_info(self) -> Dict[str, int]:
+      """Get the hits and misses of the chart data cache"""
+      return self._cache.info()
+
+   def _chart_data(self, chart_type: str) -> Dict[str, Any]:
       stats = self.get_statistics()
       if chart_type == "frequency":
          sorted_months = sorted(stats.months.keys())
@@ -0,0 +1,52 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Bounded LRU cache of chart and report results, valid for one version of the data.
+# License: TBD
+
+from collections import OrderedDict
+
+MAX_SIZE = 32
+
+class ResultCache:
+   """LRU cache of computed results by key, for one version of the data they are computed from.
+
+   version is a callable returning a counter that is incremented on every change of the
+   data, like DataStore.version. Results are kept for the current version only, the cache
+   is emptied when the version changes. Without a version there is no way to tell when a
+   result is outdated, so nothing is cached. Cached results are shared, callers must not
+   modify them.
+   """
+
+   def __init__(self, version=None, maxsize=MAX_SIZE):
+      self.version = version
+      self.maxsize = maxsize
+      self.hits = 0
+      self.misses = 0
+      self._version = None
+      self._results = OrderedDict()
+
+   def get(self, key, compute):
+      """Get the result of key, calling compute() for it if it isn't cached."""
+      if self.version is None:
+         self.misses += 1
+         return compute()
+      version = self.version()
+      if version != self._version:
+         self._results.clear()
+         self._version = version
+      if key in self._results:
+         self.hits += 1
+         self._results.move_to_end(key)
+         return self._results[key]
+      self.misses += 1
+      result = self._results[key] = compute()
+      if len(self._results) > self.maxsize:
+         self._results.popitem(last=False)
+      return result
+
+   def clear(self):
+      self._results.clear()
+
+   def info(self):
+      """Get the hit and miss counts and the number of cached results."""
+      return {"hits": self.hits, "misses": self.misses, "size": len(self._results), "maxsize": self.maxsize}
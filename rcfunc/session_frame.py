@@ -0,0 +1,173 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Columnar NumPy table of the track day sessions, kept only as the test oracle of the track day cube.
+# License: TBD
+
+from datetime import date
+
+import numpy as np
+
+# Code of values that can't be encoded, never matches a category
+NO_CODE = -1
+
+class Categories:
+   """Integer codes of the distinct values of a text column, in order of first appearance."""
+
+   def __init__(self):
+      self.labels = []
+      self._codes = {}
+
+   def encode(self, label):
+      code = self._codes.get(label)
+      if code is None:
+         code = self._codes[label] = len(self.labels)
+         self.labels.append(label)
+      return code
+
+   def code(self, label):
+      """Get the code of a label, NO_CODE if it was never encoded."""
+      return self._codes.get(label, NO_CODE)
+
+   def __len__(self):
+      return len(self.labels)
+
+def _date_ordinal(text):
+   try:
+      return date.fromisoformat(text).toordinal()
+   except ValueError:
+      return NO_CODE
+
+def _year(text):
+   year = text[:4]
+   return int(year) if year.isdigit() else NO_CODE
+
+def _int(text):
+   try:
+      return int(text)
+   except ValueError:
+      return 0
+
+class SessionFrame:
+   """Columns of the track days and of their sessions.
+
+   Track day columns have one row per track day, in the order of the track day list:
+   day_year, day_vehicle, day_track and day_sessions (number of sessions). Session columns
+   have one row per session, grouped by track day: date (ordinal), year, vehicle and track
+   (of the track day), weather, laps, best_lap_ms and day (row of the track day).
+
+   Text values are stored as codes of vehicles, tracks and weather (see Categories), missing
+   best lap times and unparseable dates or years as NO_CODE. Track day mutations are applied
+   with apply_journal_record(), re-encoding only the rows of the changed track day, found by
+   the track day id of the record in day_ids.
+
+   The statistics are computed from the TrackDayCube. The frame is only built by
+   TrackDayStatsMngr.recompute_all(), which check_consistency (enabled by the tests)
+   compares every cube result with. The app never builds it.
+   """
+
+   SESSION_COLUMNS = ("date", "year", "vehicle", "track", "weather", "laps", "best_lap_ms", "day")
+   DAY_COLUMNS = ("day_year", "day_vehicle", "day_track", "day_sessions")
+
+   def __init__(self, track_days=()):
+      self.vehicles = Categories()
+      self.tracks = Categories()
+      self.weather_types = Categories()
+      days = [self._encode_day(track_day) for track_day in track_days]
+      for position, name in enumerate(self.DAY_COLUMNS):
+         setattr(self, name, np.array([day[0][position] for day in days], dtype=np.int64))
+      sessions = [session for day in days for session in day[1]]
+      for position, name in enumerate(self.SESSION_COLUMNS[:-1]):
+         setattr(self, name, np.array([session[position] for session in sessions], dtype=np.int64))
+      self.day = np.repeat(np.arange(len(days), dtype=np.int64), self.day_sessions)
+      self.day_ids = [track_day.id for track_day in track_days]
+      # Track day rows by id, built when a record needs it
+      self._rows = None
+
+   def __len__(self):
+      """Number of track days."""
+      return len(self.day_year)
+
+   def _encode_day(self, track_day):
+      """Get the track day row and the session rows (without day) of a track day."""
+      ordinal = _date_ordinal(track_day.date)
+      year = _year(track_day.date)
+      vehicle = self.vehicles.encode(track_day.vehicle)
+      track = self.tracks.encode(track_day.track)
+      sessions = [
+         (
+            ordinal, year, vehicle, track, self.weather_types.encode(session.weather), _int(session.laps),
+            session.best_lap_ms if session.best_lap_ms is not None else NO_CODE
+         )
+         for session in track_day.sessions
+      ]
+      return (year, vehicle, track, len(sessions)), sessions
+
+   def _row(self, track_day_id):
+      if self._rows is None:
+         self._rows = {day_id: row for row, day_id in enumerate(self.day_ids)}
+      return self._rows[track_day_id]
+
+   def _session_range(self, index):
+      start = int(self.day_sessions[:index].sum())
+      return start, start + int(self.day_sessions[index])
+
+   def _splice(self, index, start, end, track_day):
+      """Replace track day row index and session rows start:end, removing them if track_day is None."""
+      if track_day is None:
+         day_row, sessions = None, []
+      else:
+         day_row, sessions = self._encode_day(track_day)
+      for position, name in enumerate(self.DAY_COLUMNS):
+         column = getattr(self, name)
+         new = np.array([] if day_row is None else [day_row[position]], dtype=np.int64)
+         setattr(self, name, np.concatenate((column[:index], new, column[index + 1:])))
+      for position, name in enumerate(self.SESSION_COLUMNS[:-1]):
+         column = getattr(self, name)
+         new = np.array([session[position] for session in sessions], dtype=np.int64)
+         setattr(self, name, np.concatenate((column[:start], new, column[end:])))
+      following = self.day[end:] - (1 if track_day is None else 0)
+      self.day = np.concatenate((self.day[:start], np.full(len(sessions), index, dtype=np.int64), following))
+
+   def append(self, track_day):
+      count = len(self.day)
+      self._splice(len(self), count, count, track_day)
+      self.day_ids.append(track_day.id)
+      if self._rows is not None:
+         self._rows[track_day.id] = len(self.day_ids) - 1
+
+   def replace(self, index, track_day):
+      self._splice(index, *self._session_range(index), track_day)
+
+   def remove(self, index):
+      self._splice(index, *self._session_range(index), None)
+      del self.day_ids[index]
+      # Rows of the following track days moved
+      self._rows = None
+
+   def apply_journal_record(self, record, track_days):
+      """Follow a track day mutation (see data_utils.apply_journal_record), already applied to track_days."""
+      op = record.get("op")
+      if op == "create_track_day":
+         self.append(record["track_day"])
+      elif op == "delete_track_day":
+         self.remove(self._row(record["track_day_id"]))
+      elif op in ("add_session", "update_session"):
+         row = self._row(record["track_day_id"])
+         self.replace(row, track_days[row])
+      elif op == "add_bulk":
+         for track_day in record["track_days"]:
+            self.append(track_day)
+         for track_day_id in record["sessions"]:
+            row = self._row(track_day_id)
+            self.replace(row, track_days[row])
+      else:
+         raise ValueError(f"Unknown journal operation: {op}")
+
+   def day_mask(self, vehicle=None, year=None):
+      """Get the track day rows of a vehicle and/or year."""
+      mask = np.ones(len(self), dtype=bool)
+      if vehicle:
+         mask &= self.day_vehicle == self.vehicles.code(vehicle)
+      if year:
+         mask &= self.day_year == (int(year) if str(year).isdigit() else NO_CODE)
+      return mask
@@ -0,0 +1,349 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Optional SQLite storage backend for the Racing Companion application.
+# License: TBD
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+
+from rcfunc import storage_schema
+from rcfunc.track_day_models import TrackDay
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS track_days (
+   id INTEGER PRIMARY KEY,
+   position INTEGER NOT NULL,
+   track TEXT,
+   date TEXT,
+   vehicle TEXT,
+   data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_track_days_position ON track_days(position);
+CREATE INDEX IF NOT EXISTS idx_track_days_vehicle ON track_days(vehicle, date);
+CREATE INDEX IF NOT EXISTS idx_track_days_date ON track_days(date);
+CREATE INDEX IF NOT EXISTS idx_track_days_track ON track_days(track);
+CREATE INDEX IF NOT EXISTS idx_track_days_day_id ON track_days(json_extract(data, '$.id'));
+
+CREATE TABLE IF NOT EXISTS sessions (
+   id INTEGER PRIMARY KEY,
+   track_day_id INTEGER NOT NULL REFERENCES track_days(id) ON DELETE CASCADE,
+   position INTEGER NOT NULL,
+   session_number TEXT,
+   data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_track_day ON sessions(track_day_id, position);
+
+CREATE TABLE IF NOT EXISTS vehicles (
+   name TEXT PRIMARY KEY,
+   position INTEGER NOT NULL,
+   data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS maintenance_entries (
+   id INTEGER PRIMARY KEY,
+   position INTEGER NOT NULL,
+   vehicle TEXT,
+   date TEXT,
+   entry_id TEXT,
+   data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_maintenance_vehicle ON maintenance_entries(vehicle, date);
+CREATE INDEX IF NOT EXISTS idx_maintenance_date ON maintenance_entries(date);
+"""
+
+_storages = {}
+
+def get_storage(filename):
+   """Get a shared storage instance for a database file."""
+   if filename not in _storages:
+      _storages[filename] = SqliteStorage(filename)
+   return _storages[filename]
+
+class SqliteStorage:
+   """Track days, sessions, vehicles and maintenance entries stored in indexed SQLite tables.
+
+   Indexed columns are extracted from the records, the full record is kept as JSON in the
+   'data' column so no fields are lost in the round trip.
+   """
+
+   def __init__(self, filename):
+      os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+      self.filename = filename
+      self._lock = threading.RLock()
+      self._conn = sqlite3.connect(filename, check_same_thread=False)
+      self._conn.execute("PRAGMA foreign_keys = ON")
+      self._conn.executescript(SCHEMA)
+      self._conn.commit()
+      # The schema version of the stored records is kept in the database header
+      (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+      storage_schema.check_version(version, filename)
+      if storage_schema.needs_upgrade(version):
+         self._upgrade(version)
+
+   def _upgrade(self, version):
+      """Upgrade the stored records to the current schema version, in one transaction."""
+      with self._lock, self._conn:
+         # Databases from before version 3 lack the maintenance entry id column
+         columns = {row[1] for row in self._conn.execute("PRAGMA table_info(maintenance_entries)")}
+         if "entry_id" not in columns:
+            self._conn.execute("ALTER TABLE maintenance_entries ADD COLUMN entry_id TEXT")
+         for table, kind in (("track_days", "track_day_header"), ("sessions", "session"), ("maintenance_entries", "maintenance_entry")):
+            rows = self._conn.execute(f"SELECT id, data FROM {table}").fetchall()
+            records = storage_schema.upgrade_records(kind, [json.loads(data) for _, data in rows], version)
+            self._conn.executemany(
+               f"UPDATE {table} SET data = ? WHERE id = ?",
+               [(json.dumps(record), row_id) for (row_id, _), record in zip(rows, records)]
+            )
+         self._conn.executemany(
+            "UPDATE maintenance_entries SET entry_id = ? WHERE id = ?",
+            [
+               (json.loads(data).get("id"), row_id)
+               for row_id, data in self._conn.execute("SELECT id, data FROM maintenance_entries").fetchall()
+            ]
+         )
+         self._conn.execute("CREATE INDEX IF NOT EXISTS idx_maintenance_entry_id ON maintenance_entries(entry_id)")
+         vehicles, vehicle_data = storage_schema.upgrade_vehicles(*self.load_vehicles(), version)
+         self._conn.executemany(
+            "UPDATE vehicles SET data = ? WHERE name = ?",
+            [(json.dumps(vehicle_data[name]), name) for name in vehicles]
+         )
+         self._conn.execute(f"PRAGMA user_version = {storage_schema.SCHEMA_VERSION}")
+
+   def close(self):
+      with self._lock:
+         self._conn.close()
+      _storages.pop(self.filename, None)
+
+   # Track days
+   def load_track_days(self, vehicle=None, year=None, track=None):
+      """Load track days with their sessions, optionally filtered on the indexed columns."""
+      query = "SELECT id, data FROM track_days"
+      conditions, params = [], []
+      if vehicle:
+         conditions.append("vehicle = ?")
+         params.append(vehicle)
+      if year:
+         conditions.append("date >= ? AND date < ?")
+         params.extend([str(year), str(int(year) + 1)])
+      if track:
+         conditions.append("track = ?")
+         params.append(track)
+      if conditions:
+         query += " WHERE " + " AND ".join(conditions)
+      query += " ORDER BY position"
+
+      with self._lock:
+         rows = self._conn.execute(query, params).fetchall()
+         track_days = []
+         for track_day_id, data in rows:
+            track_day = json.loads(data)
+            track_day["sessions"] = [
+               json.loads(session_data) for (session_data,) in self._conn.execute(
+                  "SELECT data FROM sessions WHERE track_day_id = ? ORDER BY position", (track_day_id,)
+               )
+            ]
+            track_days.append(TrackDay.from_dict(track_day))
+      return track_days
+
+   def save_track_days(self, track_days):
+      """Replace all stored track days."""
+      with self._lock, self._conn:
+         self._conn.execute("DELETE FROM sessions")
+         self._conn.execute("DELETE FROM track_days")
+         for position, track_day in enumerate(track_days):
+            self._insert_track_day(position, track_day)
+
+   def apply_journal_record(self, record):
+      """Apply a single track day mutation (see data_utils.apply_journal_record) as row updates."""
+      op = record.get("op")
+      with self._lock, self._conn:
+         if op == "create_track_day":
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM track_days").fetchone()
+            self._insert_track_day(count, TrackDay.from_dict(record["track_day"]))
+         elif op == "delete_track_day":
+            row_id, position = self._track_day_row(record)
+            self._conn.execute("DELETE FROM track_days WHERE id = ?", (row_id,))
+            self._conn.execute("UPDATE track_days SET position = position - 1 WHERE position > ?", (position,))
+         elif op == "add_session":
+            row_id, _ = self._track_day_row(record)
+            (count,) = self._conn.execute(
+               "SELECT COUNT(*) FROM sessions WHERE track_day_id = ?", (row_id,)
+            ).fetchone()
+            self._insert_session(row_id, count, record["session"])
+         elif op == "update_session":
+            row_id, _ = self._track_day_row(record)
+            if "session_id" in record:
+               # The id is only in the record data
+               rows = self._conn.execute(
+                  "SELECT id, data FROM sessions WHERE track_day_id = ? ORDER BY position", (row_id,)
+               )
+               row = next((row for row in rows if json.loads(row[1]).get("id") == record["session_id"]), None)
+            else:
+               row = self._conn.execute(
+                  "SELECT id, data FROM sessions WHERE track_day_id = ? AND session_number = ? ORDER BY position LIMIT 1",
+                  (row_id, record["session_number"])
+               ).fetchone()
+            if row:
+               session = json.loads(row[1])
+               session.update(record["session"])
+               self._conn.execute(
+                  "UPDATE sessions SET session_number = ?, data = ? WHERE id = ?",
+                  (session.get("session_number"), json.dumps(session), row[0])
+               )
+         elif op == "add_bulk":
+            # One transaction, like the journal line of the batch
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM track_days").fetchone()
+            for position, track_day in enumerate(record["track_days"], count):
+               self._insert_track_day(position, TrackDay.from_dict(track_day))
+            for track_day_id, sessions in record["sessions"].items():
+               row_id, _ = self._track_day_row({"track_day_id": track_day_id})
+               (count,) = self._conn.execute(
+                  "SELECT COUNT(*) FROM sessions WHERE track_day_id = ?", (row_id,)
+               ).fetchone()
+               for position, session in enumerate(sessions, count):
+                  self._insert_session(row_id, position, session)
+         else:
+            raise ValueError(f"Unknown journal operation: {op}")
+
+   def _track_day_row(self, record):
+      """Get the row id and position of the track day a journal record changes."""
+      # Looked up on the expression index of the track day id in the record data
+      row = self._conn.execute(
+         "SELECT id, position FROM track_days WHERE json_extract(data, '$.id') = ?", (record["track_day_id"],)
+      ).fetchone()
+      if row is None:
+         raise KeyError(f"No track day with id {record['track_day_id']}")
+      return row
+
+   def _insert_track_day(self, position, track_day):
+      cursor = self._conn.execute(
+         "INSERT INTO track_days (position, track, date, vehicle, data) VALUES (?, ?, ?, ?, ?)",
+         (position, track_day.track, track_day.date, track_day.vehicle, json.dumps(track_day.header_dict()))
+      )
+      for session_position, session in enumerate(track_day.sessions):
+         self._insert_session(cursor.lastrowid, session_position, session.to_dict())
+
+   def _insert_session(self, track_day_id, position, session):
+      self._conn.execute(
+         "INSERT INTO sessions (track_day_id, position, session_number, data) VALUES (?, ?, ?, ?)",
+         (track_day_id, position, session.get("session_number"), json.dumps(session))
+      )
+
+   # Vehicles
+   def load_vehicles(self):
+      with self._lock:
+         rows = self._conn.execute("SELECT name, data FROM vehicles ORDER BY position").fetchall()
+      vehicles = [name for name, _ in rows]
+      vehicle_data = {name: json.loads(data) for name, data in rows if data != "null"}
+      return vehicles, vehicle_data
+
+   def save_vehicles(self, vehicles, vehicle_data):
+      with self._lock, self._conn:
+         self._conn.execute("DELETE FROM vehicles")
+         self._conn.executemany(
+            "INSERT INTO vehicles (name, position, data) VALUES (?, ?, ?)",
+            [(name, position, json.dumps(vehicle_data.get(name))) for position, name in enumerate(vehicles)]
+         )
+
+   # Maintenance entries
+   def load_maintenance_entries(self, vehicle=None, start_date=None, end_date=None):
+      """Load maintenance entries, optionally filtered on the indexed columns."""
+      query = "SELECT data FROM maintenance_entries"
+      conditions, params = [], []
+      if vehicle:
+         conditions.append("vehicle = ?")
+         params.append(vehicle)
+      if start_date:
+         conditions.append("date >= ?")
+         params.append(start_date)
+      if end_date:
+         conditions.append("date <= ?")
+         params.append(end_date)
+      if conditions:
+         query += " WHERE " + " AND ".join(conditions)
+      query += " ORDER BY position"
+      with self._lock:
+         return [json.loads(data) for (data,) in self._conn.execute(query, params)]
+
+   def save_maintenance_entries(self, maintenance_entries):
+      with self._lock, self._conn:
+         self._conn.execute("DELETE FROM maintenance_entries")
+         self._conn.executemany(
+            "INSERT INTO maintenance_entries (position, vehicle, date, entry_id, data) VALUES (?, ?, ?, ?, ?)",
+            [
+               (position, entry.get("vehicle"), entry.get("date"), entry.get("id"), json.dumps(entry))
+               for position, entry in enumerate(maintenance_entries)
+            ]
+         )
+
+   def apply_maintenance_record(self, record):
+      """Apply a single maintenance entry change (see MaintenanceMngr) to its row."""
+      op = record.get("op")
+      with self._lock, self._conn:
+         if op == "add_maintenance_entry":
+            entry = record["entry"]
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM maintenance_entries").fetchone()
+            self._conn.execute(
+               "INSERT INTO maintenance_entries (position, vehicle, date, entry_id, data) VALUES (?, ?, ?, ?, ?)",
+               (count, entry.get("vehicle"), entry.get("date"), entry.get("id"), json.dumps(entry))
+            )
+         elif op == "update_maintenance_entry":
+            entry = record["entry"]
+            self._conn.execute(
+               "UPDATE maintenance_entries SET vehicle = ?, date = ?, data = ? WHERE entry_id = ?",
+               (entry.get("vehicle"), entry.get("date"), json.dumps(entry), entry["id"])
+            )
+         elif op == "delete_maintenance_entry":
+            row = self._conn.execute(
+               "SELECT position FROM maintenance_entries WHERE entry_id = ?", (record["id"],)
+            ).fetchone()
+            if row:
+               self._conn.execute("DELETE FROM maintenance_entries WHERE entry_id = ?", (record["id"],))
+               self._conn.execute("UPDATE maintenance_entries SET position = position - 1 WHERE position > ?", row)
+         else:
+            raise ValueError(f"Unknown maintenance operation: {op}")
+
+def migrate_from_json(storage, track_days_file, vehicles_file, maintenance_file):
+   """Copy the content of the JSON storage files into a SQLite storage.
+
+   track_days_file is a single track day file or a directory of track day shards.
+   """
+   from rcfunc.data_utils import load_data, load_vehicles, load_maintenance_entries
+   from rcfunc.track_day_shards import TrackDayShards
+
+   if os.path.isdir(track_days_file):
+      track_days = TrackDayShards(track_days_file).all_track_days()
+   else:
+      track_days = load_data(filename=track_days_file)
+   vehicles, vehicle_data = load_vehicles(filename=vehicles_file)
+   maintenance_entries = load_maintenance_entries(filename=maintenance_file)
+   storage.save_track_days(track_days)
+   storage.save_vehicles(vehicles, vehicle_data)
+   storage.save_maintenance_entries(maintenance_entries)
+   return len(track_days), len(vehicles), len(maintenance_entries)
+
+def main(argv=None):
+   from rcfunc import data_utils
+
+   parser = argparse.ArgumentParser(description="Racing Companion SQLite storage tools")
+   subparsers = parser.add_subparsers(dest="command", required=True)
+   migrate_parser = subparsers.add_parser("migrate", help="Migrate the JSON storage files to SQLite")
+   migrate_parser.add_argument("--database", default=data_utils.sqlite_file, help="SQLite database file")
+   args = parser.parse_args(argv)
+
+   if args.command == "migrate":
+      storage = SqliteStorage(args.database)
+      # The track days are only split into shards by the app, until then there is the single file
+      track_days_file = data_utils.track_days_dir if os.path.isdir(data_utils.track_days_dir) else data_utils.data_file
+      days, vehicles, entries = migrate_from_json(
+         storage, track_days_file, data_utils.vehicles_file, data_utils.maintenance_file
+      )
+      storage.close()
+      print(f"Migrated {days} track days, {vehicles} vehicles and {entries} maintenance entries to {args.database}")
+   return 0
+
+if __name__ == "__main__":
+   raise SystemExit(main())
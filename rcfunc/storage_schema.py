@@ -0,0 +1,131 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Schema versions of the stored records and the migrations between them.
+# License: TBD
+
+import uuid
+from datetime import datetime
+
+# Version of the records written by this version of the application.
+# The vehicles and maintenance entries files carry it in a header field, the track day
+# shards in their manifest and SQLite databases as PRAGMA user_version. Files from before
+# versioning are version 0.
+SCHEMA_VERSION = 3
+VERSION_KEY = "schema_version"
+
+TRACK_DAY_FIELDS = ("track", "date", "organizer", "vehicle")
+SESSION_FIELDS = ("session_number", "laps", "vehicle", "weather", "tire_type", "tire_status", "best_lap_time", "comments")
+MAINTENANCE_ENTRY_FIELDS = ("title", "vehicle", "date", "duration", "description", "handbook_ref")
+
+def new_id():
+   """Get a new unique id for a stored record."""
+   return uuid.uuid4().hex
+
+def _text(value):
+   return "" if value is None else str(value)
+
+def _with_text_fields(record, fields):
+   record = dict(record) if isinstance(record, dict) else {}
+   for name in fields:
+      record[name] = _text(record.get(name))
+   return record
+
+# Version 0 -> 1: every field is present and text, laps and session numbers included,
+# tags are a list and every vehicle has type, year and misc.
+def _session_v0(session):
+   return _with_text_fields(session, SESSION_FIELDS)
+
+def _track_day_v0(track_day):
+   sessions = track_day.get("sessions") if isinstance(track_day, dict) else None
+   track_day = _with_text_fields(track_day, TRACK_DAY_FIELDS)
+   track_day["sessions"] = [_session_v0(session) for session in sessions or []]
+   return track_day
+
+def _track_day_header_v0(header):
+   return _with_text_fields(header, TRACK_DAY_FIELDS)
+
+def _maintenance_entry_v0(entry):
+   tags = entry.get("tags") if isinstance(entry, dict) else None
+   entry = _with_text_fields(entry, MAINTENANCE_ENTRY_FIELDS)
+   entry["tags"] = [_text(tag) for tag in tags] if isinstance(tags, list) else []
+   return entry
+
+def _vehicle_v0(vehicle):
+   vehicle = dict(vehicle) if isinstance(vehicle, dict) else {}
+   vehicle["type"] = _text(vehicle.get("type")) or "Car"
+   try:
+      vehicle["year"] = int(vehicle.get("year"))
+   except (TypeError, ValueError):
+      vehicle["year"] = datetime.now().year
+   vehicle["misc"] = _text(vehicle.get("misc"))
+   return vehicle
+
+# Version 1 -> 2: track days and sessions have a unique id.
+def _with_id(record):
+   return dict(record, id=record.get("id") or new_id())
+
+def _session_v1(session):
+   return _with_id(session)
+
+def _track_day_v1(track_day):
+   track_day = _with_id(track_day)
+   track_day["sessions"] = [_session_v1(session) for session in track_day["sessions"]]
+   return track_day
+
+def _track_day_header_v1(header):
+   return _with_id(header)
+
+# Version 2 -> 3: maintenance entries have a unique id.
+def _maintenance_entry_v2(entry):
+   return _with_id(entry)
+
+# Record migrations by record kind and the version they upgrade from, a kind without a
+# migration from a version is unchanged by it
+MIGRATIONS = {
+   "track_day": {0: _track_day_v0, 1: _track_day_v1},
+   # Track day without its sessions, like the SQLite track_days rows
+   "track_day_header": {0: _track_day_header_v0, 1: _track_day_header_v1},
+   "session": {0: _session_v0, 1: _session_v1},
+   "maintenance_entry": {0: _maintenance_entry_v0, 2: _maintenance_entry_v2},
+   "vehicle": {0: _vehicle_v0},
+}
+
+def file_version(data):
+   """Get the schema version of the content of a storage file."""
+   if isinstance(data, dict):
+      return data.get(VERSION_KEY, 0)
+   return 0
+
+def check_version(version, source):
+   """Raise a ValueError for storage written by a newer version of the application."""
+   if version > SCHEMA_VERSION:
+      raise ValueError(f"{source} has schema version {version}, this version supports up to {SCHEMA_VERSION}")
+
+def needs_upgrade(version):
+   return version < SCHEMA_VERSION
+
+def upgrade_records(kind, records, version):
+   """Upgrade a list of records of a kind from version to SCHEMA_VERSION, in place.
+
+   All migration steps are applied to one record before moving on to the next, so the
+   records are walked only once however old they are.
+   """
+   migrations = MIGRATIONS[kind]
+   steps = [migrations[step_version] for step_version in range(version, SCHEMA_VERSION) if step_version in migrations]
+   if steps:
+      for position, record in enumerate(records):
+         for step in steps:
+            record = step(record)
+         records[position] = record
+   return records
+
+def upgrade_vehicles(vehicles, vehicle_data, version):
+   """Upgrade the vehicle list and vehicle data from version to SCHEMA_VERSION."""
+   if not needs_upgrade(version):
+      return vehicles, vehicle_data
+   vehicles = [_text(name) for name in vehicles or []]
+   vehicle_data = dict(vehicle_data or {})
+   # Every vehicle gets its data, also the ones that never had any
+   names = list(dict.fromkeys(vehicles + list(vehicle_data)))
+   upgraded = upgrade_records("vehicle", [vehicle_data.get(name) for name in names], version)
+   return vehicles, dict(zip(names, upgraded))
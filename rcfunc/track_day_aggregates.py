@@ -0,0 +1,192 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Pre-aggregated cube of the track days over vehicle, year, track and weather, kept up to date by track day mutations.
+# License: TBD
+
+import bisect
+import itertools
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+DIMENSIONS = ("vehicle", "year", "track", "weather")
+
+def _year(text):
+   year = text[:4]
+   return year if year.isdigit() else None
+
+def _int(text):
+   try:
+      return int(text)
+   except ValueError:
+      return 0
+
+@dataclass
+class CubeCell:
+   """Totals of the sessions of a vehicle, year, track and weather"""
+   # Track days with a session in the weather
+   days: int = 0
+   sessions: int = 0
+   laps: int = 0
+   # (best lap in milliseconds, sequence number) of the sessions with a lap time, sorted
+   best_laps: List[Tuple[int, int]] = field(default_factory=list)
+
+@dataclass
+class CubeTotals:
+   """Sum of the cube cells matching a filter"""
+   days: int = 0
+   sessions: int = 0
+   laps: int = 0
+   # (best lap in milliseconds, sequence number) of the fastest session, see TrackDayCube.session()
+   best_lap: Optional[Tuple[int, int]] = None
+
+class TrackDayCube:
+   """Days, sessions, laps and best laps of the track days by vehicle, year, track and weather.
+
+   cells are keyed by (vehicle, year, track, weather), days_by_track by (vehicle, year, track)
+   for the number of track days without a weather, since a track day can have sessions in
+   several. Years are the first four digits of the date, None for track days without a valid
+   date. Any combination of filters is answered by summing the matching cells, see totals() and
+   totals_by().
+
+   Track day mutations are applied with apply_journal_record() as deltas of the changed track
+   day. Every track day and its contribution are kept by track day id, to take the contribution
+   back out when the track day changes. Sessions with a lap time get a sequence number in the
+   order they were added, the first of equally fast sessions is the best.
+   """
+
+   def __init__(self, track_days=()):
+      self.cells = {}
+      self.days_by_track = {}
+      # Track days and their contributions by track day id
+      self._track_days = {}
+      self._contributions = {}
+      # Track day and session by sequence number
+      self._sessions = {}
+      self._sequence = itertools.count()
+      for track_day in track_days:
+         self.append(track_day)
+
+   def __len__(self):
+      """Number of track days."""
+      return len(self._contributions)
+
+   def session(self, best_lap):
+      """Get the track day and session of a best lap of CubeTotals."""
+      return self._sessions[best_lap[1]]
+
+   def _contribution(self, track_day):
+      """Get the day key and the (sessions, laps, best laps) of every weather of a track day."""
+      day_key = (track_day.vehicle, _year(track_day.date), track_day.track)
+      weather = {}
+      for session in track_day.sessions:
+         totals = weather.setdefault(session.weather, [0, 0, []])
+         totals[0] += 1
+         totals[1] += _int(session.laps)
+         if session.best_lap_ms is not None:
+            sequence = next(self._sequence)
+            self._sessions[sequence] = (track_day, session)
+            totals[2].append((session.best_lap_ms, sequence))
+      return day_key, weather
+
+   def _add(self, contribution):
+      day_key, weather = contribution
+      self.days_by_track[day_key] = self.days_by_track.get(day_key, 0) + 1
+      for weather_type, (sessions, laps, best_laps) in weather.items():
+         cell = self.cells.get(day_key + (weather_type,))
+         if cell is None:
+            cell = self.cells[day_key + (weather_type,)] = CubeCell()
+         cell.days += 1
+         cell.sessions += sessions
+         cell.laps += laps
+         for best_lap in best_laps:
+            bisect.insort(cell.best_laps, best_lap)
+
+   def _subtract(self, contribution):
+      day_key, weather = contribution
+      self.days_by_track[day_key] -= 1
+      if not self.days_by_track[day_key]:
+         del self.days_by_track[day_key]
+      for weather_type, (sessions, laps, best_laps) in weather.items():
+         key = day_key + (weather_type,)
+         cell = self.cells[key]
+         cell.days -= 1
+         cell.sessions -= sessions
+         cell.laps -= laps
+         for best_lap in best_laps:
+            del cell.best_laps[bisect.bisect_left(cell.best_laps, best_lap)]
+            del self._sessions[best_lap[1]]
+         if not cell.days:
+            del self.cells[key]
+
+   def append(self, track_day):
+      contribution = self._contribution(track_day)
+      self._track_days[track_day.id] = track_day
+      self._contributions[track_day.id] = contribution
+      self._add(contribution)
+
+   def update(self, track_day_id):
+      """Recompute the contribution of a track day changed in place."""
+      self._subtract(self._contributions[track_day_id])
+      self._contributions[track_day_id] = self._contribution(self._track_days[track_day_id])
+      self._add(self._contributions[track_day_id])
+
+   def remove(self, track_day_id):
+      del self._track_days[track_day_id]
+      self._subtract(self._contributions.pop(track_day_id))
+
+   def apply_journal_record(self, record, track_days):
+      """Follow a track day mutation (see data_utils.apply_journal_record), already applied to track_days."""
+      op = record.get("op")
+      if op == "create_track_day":
+         self.append(record["track_day"])
+      elif op == "delete_track_day":
+         self.remove(record["track_day_id"])
+      elif op in ("add_session", "update_session"):
+         self.update(record["track_day_id"])
+      elif op == "add_bulk":
+         for track_day in record["track_days"]:
+            self.append(track_day)
+         for track_day_id in record["sessions"]:
+            self.update(track_day_id)
+      else:
+         raise ValueError(f"Unknown journal operation: {op}")
+
+   @staticmethod
+   def _filter(vehicle=None, year=None, track=None, weather=None):
+      """Get the (position, value) of the dimensions to match, empty filters match everything."""
+      if year:
+         year = str(year) if str(year).isdigit() else None
+         return [(position, value) for position, value in enumerate((vehicle, year, track, weather)) if value or position == 1]
+      return [(position, value) for position, value in enumerate((vehicle, year, track, weather)) if value]
+
+   def totals_by(self, dimension=None, vehicle=None, year=None, track=None, weather=None):
+      """Get the CubeTotals of the cells matching the filters, by value of dimension (or None).
+
+      Days grouped or filtered by weather are the track days with a session in the weather.
+      """
+      conditions = self._filter(vehicle, year, track, weather)
+      position = DIMENSIONS.index(dimension) if dimension else None
+      totals = {}
+      for key, cell in self.cells.items():
+         if all(key[index] == value for index, value in conditions):
+            group = totals.get(key[position] if dimension else None)
+            if group is None:
+               group = totals[key[position] if dimension else None] = CubeTotals()
+            group.sessions += cell.sessions
+            group.laps += cell.laps
+            if cell.best_laps and (group.best_lap is None or cell.best_laps[0] < group.best_lap):
+               group.best_lap = cell.best_laps[0]
+            if weather or dimension == "weather":
+               group.days += cell.days
+      if not weather and dimension != "weather":
+         for key, days in self.days_by_track.items():
+            if all(key[index] == value for index, value in conditions):
+               group = totals.get(key[position] if dimension else None)
+               if group is None:
+                  group = totals[key[position] if dimension else None] = CubeTotals()
+               group.days += days
+      return totals
+
+   def totals(self, vehicle=None, year=None, track=None, weather=None):
+      """Get the CubeTotals of the cells matching the filters."""
+      return self.totals_by(None, vehicle, year, track, weather).get(None, CubeTotals())
@@ -0,0 +1,249 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Header index for the track day file, with session lists read on demand.
+# License: TBD
+
+import itertools
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import ExitStack
+
+from rcfunc.binary_snapshot import load_json, write_binary
+from rcfunc.track_day_models import Session, TrackDay
+
+# The index '<data file>.index' holds the header fields of every track day plus the byte
+# range of its session list in the data file, so headers load without parsing sessions.
+INDEX_SUFFIX = ".index"
+INDEX_VERSION = 1
+
+def index_file_for(filename):
+   return filename + INDEX_SUFFIX
+
+def _file_identity(filename):
+   stat = os.stat(filename)
+   return [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+# Slot holding the sessions of a track day, set only while a lazy track day has them loaded
+_sessions_slot = TrackDay.__dict__["sessions"]
+
+class LazyTrackDay(TrackDay):
+   """Track day holding only its headers until its sessions are accessed."""
+
+   __slots__ = ("_store", "_offset", "_length", "_pinned")
+
+   def __init__(self, header, store, offset, length):
+      self._set_header(header)
+      self._store = store
+      self._offset = offset
+      self._length = length
+      self._pinned = False
+
+   @property
+   def sessions(self):
+      try:
+         sessions = _sessions_slot.__get__(self)
+      except AttributeError:
+         return self._store.load(self)
+      self._store.touch(self)
+      return sessions
+
+   @sessions.setter
+   def sessions(self, sessions):
+      _sessions_slot.__set__(self, sessions)
+
+   def sessions_loaded(self):
+      try:
+         _sessions_slot.__get__(self)
+      except AttributeError:
+         return False
+      return True
+
+   def _drop_sessions(self):
+      try:
+         _sessions_slot.__delete__(self)
+      except AttributeError:
+         pass
+
+def pin_sessions(track_day):
+   """Keep the sessions of a modified track day resident until the next snapshot write."""
+   if isinstance(track_day, LazyTrackDay):
+      track_day._store.pin(track_day)
+
+def peek_sessions(track_day):
+   """Get the sessions of a track day from a thread other than the one owning the track days.
+
+   Sessions that aren't loaded are parsed from the data file without keeping them, so no
+   session list is loaded or dropped and the recently used ones stay the same.
+   """
+   if not isinstance(track_day, LazyTrackDay):
+      return list(track_day.sessions)
+   with track_day._store.lock:
+      if track_day.sessions_loaded():
+         return list(_sessions_slot.__get__(track_day))
+      return [Session.from_dict(session) for session in json.loads(track_day._store.read_sessions(track_day))]
+
+class SessionStore:
+   """Reads session lists of lazy track days from the data file.
+
+   At most max_resident session lists stay loaded, the least recently used one is dropped
+   first. Pinned (modified) session lists don't count and are never dropped.
+   """
+
+   def __init__(self, filename, max_resident=50):
+      self.filename = filename
+      # The session list being accessed must never be the one dropped
+      self.max_resident = max(max_resident, 1)
+      self.lock = threading.RLock()
+      self.loads = 0
+      self._identity = None
+      self._resident = OrderedDict()
+      # Pinning numbers tell a snapshot write whether a track day was modified after the snapshot
+      self._pins = itertools.count(1)
+
+   def load_headers(self):
+      """Get lazy track days from the index, or None if there is no index matching the data file."""
+      try:
+         index = load_json(index_file_for(self.filename))
+         identity = _file_identity(self.filename)
+      except (OSError, ValueError):
+         return None
+      if index.get("version") != INDEX_VERSION or index.get("identity") != identity:
+         return None
+      with self.lock:
+         self._identity = identity
+         self._resident.clear()
+      return [
+         TrackDay.from_dict(header) if offset is None else LazyTrackDay(header, self, offset, length)
+         for header, offset, length in index["track_days"]
+      ]
+
+   def read_sessions(self, track_day):
+      """Get the raw JSON of the session list of a track day in the data file."""
+      with self.lock:
+         if _file_identity(self.filename) != self._identity:
+            raise RuntimeError(f"Track day file changed on disk: {self.filename}")
+         with open(self.filename, "rb") as file:
+            file.seek(track_day._offset)
+            return file.read(track_day._length)
+
+   def load(self, track_day):
+      with self.lock:
+         if track_day.sessions_loaded():
+            sessions = _sessions_slot.__get__(track_day)
+         else:
+            sessions = [Session.from_dict(session) for session in json.loads(self.read_sessions(track_day))]
+            track_day.sessions = sessions
+            self.loads += 1
+         self._touch(track_day)
+         return sessions
+
+   def touch(self, track_day):
+      # Recency is best effort, don't wait for a snapshot write holding the lock
+      if self.lock.acquire(blocking=False):
+         try:
+            self._touch(track_day)
+         finally:
+            self.lock.release()
+
+   def _touch(self, track_day, evict=True):
+      if track_day._pinned:
+         return
+      self._resident[id(track_day)] = track_day
+      self._resident.move_to_end(id(track_day))
+      while evict and len(self._resident) > self.max_resident:
+         _, oldest = self._resident.popitem(last=False)
+         oldest._drop_sessions()
+
+   def pin(self, track_day):
+      with self.lock:
+         self.load(track_day)
+         track_day._pinned = next(self._pins)
+         self._resident.pop(id(track_day), None)
+
+   def resident_count(self):
+      with self.lock:
+         return len(self._resident)
+
+def snapshot_track_days(track_days):
+   """Get the stored form of track days for write_track_day_snapshot().
+
+   Taken on the thread modifying the track days, so the snapshot can be written on another.
+   Session lists are serialized right away, except those of lazy track days that weren't
+   modified: they are copied from the data file when the snapshot is written.
+   """
+   snapshot = []
+   for day in track_days:
+      if isinstance(day, LazyTrackDay) and not day._pinned:
+         sessions = None
+      else:
+         sessions = json.dumps([session.to_dict() for session in day.sessions]).encode()
+      snapshot.append((day, day.header_dict(), sessions, getattr(day, "_pinned", False)))
+   return snapshot
+
+def write_snapshot(track_days, filename):
+   """Write track days, one per line, and the header index next to the data file."""
+   write_track_day_snapshot(snapshot_track_days(track_days), filename)
+
+def write_track_day_snapshot(snapshot, filename):
+   """Write a snapshot_track_days() snapshot, one track day per line, and the header index."""
+   stores = {day._store for day, *_ in snapshot if isinstance(day, LazyTrackDay)}
+   with ExitStack() as stack:
+      # Lazy track days can't be loaded, dropped or modified while their byte ranges move
+      for store in stores:
+         stack.enter_context(store.lock)
+
+      directory = os.path.dirname(filename)
+      os.makedirs(directory, exist_ok=True)
+      fd, tmp_filename = tempfile.mkstemp(dir=directory, prefix=os.path.basename(filename), suffix=".tmp")
+      entries = []
+      try:
+         with os.fdopen(fd, "wb") as file:
+            file.write(b"[")
+            for position, (day, header, sessions, _) in enumerate(snapshot):
+               file.write(b"\n" if position == 0 else b",\n")
+               if sessions is None:
+                  sessions = day._store.read_sessions(day)
+               file.write(json.dumps(header)[:-1].encode() + b', "sessions": ')
+               entries.append([header, file.tell(), len(sessions)])
+               file.write(sessions + b"}")
+            file.write(b"\n]\n")
+            file.flush()
+            os.fsync(file.fileno())
+         os.replace(tmp_filename, filename)
+      except BaseException:
+         os.remove(tmp_filename)
+         raise
+
+      identity = _file_identity(filename)
+      _write_index({"version": INDEX_VERSION, "identity": identity, "track_days": entries}, filename)
+
+      for store in stores:
+         if store.filename == filename:
+            store._identity = identity
+      for (day, _, _, pinned), (_, offset, length) in zip(snapshot, entries):
+         store = getattr(day, "_store", None)
+         if store and store.filename == filename:
+            day._offset = offset
+            day._length = length
+            # Track days modified after the snapshot stay pinned, the file has their old sessions
+            if day._pinned and day._pinned == pinned:
+               day._pinned = False
+               # Only the UI thread drops session lists, it may be modifying this one right now
+               store._touch(day, evict=False)
+
+def _write_index(index, filename):
+   index_file = index_file_for(filename)
+   fd, tmp_filename = tempfile.mkstemp(dir=os.path.dirname(filename), prefix=os.path.basename(index_file), suffix=".tmp")
+   try:
+      with os.fdopen(fd, "w") as file:
+         json.dump(index, file)
+         file.flush()
+         os.fsync(file.fileno())
+      os.replace(tmp_filename, index_file)
+   except BaseException:
+      os.remove(tmp_filename)
+      raise
+   write_binary(index, index_file)
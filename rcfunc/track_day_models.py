@@ -0,0 +1,151 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Track day and session model classes.
+# License: TBD
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from rcfunc.storage_schema import SESSION_FIELDS, TRACK_DAY_FIELDS, new_id
+
+_SESSION_FIELDS = frozenset(SESSION_FIELDS + ("id",))
+_TRACK_DAY_FIELDS = frozenset(TRACK_DAY_FIELDS + ("id", "sessions"))
+
+def parse_lap_time(lap_time: str) -> Optional[int]:
+   """Parse a lap time in format mm:ss.sss or ss.sss into milliseconds, None if it isn't one."""
+   minutes, _, seconds = lap_time.rpartition(":")
+   try:
+      milliseconds = round(float(seconds) * 1000)
+      if minutes:
+         milliseconds += int(minutes) * 60000
+   except (ValueError, OverflowError):
+      return None
+   return milliseconds
+
+def _extra_fields(data, fields):
+   """Get the fields of a stored record unknown to this version, or None."""
+   if data.keys() <= fields:
+      return None
+   return {key: value for key, value in data.items() if key not in fields}
+
+@dataclass(slots=True)
+class Session:
+   """A session of a track day"""
+   session_number: str = ""
+   laps: str = ""
+   vehicle: str = ""
+   weather: str = ""
+   tire_type: str = ""
+   tire_status: str = ""
+   best_lap_time: str = ""
+   comments: str = ""
+   # Unique and persistent, set when the session is created
+   id: str = field(default_factory=new_id)
+   # Stored fields unknown to this version, kept so that to_dict() gives back what was loaded
+   extra: Optional[Dict[str, Any]] = None
+   # best_lap_time in milliseconds, None if it isn't a lap time. Not stored, kept in sync by update()
+   best_lap_ms: Optional[int] = field(default=None, init=False, compare=False, repr=False)
+
+   def __post_init__(self):
+      self.best_lap_ms = parse_lap_time(self.best_lap_time)
+
+   def to_dict(self) -> Dict[str, Any]:
+      """Convert to dictionary in the stored format"""
+      data = {
+         "id": self.id,
+         "session_number": self.session_number,
+         "laps": self.laps,
+         "vehicle": self.vehicle,
+         "weather": self.weather,
+         "tire_type": self.tire_type,
+         "tire_status": self.tire_status,
+         "best_lap_time": self.best_lap_time,
+         "comments": self.comments
+      }
+      if self.extra:
+         data.update(self.extra)
+      return data
+
+   @classmethod
+   def from_dict(cls, data: Dict[str, Any]) -> 'Session':
+      """Create from a stored dictionary"""
+      return cls(
+         session_number=data.get("session_number", ""),
+         laps=data.get("laps", ""),
+         vehicle=data.get("vehicle", ""),
+         weather=data.get("weather", ""),
+         tire_type=data.get("tire_type", ""),
+         tire_status=data.get("tire_status", ""),
+         best_lap_time=data.get("best_lap_time", ""),
+         comments=data.get("comments", ""),
+         id=data.get("id") or new_id(),
+         extra=_extra_fields(data, _SESSION_FIELDS)
+      )
+
+   def update(self, data: Dict[str, Any]) -> None:
+      """Update fields from a (partial) dictionary in the stored format, the id stays"""
+      for key, value in data.items():
+         if key == "id":
+            continue
+         if key in _SESSION_FIELDS:
+            setattr(self, key, value)
+         else:
+            if self.extra is None:
+               self.extra = {}
+            self.extra[key] = value
+      if "best_lap_time" in data:
+         self.best_lap_ms = parse_lap_time(self.best_lap_time)
+
+@dataclass(slots=True)
+class TrackDay:
+   """A track day with its sessions"""
+   track: str = ""
+   date: str = ""
+   organizer: str = ""
+   vehicle: str = ""
+   sessions: List[Session] = field(default_factory=list)
+   # Unique and persistent, set when the track day is created
+   id: str = field(default_factory=new_id)
+   # Stored fields unknown to this version, kept so that to_dict() gives back what was loaded
+   extra: Optional[Dict[str, Any]] = None
+
+   def header_dict(self) -> Dict[str, Any]:
+      """Convert to dictionary in the stored format, without the sessions"""
+      data = {
+         "id": self.id,
+         "track": self.track,
+         "date": self.date,
+         "organizer": self.organizer,
+         "vehicle": self.vehicle
+      }
+      if self.extra:
+         data.update(self.extra)
+      return data
+
+   def to_dict(self) -> Dict[str, Any]:
+      """Convert to dictionary in the stored format"""
+      data = self.header_dict()
+      data["sessions"] = [session.to_dict() for session in self.sessions]
+      return data
+
+   def _set_header(self, data: Dict[str, Any]) -> None:
+      self.id = data.get("id") or new_id()
+      self.track = data.get("track", "")
+      self.date = data.get("date", "")
+      self.organizer = data.get("organizer", "")
+      self.vehicle = data.get("vehicle", "")
+      self.extra = _extra_fields(data, _TRACK_DAY_FIELDS)
+
+   @classmethod
+   def from_dict(cls, data: Dict[str, Any]) -> 'TrackDay':
+      """Create from a stored dictionary"""
+      track_day = cls.__new__(cls)
+      track_day._set_header(data)
+      track_day.sessions = [Session.from_dict(session) for session in data.get("sessions") or []]
+      return track_day
+
+def encode_model(value):
+   """json.dumps() default, encoding track days and sessions in their stored format."""
+   if isinstance(value, (TrackDay, Session)):
+      return value.to_dict()
+   raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -1,33 +1,84 @@
 # TODO: File header here 
 
+import bisect
+import heapq
+
+from rcfunc.result_cache import ResultCache
+from rcfunc.track_day_aggregates import TrackDayCube
+
+
 class TrackDayReportMngr:
-    def __init__(self, track_days, vehicles):
+    def __init__(self, track_days, vehicles, shards=None, data_version=None):
         self.track_days = track_days
         self.vehicles = vehicles
+        # Manifest entries of the track day shards, used instead of scanning track_days if set
+        self.shards = shards
+        # Reports by arguments, for the data version (like DataStore.version) they were generated for
+        self._cache = ResultCache(data_version)
+
+    @property
+    def track_days(self):
+        return self._track_days
+
+    @track_days.setter
+    def track_days(self, track_days):
+        # Journal records only describe changes of the list the cube was built from
+        self._track_days = track_days
+        self._cube = None
+
+    def get_cube(self):
+        """Get the TrackDayCube of the track days, built on first use and kept up to date by track_days_changed()."""
+        if self._cube is None or len(self._cube) != len(self.track_days):
+            self._cube = TrackDayCube(self.track_days)
+        return self._cube
+
+    def track_days_changed(self, record=None):
+        """Follow a journaled track day mutation, or rebuild the cube on next use if record is None."""
+        if record is None:
+            self._cube = None
+        elif self._cube is not None:
+            self._cube.apply_journal_record(record, self.track_days)
 
     def get_available_years(self, vehicle=None):
+        if self.shards is not None:
+            return sorted({s["year"] for s in self.shards if s["year"] and (not vehicle or s["vehicle"] == vehicle)})
         years = set()
         for day in self.track_days:
-            if vehicle and day.get("vehicle") != vehicle:
+            if vehicle and day.vehicle != vehicle:
                 continue
-            date = day.get("date", "")
+            date = day.date
             if date and len(date) >= 4:
                 years.add(date[:4])
         return sorted(years)
 
     def get_available_tracks(self, vehicle=None, year=None):
+        if self.shards is not None:
+            return sorted({
+                t for s in self.shards
+                if (not vehicle or s["vehicle"] == vehicle) and (not year or s["year"] == str(year))
+                for t in s["tracks"]
+            })
         tracks = set()
         for day in self.track_days:
-            if vehicle and day.get("vehicle") != vehicle:
+            if vehicle and day.vehicle != vehicle:
                 continue
-            if year and not day.get("date", "").startswith(str(year)):
+            if year and not day.date.startswith(str(year)):
                 continue
-            track = day.get("track", "")
+            track = day.track
             if track:
                 tracks.add(track)
         return sorted(tracks)
 
     def generate_report(self, report_type, vehicle=None, year=None, track=None, track_day=None):
+        """Generate a report, cached until the data version changes."""
+        key = (report_type, vehicle, year, track, track_day.id if track_day is not None else None)
+        return self._cache.get(key, lambda: self._generate_report(report_type, vehicle, year, track, track_day))
+
+    def cache_info(self):
+        """Get the hits and misses of the report cache."""
+        return self._cache.info()
+
+    def _generate_report(self, report_type, vehicle, year, track, track_day):
         if report_type == "summary":
             return self._generate_summary(vehicle, year, track)
         elif report_type == "extensive":
@@ -49,18 +100,18 @@ class TrackDayReportMngr:
         report_lines = ["Summary Report: All Vehicles\n"]
         for v in self.vehicles:
             report_lines.append(f"Vehicle: {v}")
-            vehicle_days = [d for d in self.track_days if d.get("vehicle") == v]
-            years = sorted({d.get("date", "")[:4] for d in vehicle_days if d.get("date", "")})
+            vehicle_days = [d for d in self.track_days if d.vehicle == v]
+            years = sorted({d.date[:4] for d in vehicle_days if d.date})
             total_days = len(vehicle_days)
             total_laps = sum(self._count_laps(d) for d in vehicle_days)
-            unique_tracks = sorted({d.get("track", "") for d in vehicle_days if d.get("track", "")})
+            unique_tracks = sorted({d.track for d in vehicle_days if d.track})
             report_lines.append(f"  Total Track Days: {total_days}")
             report_lines.append(f"  Total Laps: {total_laps}")
             report_lines.append(f"  Unique Tracks Visited: {len(unique_tracks)} ({', '.join(unique_tracks)})")
             for y in years:
-                year_days = [d for d in vehicle_days if d.get("date", "").startswith(y)]
+                year_days = [d for d in vehicle_days if d.date.startswith(y)]
                 year_laps = sum(self._count_laps(d) for d in year_days)
-                year_tracks = sorted({d.get("track", "") for d in year_days if d.get("track", "")})
+                year_tracks = sorted({d.track for d in year_days if d.track})
                 report_lines.append(f"    Year {y}:")
                 report_lines.append(f"      Track Days: {len(year_days)}")
                 report_lines.append(f"      Laps: {year_laps}")
@@ -69,116 +120,71 @@ class TrackDayReportMngr:
         return "\n".join(report_lines)
 
     def _generate_vehicle_year_summary(self, vehicle=None, year=None, track=None):
+      # Totals and best laps are summed from the cells of the track day cube
+      cube = self.get_cube()
+
       # Special case: summary + track only (vehicle and year empty, track set)
       if (not vehicle or vehicle.strip() == "") and (not year or year.strip() == "") and (track and track.strip() != ""):
-         days = [d for d in self.track_days if d.get("track") == track]
-         years_visited = sorted({d.get("date", "")[:4] for d in days if d.get("date", "")})
+         years_visited = sorted(y for y in cube.totals_by("year", track=track) if y)
          num_years_visited = len(years_visited)
-         vehicles_used = sorted({d.get("vehicle", "") for d in days if d.get("vehicle", "")})
+         vehicles_used = sorted(v for v in cube.totals_by("vehicle", track=track) if v)
          num_vehicles = len(vehicles_used)
-         total_days = len(days)
-
-         # Find best lap time and session details
-         best_lap = None
-         best_lap_data = None
-         for d in days:
-               for s in d.get("sessions", []):
-                  lap_time = s.get("best_lap_time")
-                  if lap_time and (best_lap is None or self._compare_lap_times(lap_time, best_lap)):
-                     best_lap = lap_time
-                     best_lap_data = {
-                           "date": d.get("date", ""),
-                           "vehicle": d.get("vehicle", ""),
-                           "tire_type": s.get("tire_type", ""),
-                           "tire_status": s.get("tire_status", "")
-                     }
+         totals = cube.totals(track=track)
 
          report = f"Summary for Track '{track}':\n"
          report += f"  Years Visited: {num_years_visited} ({', '.join(years_visited)})\n"
          report += f"  Number of Vehicles: {num_vehicles} ({', '.join(vehicles_used)})\n"
-         report += f"  Number of Days: {total_days}\n"
-         if best_lap:
-               report += f"  Best Lap Time: {best_lap} (Date: {best_lap_data['date']}, Vehicle: {best_lap_data['vehicle']}, Tire: {best_lap_data['tire_type']} {best_lap_data['tire_status']})\n"
+         report += f"  Number of Days: {totals.days}\n"
+         if totals.best_lap:
+               d, s = cube.session(totals.best_lap)
+               report += f"  Best Lap Time: {s.best_lap_time} (Date: {d.date}, Vehicle: {d.vehicle}, Tire: {s.tire_type} {s.tire_status})\n"
          else:
                report += "  Best Lap Time: N/A\n"
          return report
 
       # Regular filtering for other cases
-      days = [
-         d for d in self.track_days
-         if (not vehicle or d.get("vehicle") == vehicle)
-         and (not year or d.get("date", "").startswith(str(year)))
-         and (not track or d.get("track") == track)
-      ]
-      total_days = len(days)
-      total_sessions = sum(len(d.get("sessions", [])) for d in days)
-      total_laps = sum(self._count_laps(d) for d in days)
-      years_used = sorted({d.get("date", "")[:4] for d in days if d.get("date", "")})
+      totals = cube.totals(vehicle, year, track)
+      years_used = sorted(y for y in cube.totals_by("year", vehicle, year, track) if y)
       num_years_used = len(years_used)
 
-      # Find best lap time and session details
-      best_lap = None
-      best_lap_data = None
-      for d in days:
-         for s in d.get("sessions", []):
-               lap_time = s.get("best_lap_time")
-               if lap_time and (best_lap is None or self._compare_lap_times(lap_time, best_lap)):
-                  best_lap = lap_time
-                  best_lap_data = {
-                     "date": d.get("date", ""),
-                     "session_number": s.get("session_number", ""),
-                     "laps": s.get("laps", ""),
-                     "weather": s.get("weather", ""),
-                     "tire_type": s.get("tire_type", ""),
-                     "tire_status": s.get("tire_status", "")
-                  }
-
       report = f"Summary for {vehicle or 'All Vehicles'}"
       if year:
          report += f" in {year}"
       if track:
          report += f" on {track}"
       report += ":\n"
-      report += f"  Track Days: {total_days}\n"
-      report += f"  Sessions: {total_sessions}\n"
-      report += f"  Total Laps: {total_laps}\n"
+      report += f"  Track Days: {totals.days}\n"
+      report += f"  Sessions: {totals.sessions}\n"
+      report += f"  Total Laps: {totals.laps}\n"
       if not year:
          report += f"  Years Used: {num_years_used} ({', '.join(years_used)})\n"
 
       if track:
-         if best_lap:
-               report += f"  Best Lap Time: {best_lap} (Date: {best_lap_data['date']}, Session: {best_lap_data['session_number']}, Weather: {best_lap_data['weather']}, Tire: {best_lap_data['tire_type']} {best_lap_data['tire_status']})\n"
+         if totals.best_lap:
+               d, s = cube.session(totals.best_lap)
+               report += f"  Best Lap Time: {s.best_lap_time} (Date: {d.date}, Session: {s.session_number}, Weather: {s.weather}, Tire: {s.tire_type} {s.tire_status})\n"
          else:
                report += "  Best Lap Time: N/A\n"
       else:
-         unique_tracks = sorted({d.get("track", "") for d in days if d.get("track", "")})
+         unique_tracks = sorted(t for t in cube.totals_by("track", vehicle, year, track) if t)
          report += f"  Unique Tracks Visited: {len(unique_tracks)} ({', '.join(unique_tracks)})\n"
 
       return report
 
-    def _compare_lap_times(self, lap1, lap2):
-      """Compare lap times in format mm:ss.sss or ss.sss. Returns True if lap1 is better (lower) than lap2."""
-      def parse_lap(lap):
-         parts = lap.split(":")
-         if len(parts) == 2:
-               minutes = int(parts[0])
-               seconds = float(parts[1])
-               return minutes * 60 + seconds
-         try:
-               return float(lap)
-         except Exception:
-               return float('inf')
-      return parse_lap(lap1) < parse_lap(lap2)
+    @staticmethod
+    def _lap_ms(session):
+      """Best lap time of a session in milliseconds, lap times that can't be parsed are slowest."""
+      return session.best_lap_ms if session.best_lap_ms is not None else float('inf')
 
     def _count_laps(self, track_day):
         # Count laps for all sessions in a track day
-        return sum(int(s.get("laps", 0)) for s in track_day.get("sessions", []) if s.get("laps"))
+        return sum(int(s.laps) for s in track_day.sessions if s.laps)
 
     def _get_tire_progression(self, sessions):
       tire_map = {}
       for s in sessions:
-         tire = s.get("tire_type", "Unknown")
-         status = s.get("tire_status", "Unknown")
+         tire = s.tire_type
+         status = s.tire_status
          if tire not in tire_map:
                tire_map[tire] = []
          tire_map[tire].append(status)
@@ -191,56 +197,62 @@ class TrackDayReportMngr:
       return progression
     
     def _get_lap_progression(self, sessions):
-      lap_times = []
-      for s in sessions:
-         lap_time = s.get("best_lap_time")
-         if lap_time:
-               lap_times.append((lap_time, s.get("session_number", "N/A")))
-      if not lap_times:
+      timed = [s for s in sessions if s.best_lap_time]
+      if not timed:
          return None, None, None, None, None  # <-- Return 5 values!
       # Sort lap times from worst (highest) to best (lowest)
-      lap_times_sorted = sorted(lap_times, key=lambda x: self._parse_lap_time(x[0]), reverse=True)
-      worst_lap, worst_session = lap_times_sorted[0]
-      best_lap, best_session = lap_times_sorted[-1]
-      diff = self._parse_lap_time(worst_lap) - self._parse_lap_time(best_lap)
-      return worst_lap, worst_session, best_lap, best_session, diff
-
-    def _parse_lap_time(self, lap):
-      parts = str(lap).split(":")
-      if len(parts) == 2:
-         minutes = int(parts[0])
-         seconds = float(parts[1])
-         return minutes * 60 + seconds
-      try:
-         return float(lap)
-      except Exception:
-         return float('inf')
+      timed.sort(key=self._lap_ms, reverse=True)
+      worst, best = timed[0], timed[-1]
+      diff = (self._lap_ms(worst) - self._lap_ms(best)) / 1000
+      return worst.best_lap_time, worst.session_number, best.best_lap_time, best.session_number, diff
+
+    def track_lap_index(self):
+      """Get the personal best and the sorted best lap times of every track, of all vehicles.
+
+      Built from the cells of the track day cube in one pass. Returns a dict of track to
+      ((best lap ms, sequence number) of the personal best, see TrackDayCube.session(),
+      best lap ms of every session with a lap time, sorted).
+      """
+      cube = self.get_cube()
+      cells_by_track = {}
+      for key, cell in cube.cells.items():
+         if cell.best_laps:
+            cells_by_track.setdefault(key[2], []).append(cell.best_laps)
+      index = {}
+      for track, best_laps in cells_by_track.items():
+         merged = list(heapq.merge(*best_laps))
+         index[track] = (merged[0], [lap_ms for lap_ms, _ in merged])
+      return index
 
     def _generate_extensive(self, vehicle=None):
-      days = [d for d in self.track_days if not vehicle or d.get("vehicle") == vehicle]
+      days = [d for d in self.track_days if not vehicle or d.vehicle == vehicle]
+      # Personal bests are looked up in the index instead of scanning all track days for every day
+      cube = self.get_cube()
+      lap_index = self.track_lap_index()
       report = f"Extensive Report for {vehicle or 'All Vehicles'}:\n"
       for day in days:
-         report += f"- {day.get('track', 'N/A')} on {day.get('date', 'N/A')}: {len(day.get('sessions', []))} sessions\n"
-         report += f"  Organizer: {day.get('organizer', 'N/A')}\n"
-         report += f"  Vehicle: {day.get('vehicle', 'N/A')}\n"
+         report += f"- {day.track} on {day.date}: {len(day.sessions)} sessions\n"
+         report += f"  Organizer: {day.organizer}\n"
+         report += f"  Vehicle: {day.vehicle}\n"
          # Sessions header
          report += "  Sessions:\n"
-         for s in day.get("sessions", []):
+         for s in day.sessions:
                report += (
-                  f"    Session {s.get('session_number', 'N/A')}: "
-                  f"{s.get('laps', 'N/A')} laps, Weather: {s.get('weather', 'N/A')}, "
-                  f"Tire: {s.get('tire_type', 'N/A')} ({s.get('tire_status', 'N/A')}), "
-                  f"Best Lap: {s.get('best_lap_time', 'N/A')}\n"
+                  f"    Session {s.session_number}: "
+                  f"{s.laps} laps, Weather: {s.weather}, "
+                  f"Tire: {s.tire_type} ({s.tire_status}), "
+                  f"Best Lap: {s.best_lap_time}\n"
                )
          # Tire progression header
-         tire_prog = self._get_tire_progression(day.get("sessions", []))
+         tire_prog = self._get_tire_progression(day.sessions)
          if tire_prog:
                report += "  Tire progression:\n"
                for line in tire_prog:
                   report += f"    {line}\n"
          #report += "\n"
 
-         worst_lap, worst_session, best_lap, best_session, diff = self._get_lap_progression(day.get("sessions", []))
+         worst_lap, worst_session, best_lap, best_session, diff = self._get_lap_progression(day.sessions)
+         best_lap_ms = min(map(self._lap_ms, day.sessions), default=None)
          if worst_lap and best_lap:
             report += "  Lap progression:\n"
             report += f"    Worst lap: {worst_lap} (Session {worst_session})\n"
@@ -248,33 +260,28 @@ class TrackDayReportMngr:
             report += f"    Improvement: {diff:.3f} seconds\n"
 
          # Personal best on this track (across all sessions)
-         all_laps = []
-         for d in self.track_days:
-            if d.get("track") == day.get("track"):
-               for s in d.get("sessions", []):
-                     lap_time = s.get("best_lap_time")
-                     if lap_time:
-                        all_laps.append((lap_time, d.get("date", ""), s.get("session_number", "N/A")))
-         if all_laps:
-            best_lap_overall = min(all_laps, key=lambda x: self._parse_lap_time(x[0]))
-            report += f"  Personal best on {day.get('track', 'N/A')}: {best_lap_overall[0]} (Date: {best_lap_overall[1]}, Session {best_lap_overall[2]})\n"
-            if best_lap:
-               best_lap_val = self._parse_lap_time(best_lap)
-               personal_best_val = self._parse_lap_time(best_lap_overall[0])
-               lap_diff = best_lap_val - personal_best_val
+         if day.track in lap_index:
+            personal_best, track_laps = lap_index[day.track]
+            best_day, best_session = cube.session(personal_best)
+            report += f"  Personal best on {day.track}: {best_session.best_lap_time} (Date: {best_day.date}, Session {best_session.session_number})\n"
+            # Lap times that can't be parsed sort as infinitely slow, there is nothing to compare
+            if best_lap and best_lap_ms != float('inf'):
+               lap_diff = (best_lap_ms - personal_best[0]) / 1000
                sign = "-" if lap_diff < 0 else "+"
                report += f"  Best lap difference to personal best: {sign}{abs(lap_diff):.3f} seconds\n"
+               slower = len(track_laps) - bisect.bisect_right(track_laps, best_lap_ms)
+               report += f"  Best lap faster than {slower / len(track_laps):.0%} of the {len(track_laps)} timed sessions on {day.track}\n"
       return report
 
     def _generate_specific(self, track_day):
         # Detailed report for a specific track day, number of laps, best lap time.
         if not track_day:
             return "No track day selected."
-        report = f"Specific Report for {track_day.get('track', 'N/A')} on {track_day.get('date', 'N/A')}:\n"
-        report += f"  Organizer: {track_day.get('organizer', 'N/A')}\n"
-        report += f"  Vehicle: {track_day.get('vehicle', 'N/A')}\n"
+        report = f"Specific Report for {track_day.track} on {track_day.date}:\n"
+        report += f"  Organizer: {track_day.organizer}\n"
+        report += f"  Vehicle: {track_day.vehicle}\n"
         report += "  Sessions:\n"
-        for s in track_day.get("sessions", []):
-            report += f"    Session {s.get('session_number', 'N/A')}: {s.get('laps', 'N/A')} laps, Weather: {s.get('weather', 'N/A')}, Tire: {s.get('tire_type', 'N/A')} ({s.get('tire_status', 'N/A')}), Best Lap: {s.get('best_lap_time', 'N/A')}\n"
+        for s in track_day.sessions:
+            report += f"    Session {s.session_number}: {s.laps} laps, Weather: {s.weather}, Tire: {s.tire_type} ({s.tire_status}), Best Lap: {s.best_lap_time}\n"
         return report
 
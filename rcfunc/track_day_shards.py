@@ -0,0 +1,299 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Track day storage split into one file per vehicle and year.
+# License: TBD
+
+import os
+import re
+
+from rcfunc import data_utils, storage_schema
+from rcfunc.binary_snapshot import load_json
+from rcfunc.track_day_index import index_file_for, write_snapshot
+from rcfunc.track_day_models import TrackDay
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+def shard_key(track_day):
+   """Get the (vehicle, year) shard of a track day."""
+   date = track_day.date
+   return track_day.vehicle, date[:4] if len(date) >= 4 else ""
+
+def _slug(text, default):
+   return re.sub(r"[^A-Za-z0-9_-]+", "_", text).strip("_") or default
+
+class TrackDayShards:
+   """Track days stored in one file per vehicle and year.
+
+   Every shard is a regular track day file (with journal and header index), and the
+   manifest lists the shards with their track day count and tracks, so years and tracks are
+   known without opening any shard. The manifest also holds the schema version of the
+   track days in all shards. load() hands out the track days of one vehicle (or all),
+   and mutation records on that list are routed to the journal of the shard they change.
+   """
+
+   def __init__(self, directory=data_utils.track_days_dir, legacy_file=data_utils.data_file):
+      self.directory = directory
+      self.legacy_file = legacy_file
+      self.manifest_file = os.path.join(directory, MANIFEST_FILE)
+      # The SQLite backend has no shards, it stores every track day in indexed tables
+      self._single_file = data_utils.STORAGE_BACKEND == "sqlite" and directory == data_utils.track_days_dir
+      self._entries = None
+      self._shards = {}
+      self._view = []
+      # Track days of the view by id, built when a record needs it
+      self._view_by_id = None
+
+   # Manifest
+   def _load_manifest(self):
+      if self._entries is not None:
+         return
+      self._entries = {}
+      if os.path.exists(self.manifest_file):
+         manifest = load_json(self.manifest_file)
+         for entry in manifest.get("shards", []):
+            self._entries[(entry["vehicle"], entry["year"])] = entry
+         version = storage_schema.file_version(manifest)
+         storage_schema.check_version(version, self.manifest_file)
+         if storage_schema.needs_upgrade(version):
+            self._upgrade_shards(version)
+      elif os.path.exists(self.legacy_file) or os.path.exists(data_utils.journal_file_for(self.legacy_file)):
+         self._split_legacy_file()
+
+   def _upgrade_shards(self, version):
+      """Upgrade the track days of every shard to the current schema version."""
+      for entry in self._entries.values():
+         shard_file = self._shard_file(entry)
+         records = [track_day.to_dict() for track_day in data_utils.load_data(filename=shard_file)]
+         track_days = [TrackDay.from_dict(record) for record in storage_schema.upgrade_records("track_day", records, version)]
+         data_utils.save_data(track_days, filename=shard_file)
+      data_utils.flush_writes()
+      # Only marked upgraded once every shard is, the migrations are safe to run twice on a shard
+      data_utils.write_json_atomic(self._manifest(), self.manifest_file)
+
+   def _split_legacy_file(self):
+      """Move the track days of the single track day file into shards."""
+      shards = {}
+      # The single track day file is from before schema versioning
+      records = [track_day.to_dict() for track_day in data_utils.load_data(filename=self.legacy_file)]
+      for record in storage_schema.upgrade_records("track_day", records, 0):
+         track_day = TrackDay.from_dict(record)
+         shards.setdefault(shard_key(track_day), []).append(track_day)
+      for key, track_days in shards.items():
+         entry = self._new_entry(key)
+         self._update_entry(entry, track_days)
+         write_snapshot(track_days, self._shard_file(entry))
+      # Written right away, the old file is only moved aside once the shards are complete
+      data_utils.write_json_atomic(self._manifest(), self.manifest_file)
+      if os.path.exists(self.legacy_file):
+         os.replace(self.legacy_file, self.legacy_file + ".migrated")
+      for filename in (data_utils.journal_file_for(self.legacy_file), index_file_for(self.legacy_file)):
+         if os.path.exists(filename):
+            os.remove(filename)
+
+   def _manifest(self):
+      return {
+         "version": MANIFEST_VERSION,
+         storage_schema.VERSION_KEY: storage_schema.SCHEMA_VERSION,
+         "shards": [dict(self._entries[key]) for key in sorted(self._entries)]
+      }
+
+   def _save_manifest(self):
+      data_utils.write_json(self._manifest(), self.manifest_file)
+
+   def _new_entry(self, key):
+      vehicle, year = key
+      base = os.path.join(_slug(vehicle, "vehicle"), _slug(year, "undated"))
+      used_files = {entry["file"] for entry in self._entries.values()}
+      filename, suffix = base + ".json", 1
+      while filename in used_files:
+         suffix += 1
+         filename = f"{base}-{suffix}.json"
+      entry = {"vehicle": vehicle, "year": year, "file": filename, "count": 0, "tracks": []}
+      self._entries[key] = entry
+      return entry
+
+   def _update_entry(self, entry, track_days):
+      entry["count"] = len(track_days)
+      entry["tracks"] = sorted({day.track for day in track_days if day.track})
+
+   def _shard_file(self, entry):
+      return os.path.join(self.directory, entry["file"])
+
+   def get_shards(self):
+      """Get the manifest entries (vehicle, year, count, tracks) of all non-empty shards."""
+      if self._single_file:
+         return None
+      self._load_manifest()
+      return [dict(self._entries[key]) for key in sorted(self._entries) if self._entries[key]["count"]]
+
+   # Loading
+   def _load_shard(self, key):
+      if key not in self._shards:
+         # A queued journal write of a previously dropped shard must reach the file first
+         data_utils.flush_writes()
+         entry = self._entries.get(key) or self._new_entry(key)
+         self._shards[key] = data_utils.load_track_day_headers(filename=self._shard_file(entry))
+      return self._shards[key]
+
+   def iter_load(self, vehicle=None, progress=None):
+      """Yield the track days of a vehicle, or of all vehicles, one shard at a time.
+
+      progress is called as progress(shards_loaded, shard_count). The yielded track days are
+      the list that append_journal_record() expects records for.
+      """
+      if self._single_file:
+         track_days = data_utils.load_data()
+         if progress:
+            progress(1, 1)
+         yield from track_days
+         self._set_view(list(track_days))
+         return
+
+      self._load_manifest()
+      keys = [key for key in sorted(self._entries) if not vehicle or key[0] == vehicle]
+      # Drop the shards of other vehicles, they are reloaded when needed
+      for key in list(self._shards):
+         if key not in keys:
+            del self._shards[key]
+      view = []
+      for position, key in enumerate(keys):
+         track_days = self._load_shard(key)
+         view.extend(track_days)
+         if progress:
+            progress(position + 1, len(keys))
+         yield from track_days
+      if progress and not keys:
+         progress(1, 1)
+      self._set_view(view)
+
+   def preload(self, vehicle=None, progress=None):
+      """Parse the shards of a vehicle, or of all vehicles, without handing out track days.
+
+      A following iter_load() of the same vehicle then doesn't touch the disk, so this can run
+      on a worker thread, as long as nothing else uses the shards until it returns.
+      """
+      if self._single_file:
+         data_utils.load_data()
+         if progress:
+            progress(1, 1)
+         return
+      self._load_manifest()
+      keys = [key for key in sorted(self._entries) if not vehicle or key[0] == vehicle]
+      for position, key in enumerate(keys):
+         self._load_shard(key)
+         if progress:
+            progress(position + 1, len(keys))
+
+   def load(self, vehicle=None):
+      return list(self.iter_load(vehicle))
+
+   def _set_view(self, track_days):
+      self._view = track_days
+      self._view_by_id = None
+
+   def _view_track_day(self, track_day_id):
+      if self._view_by_id is None:
+         self._view_by_id = {track_day.id: track_day for track_day in self._view}
+      return self._view_by_id[track_day_id]
+
+   def all_track_days(self):
+      """Get the track days of every shard, without changing the list handed out by load()."""
+      if self._single_file:
+         return self._view or data_utils.load_data()
+      self._load_manifest()
+      return [track_day for key in sorted(self._entries) for track_day in self._load_shard(key)]
+
+   # Saving
+   def append_journal_record(self, record, track_days):
+      """Journal a mutation of the loaded track days in the shard it changes.
+
+      record and track_days are as for data_utils.append_journal_record, after the mutation.
+      """
+      if self._single_file:
+         self._set_view(track_days)
+         data_utils.append_journal_record(record, track_days)
+         return
+
+      op = record.get("op")
+      if op == "add_bulk":
+         self._append_bulk_record(record)
+         return
+      if op == "create_track_day":
+         track_day = record["track_day"]
+         self._view.append(track_day)
+         if self._view_by_id is not None:
+            self._view_by_id[track_day.id] = track_day
+      else:
+         track_day = self._view_track_day(record["track_day_id"])
+         if op == "delete_track_day":
+            del self._view[next(i for i, day in enumerate(self._view) if day is track_day)]
+            del self._view_by_id[track_day.id]
+
+      self._load_manifest()
+      key = shard_key(track_day)
+      shard = self._load_shard(key)
+      if op == "create_track_day":
+         shard.append(track_day)
+      elif op == "delete_track_day":
+         del shard[next(i for i, day in enumerate(shard) if day is track_day)]
+
+      # Records address track days by id, they apply to the shard as they are
+      entry = self._entries[key]
+      data_utils.append_journal_record(record, shard, filename=self._shard_file(entry))
+      if op in ("create_track_day", "delete_track_day"):
+         self._update_entry(entry, shard)
+         self._save_manifest()
+
+   def _append_bulk_record(self, record):
+      """Journal an add_bulk record as one add_bulk record in every shard it changes.
+
+      The part of the batch in a shard is applied completely or not at all, a crash between
+      the appends to two shards leaves the batch in some of them.
+      """
+      parts = {}
+
+      def part(key):
+         if key not in parts:
+            parts[key] = {"op": "add_bulk", "track_days": [], "sessions": {}}
+         return parts[key]
+
+      for track_day in record["track_days"]:
+         self._view.append(track_day)
+         if self._view_by_id is not None:
+            self._view_by_id[track_day.id] = track_day
+         part(shard_key(track_day))["track_days"].append(track_day)
+      for track_day_id, sessions in record["sessions"].items():
+         part(shard_key(self._view_track_day(track_day_id)))["sessions"][track_day_id] = sessions
+
+      self._load_manifest()
+      for key, shard_record in parts.items():
+         shard = self._load_shard(key)
+         shard.extend(shard_record["track_days"])
+         entry = self._entries[key]
+         data_utils.append_journal_record(shard_record, shard, filename=self._shard_file(entry))
+         if shard_record["track_days"]:
+            self._update_entry(entry, shard)
+      if record["track_days"]:
+         self._save_manifest()
+
+   def save(self, track_days):
+      """Save a complete list of loaded track days, rewriting the shards it covers."""
+      if self._single_file:
+         self._set_view(track_days)
+         data_utils.save_data(track_days)
+         return
+
+      self._load_manifest()
+      # Shards of other vehicles may hold track days that were never part of the loaded list
+      loaded = {id(day) for day in self._view}
+      keys = {shard_key(day) for day in self._view} | {shard_key(day) for day in track_days}
+      for key in sorted(keys):
+         shard = [day for day in self._load_shard(key) if id(day) not in loaded]
+         shard.extend(day for day in track_days if shard_key(day) == key)
+         self._shards[key] = shard
+         entry = self._entries[key]
+         self._update_entry(entry, shard)
+         data_utils.save_data(shard, filename=self._shard_file(entry))
+      self._save_manifest()
+      self._set_view(list(track_days))
@@ -3,53 +3,120 @@
 # Description: Track day statistics and analytics for the Racing Companion application.
 # License: TBD
 
-from collections import defaultdict
+import numpy as np
+
+from rcfunc.result_cache import ResultCache
+from rcfunc.session_frame import SessionFrame
+from rcfunc.track_day_aggregates import TrackDayCube
 
 
 class TrackDayStatsMngr:
     """Manager for computing track day statistics and analytics."""
 
-    def __init__(self, track_days, vehicles, active_vehicle=None):
+    def __init__(self, track_days, vehicles, active_vehicle=None, check_consistency=False, data_version=None):
         self.track_days = track_days
         self.vehicles = vehicles
         self.active_vehicle = active_vehicle
-
-    def _filter_track_days(self, vehicle=None, year=None):
-        """Filter track days by vehicle and/or year."""
-        filtered = self.track_days
-        if vehicle:
-            filtered = [d for d in filtered if d.get("vehicle") == vehicle]
-        if year:
-            filtered = [d for d in filtered if d.get("date", "").startswith(str(year))]
-        return filtered
+        # Chart data by filter, for the data version (like DataStore.version) it was computed for
+        self._cache = ResultCache(data_version)
+        # Compare every result of the cube with a full recompute from the session frame, for
+        # tests. The frame is the test oracle of the cube, it is never built otherwise.
+        self.check_consistency = check_consistency
+        self._frame = None
+        self._cube = None
 
     def get_chart_data(self, chart_type, vehicle=None, year=None):
         """Get data formatted for specific chart types."""
-        if chart_type == "track_frequency":
-            return self._track_frequency_data(vehicle, year)
-        elif chart_type == "performance_metrics":
-            return self._performance_metrics_data(vehicle, year)
-        elif chart_type == "vehicle_activity":
-            return self._vehicle_activity_data(vehicle, year)
-        elif chart_type == "weather_distribution":
-            return self._weather_distribution_data(vehicle, year)
-        else:
-            return {}
-
-    def _track_frequency_data(self, vehicle=None, year=None):
-        """Compute track frequency (most/least visited tracks)."""
-        days = self._filter_track_days(vehicle, year)
-        track_count = defaultdict(int)
-        for day in days:
-            track = day.get("track", "N/A")
-            track_count[track] += 1
-
-        if not track_count:
+        return self.compute_all(vehicle, year).get(chart_type, {})
+
+    def compute_all(self, vehicle=None, year=None):
+        """Get the data of every chart type by chart type.
+
+        The charts are built from the track day cube, summing the cells of the matching
+        vehicles and years, so the time doesn't depend on the number of track days. With
+        check_consistency, a RuntimeError is raised if recompute_all() gives another result.
+        Results are cached until the data version changes, they must not be modified.
+        """
+        return self._cache.get((vehicle, year), lambda: self._compute_all(vehicle, year))
+
+    def cache_info(self):
+        """Get the hits and misses of the chart data cache."""
+        return self._cache.info()
+
+    def _compute_all(self, vehicle, year):
+        cube = self.get_cube()
+        by_vehicle = cube.totals_by("vehicle", vehicle, year)
+        labels = sorted(by_vehicle)
+        totals = tuple([labels] + [
+            np.array([getattr(by_vehicle[label], name) for label in labels], dtype=np.int64) for name in ("days", "sessions", "laps")
+        ])
+        tracks = {track: group.days for track, group in cube.totals_by("track", vehicle, year).items()}
+        weather = {weather_type: group.sessions for weather_type, group in cube.totals_by("weather", vehicle, year).items()}
+        charts = self._charts(totals, tracks, weather)
+
+        if self.check_consistency and charts != self.recompute_all(vehicle, year):
+            raise RuntimeError(f"Track day cube differs from a full recompute (vehicle {vehicle}, year {year})")
+        return charts
+
+    def recompute_all(self, vehicle=None, year=None):
+        """Get the data of every chart type like compute_all(), recomputed from the session frame.
+
+        The reference for check_consistency, the app only uses compute_all(). The day and
+        session masks and the per-vehicle totals are computed once and shared by the charts.
+        """
+        frame = self.get_frame()
+        day_mask = frame.day_mask(vehicle, year)
+        session_mask = day_mask[frame.day]
+        totals = self._vehicle_totals(frame, day_mask, session_mask)
+        codes, counts = np.unique(frame.day_track[day_mask], return_counts=True)
+        tracks = {frame.tracks.labels[code]: count for code, count in zip(codes, counts)}
+        weather_count = np.bincount(frame.weather[session_mask], minlength=len(frame.weather_types))
+        weather = {frame.weather_types.labels[code]: weather_count[code] for code in np.flatnonzero(weather_count)}
+        return self._charts(totals, tracks, weather)
+
+    def _charts(self, totals, tracks, weather):
+        return {
+            "track_frequency": self._track_frequency_data(tracks),
+            "performance_metrics": self._performance_metrics_data(totals),
+            "vehicle_activity": self._vehicle_activity_data(totals),
+            "weather_distribution": self._weather_distribution_data(weather),
+        }
+
+    def get_frame(self):
+        """Get the SessionFrame of the track days, built on first use and kept up to date by track_days_changed()."""
+        if self._frame is None or len(self._frame) != len(self.track_days):
+            self._frame = SessionFrame(self.track_days)
+        return self._frame
+
+    def get_cube(self):
+        """Get the TrackDayCube of the track days, built on first use and kept up to date by track_days_changed()."""
+        if self._cube is None or len(self._cube) != len(self.track_days):
+            self._cube = TrackDayCube(self.track_days)
+        return self._cube
+
+    def track_days_changed(self, record=None):
+        """Follow a journaled track day mutation, or rebuild the frame and cube on next use if record is None."""
+        if record is None:
+            self._frame = None
+            self._cube = None
+            return
+        for view in (self._frame, self._cube):
+            if view is not None:
+                view.apply_journal_record(record, self.track_days)
+
+    def _sorted_labels(self, categories, counts):
+        """Get the sorted labels with a non-zero count and their codes."""
+        codes = sorted(np.flatnonzero(counts), key=lambda code: categories.labels[code])
+        return [categories.labels[code] for code in codes], codes
+
+    def _track_frequency_data(self, tracks):
+        """Compute track frequency (most/least visited tracks) from the days per track."""
+        if not tracks:
             return {"labels": [], "values": [], "title": "Track Frequency", "xlabel": "Track", "ylabel": "Days Visited"}
 
-        sorted_tracks = sorted(track_count.items(), key=lambda x: x[1], reverse=True)
-        labels = [track for track, _ in sorted_tracks]
-        values = [count for _, count in sorted_tracks]
+        # Most visited first, tracks visited equally often by name
+        labels = sorted(tracks, key=lambda track: (-tracks[track], track))
+        values = [int(tracks[track]) for track in labels]
 
         return {
             "labels": labels,
@@ -59,11 +126,20 @@ class TrackDayStatsMngr:
             "ylabel": "Number of Days",
         }
 
-    def _performance_metrics_data(self, vehicle=None, year=None):
+    def _vehicle_totals(self, frame, day_mask, session_mask):
+        """Get the vehicle names with track days and their days, sessions and laps."""
+        size = len(frame.vehicles)
+        days = np.bincount(frame.day_vehicle[day_mask], minlength=size)
+        sessions = np.bincount(frame.vehicle[session_mask], minlength=size)
+        laps = np.bincount(frame.vehicle[session_mask], weights=frame.laps[session_mask], minlength=size)
+        labels, codes = self._sorted_labels(frame.vehicles, days)
+        return labels, days[codes], sessions[codes], laps[codes]
+
+    def _performance_metrics_data(self, totals):
         """Compute performance metrics: avg laps per day, avg sessions per day."""
-        days = self._filter_track_days(vehicle, year)
+        labels, days, sessions, laps = totals
 
-        if not days:
+        if not labels:
             return {
                 "labels": [],
                 "avg_laps": [],
@@ -72,87 +148,42 @@ class TrackDayStatsMngr:
                 "ylabel": "Count",
             }
 
-        # Group by vehicle to show metrics per vehicle
-        vehicle_metrics = defaultdict(lambda: {"total_days": 0, "total_laps": 0, "total_sessions": 0})
-
-        for day in days:
-            v = day.get("vehicle", "N/A")
-            vehicle_metrics[v]["total_days"] += 1
-            vehicle_metrics[v]["total_sessions"] += len(day.get("sessions", []))
-            vehicle_metrics[v]["total_laps"] += sum(
-                int(s.get("laps", 0)) for s in day.get("sessions", []) if s.get("laps")
-            )
-
-        labels = sorted(vehicle_metrics.keys())
-        avg_laps = [
-            vehicle_metrics[v]["total_laps"] / vehicle_metrics[v]["total_days"]
-            if vehicle_metrics[v]["total_days"] > 0
-            else 0
-            for v in labels
-        ]
-        avg_sessions = [
-            vehicle_metrics[v]["total_sessions"] / vehicle_metrics[v]["total_days"]
-            if vehicle_metrics[v]["total_days"] > 0
-            else 0
-            for v in labels
-        ]
-
+        # Group by vehicle to show metrics per vehicle, listed vehicles have at least one day
         return {
             "labels": labels,
-            "avg_laps": avg_laps,
-            "avg_sessions": avg_sessions,
+            "avg_laps": (laps / days).tolist(),
+            "avg_sessions": (sessions / days).tolist(),
             "title": "Performance Metrics (Averages per Day)",
             "ylabel": "Average Count",
         }
 
-    def _vehicle_activity_data(self, vehicle=None, year=None):
+    def _vehicle_activity_data(self, totals):
         """Compute vehicle activity: track days and sessions per vehicle."""
-        days = self._filter_track_days(vehicle, year)
-
-        vehicle_activity = defaultdict(lambda: {"days": 0, "sessions": 0})
-        for day in days:
-            v = day.get("vehicle", "N/A")
-            vehicle_activity[v]["days"] += 1
-            vehicle_activity[v]["sessions"] += len(day.get("sessions", []))
-
-        labels = sorted(vehicle_activity.keys())
-        days_count = [vehicle_activity[v]["days"] for v in labels]
-        sessions_count = [vehicle_activity[v]["sessions"] for v in labels]
+        labels, days, sessions, _ = totals
 
         return {
             "vehicle_names": labels,
-            "days_count": days_count,
-            "sessions_count": sessions_count,
+            "days_count": days.tolist(),
+            "sessions_count": sessions.tolist(),
             "title": "Vehicle Activity",
         }
 
-    def _weather_distribution_data(self, vehicle=None, year=None):
-        """Compute weather distribution as a pie chart (per year)."""
-        days = self._filter_track_days(vehicle, year)
+    def _weather_distribution_data(self, weather):
+        """Compute weather distribution as a pie chart (per year) from the sessions per weather."""
+        labels = sorted(weather)
 
-        weather_count = defaultdict(int)
-        for day in days:
-            for session in day.get("sessions", []):
-                weather = session.get("weather", "Unknown")
-                weather_count[weather] += 1
-
-        if not weather_count:
+        if not labels:
             return {"labels": [], "values": [], "title": "Weather Distribution"}
 
-        labels = sorted(weather_count.keys())
-        values = [weather_count[w] for w in labels]
-
         return {
             "labels": labels,
-            "values": values,
+            "values": [int(weather[label]) for label in labels],
             "title": "Weather Distribution (Sessions by Weather)",
         }
 
     def get_available_years(self, vehicle=None):
         """Get available years for filtering."""
-        days = self._filter_track_days(vehicle)
-        years = sorted({d.get("date", "")[:4] for d in days if d.get("date", "")})
-        return years
+        return sorted(year for year in self.get_cube().totals_by("year", vehicle) if year)
 
     def get_available_vehicles(self):
         """Get available vehicles."""
@@ -163,3 +194,7 @@ class TrackDayStatsMngr:
         self.track_days = track_days
         self.vehicles = vehicles
         self.active_vehicle = active_vehicle
+        self._frame = None
+        self._cube = None
+        # The data version needn't change with the references
+        self._cache.clear()
@@ -6,113 +6,268 @@
 import csv
 import os
 
+from rcfunc.track_day_index import pin_sessions
+from rcfunc.track_day_models import TrackDay
+
 csv_export_directory = os.path.join(os.path.expanduser("~"), ".local/racing-companion/exports")
 
+# Columns of the CSV export
+CSV_FIELDNAMES = [
+   "track", "date", "organizer", "vehicle",
+   "session_number", "laps", "weather", "tire_type",
+   "tire_status", "best_lap_time", "comments"
+]
+
+def track_day_csv_rows(track_day, sessions=None):
+   """Get the CSV export rows of a track day, one per session or one with empty session fields.
+
+   Given sessions are exported instead of those of the track day.
+   """
+   if sessions is None:
+      sessions = track_day.sessions
+   header = {
+      "track": track_day.track,
+      "date": track_day.date,
+      "organizer": track_day.organizer,
+      "vehicle": track_day.vehicle
+   }
+   if not sessions:
+      return [header | {name: "" for name in CSV_FIELDNAMES[4:]}]
+   return [
+      header | {
+         "session_number": session.session_number,
+         "laps": session.laps,
+         "weather": session.weather,
+         "tire_type": session.tire_type,
+         "tire_status": session.tire_status,
+         "best_lap_time": session.best_lap_time,
+         "comments": session.comments
+      }
+      for session in sessions
+   ]
+
+def write_track_day_csv(track_day, file_path, sessions=None):
+   """Write the CSV export of a track day (see track_day_csv_rows) with a header to a file."""
+   with open(file_path, mode="w", newline="", encoding="utf-8") as csvfile:
+      writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDNAMES)
+      writer.writeheader()
+      writer.writerows(track_day_csv_rows(track_day, sessions))
+
 class TrackSessionMngr:
    """Business logic manager for track sessions and track days."""
 
-   def __init__(self, track_days, vehicles, active_vehicle, weather_options, save_callback):
+   def __init__(self, track_days, vehicles, active_vehicle, weather_options, save_callback, journal_callback=None):
       self.track_days = track_days
       self.vehicles = vehicles
       self.active_vehicle = active_vehicle
       self.weather_options = weather_options
       self.save_callback = save_callback
+      self.journal_callback = journal_callback
+      # Track days by id and by vehicle (in list order), built on first use and kept up
+      # to date by the mutations
+      self._by_id = None
+      self._by_vehicle = None
+
+   def _persist(self, record):
+      """Persist a mutation, as a journal record when journaling is enabled."""
+      if self.journal_callback:
+         self.journal_callback(record, self.track_days)
+      else:
+         self.save_callback(self.track_days)
+
+   def _index(self):
+      if self._by_id is None or len(self._by_id) != len(self.track_days):
+         self._by_id = {}
+         self._by_vehicle = {}
+         for day in self.track_days:
+            self._by_id[day.id] = day
+            self._by_vehicle.setdefault(day.vehicle, []).append(day)
+      return self._by_id
+
+   def _invalidate_index(self):
+      self._by_id = None
+      self._by_vehicle = None
+
+   def track_days_changed(self, record=None):
+      """Follow replaced track days (record None), mutations made by this manager are already indexed."""
+      if record is None:
+         self._invalidate_index()
 
    def get_filtered_track_days(self):
-      """Get track days filtered by active vehicle."""
+      """Get track days filtered by active vehicle. The list is shared, it must not be modified."""
       if self.active_vehicle:
-         return [day for day in self.track_days if day.get("vehicle") == self.active_vehicle]
+         self._index()
+         return self._by_vehicle.get(self.active_vehicle, [])
       return self.track_days
 
    def has_track_days(self):
       """Check if there are any track days for the active vehicle."""
       return len(self.get_filtered_track_days()) > 0
 
-   def get_track_day(self, index):
-      """Get a track day by index."""
-      filtered_days = self.get_filtered_track_days()
-      if 0 <= index < len(filtered_days):
-         return filtered_days[index]
-      return None
+   def get_track_day(self, track_day_id):
+      """Get a track day by id."""
+      return self._index().get(track_day_id)
 
-   def get_track_day_index_in_original_list(self, filtered_index):
-      """Get the original index of a track day in the unfiltered list."""
-      filtered_days = self.get_filtered_track_days()
-      if 0 <= filtered_index < len(filtered_days):
-         target_day = filtered_days[filtered_index]
-         return self.track_days.index(target_day)
-      return -1
-
-   def delete_track_day(self, filtered_index):
-      """Delete a track day by its filtered index."""
-      original_index = self.get_track_day_index_in_original_list(filtered_index)
-      if original_index >= 0:
-         deleted_day = self.track_days.pop(original_index)
-         self.save_callback(self.track_days)
-         return deleted_day
-      return None
+   def delete_track_day(self, track_day_id):
+      """Delete a track day by id."""
+      track_day = self.get_track_day(track_day_id)
+      if track_day:
+         # Identity, lazy track days must not be loaded to compare them
+         del self.track_days[next(i for i, day in enumerate(self.track_days) if day is track_day)]
+         del self._by_id[track_day_id]
+         vehicle_days = self._by_vehicle[track_day.vehicle]
+         del vehicle_days[next(i for i, day in enumerate(vehicle_days) if day is track_day)]
+         self._persist({"op": "delete_track_day", "track_day_id": track_day_id})
+      return track_day
 
    def create_track_day(self, track_name, date, organizer, vehicle):
       """Create a new track day."""
       if not self.vehicles or vehicle == "No Vehicles Available":
          raise ValueError("Please add a vehicle before creating a track day.")
-      new_day = {
-         "track": track_name,
-         "date": date,
-         "organizer": organizer,
-         "vehicle": vehicle,
-         "sessions": []
-      }
+      new_day = TrackDay(track=track_name, date=date, organizer=organizer, vehicle=vehicle)
+      index = self._index()
       self.track_days.append(new_day)
-      self.save_callback(self.track_days)
+      index[new_day.id] = new_day
+      self._by_vehicle.setdefault(vehicle, []).append(new_day)
+      self._persist({"op": "create_track_day", "track_day": new_day})
       return new_day
 
-   def get_sessions(self, track_day_index):
+   def get_sessions(self, track_day_id):
       """Get sessions for a specific track day."""
-      track_day = self.get_track_day(track_day_index)
+      track_day = self.get_track_day(track_day_id)
       if track_day:
-         return track_day.get('sessions', [])
+         return track_day.sessions
       return []
 
-   def has_sessions(self, track_day_index):
+   def has_sessions(self, track_day_id):
       """Check if a track day has any sessions."""
-      return len(self.get_sessions(track_day_index)) > 0
+      return len(self.get_sessions(track_day_id)) > 0
 
-   def get_session_numbers(self, track_day_index):
+   def get_session_numbers(self, track_day_id):
       """Get list of session numbers for a track day."""
-      sessions = self.get_sessions(track_day_index)
-      return [session.get("session_number", f"Session {i+1}") for i, session in enumerate(sessions)]
+      sessions = self.get_sessions(track_day_id)
+      return [session.session_number for session in sessions]
+
+   def find_session(self, track_day_id, session_id):
+      """Find a session by id within a track day."""
+      for session in self.get_sessions(track_day_id):
+         if session.id == session_id:
+            return session
+      return None
 
-   def find_session_by_number(self, track_day_index, session_number):
+   def find_session_by_number(self, track_day_id, session_number):
       """Find a session by its number within a track day."""
-      track_day = self.get_track_day(track_day_index)
-      if track_day:
-         for session in track_day["sessions"]:
-            if session.get("session_number") == session_number:
-               return session
+      for session in self.get_sessions(track_day_id):
+         if session.session_number == session_number:
+            return session
       return None
 
-   def update_session(self, track_day_index, session_number, session_data):
+   def update_session(self, track_day_id, session_id, session_data):
       """Update an existing session."""
-      session = self.find_session_by_number(track_day_index, session_number)
+      session = self.find_session(track_day_id, session_id)
       if session:
+         track_day = self.get_track_day(track_day_id)
+         # Matched by journals from before session ids
+         session_number = session.session_number
          session.update(session_data)
-         self.save_callback(self.track_days)
+         pin_sessions(track_day)
+         self._persist({
+            "op": "update_session",
+            "track_day_id": track_day_id,
+            "session_id": session_id,
+            "session_number": session_number,
+            "session": session_data
+         })
          return True
       return False
 
-   def add_session(self, track_day_index, session_data):
-      """Add a new session to a track day."""
-      original_index = self.get_track_day_index_in_original_list(track_day_index)
-      if original_index >= 0:
-         self.track_days[original_index]["sessions"].append(session_data)
-         self.save_callback(self.track_days)
+   def add_session(self, track_day_id, session):
+      """Add a new Session to a track day."""
+      track_day = self.get_track_day(track_day_id)
+      if track_day:
+         track_day.sessions.append(session)
+         pin_sessions(track_day)
+         self._persist({"op": "add_session", "track_day_id": track_day_id, "session": session})
          return True
       return False
 
-   def get_next_session_number(self, track_day_index):
+   def _validate_sessions(self, sessions):
+      for session in sessions:
+         valid, message = self.validate_session_data(session.to_dict())
+         if not valid:
+            raise ValueError(f"Session {session.session_number or '?'}: {message}")
+
+   def add_sessions_bulk(self, track_day_id, sessions):
+      """Add several Sessions to a track day, saved once.
+
+      Every session is validated before any is added, a ValueError leaves the track day
+      unchanged. Returns False if there is no track day with the id.
+      """
+      if not self.get_track_day(track_day_id):
+         return False
+      self.apply_bulk([], {track_day_id: sessions})
+      return True
+
+   def create_track_days_bulk(self, track_days):
+      """Add several new TrackDays with their sessions, saved once.
+
+      Every track day and session is validated before any is added, a ValueError leaves
+      the track days unchanged. Returns the added track days.
+      """
+      self.apply_bulk(track_days, {})
+      return list(track_days)
+
+   def apply_bulk(self, track_days, sessions_by_track_day):
+      """Add new TrackDays and Sessions of existing track days (lists by track day id), saved once.
+
+      Everything is validated before anything is added, a ValueError leaves the track days
+      unchanged. With journaling, the whole batch is a single add_bulk record: a journal line
+      is applied completely or, torn by a crash, not at all, so there is no partial batch on
+      disk and no full save. When persisting raises, the changes are taken back before the
+      error is raised.
+      """
+      index = self._index()
+      ids = set()
+      for track_day in track_days:
+         if not self.vehicles or not track_day.vehicle or track_day.vehicle == "No Vehicles Available":
+            raise ValueError(f"Track day {track_day.track} {track_day.date} has no vehicle.")
+         if track_day.id in index or track_day.id in ids:
+            raise ValueError(f"Track day {track_day.track} {track_day.date} already exists.")
+         ids.add(track_day.id)
+         self._validate_sessions(track_day.sessions)
+      for track_day_id, sessions in sessions_by_track_day.items():
+         if track_day_id not in index:
+            raise ValueError(f"No track day with id {track_day_id}.")
+         self._validate_sessions(sessions)
+
+      day_count = len(self.track_days)
+      session_counts = {}
+      for track_day_id, sessions in sessions_by_track_day.items():
+         track_day = index[track_day_id]
+         session_counts[track_day_id] = len(track_day.sessions)
+         track_day.sessions.extend(sessions)
+         pin_sessions(track_day)
+      for track_day in track_days:
+         self.track_days.append(track_day)
+         index[track_day.id] = track_day
+         self._by_vehicle.setdefault(track_day.vehicle, []).append(track_day)
+
+      try:
+         self._persist({
+            "op": "add_bulk",
+            "track_days": list(track_days),
+            "sessions": {track_day_id: list(sessions) for track_day_id, sessions in sessions_by_track_day.items()}
+         })
+      except Exception:
+         del self.track_days[day_count:]
+         for track_day_id, count in session_counts.items():
+            del index[track_day_id].sessions[count:]
+         self._invalidate_index()
+         raise
+
+   def get_next_session_number(self, track_day_id):
       """Get the next session number for a track day."""
-      sessions = self.get_sessions(track_day_index)
+      sessions = self.get_sessions(track_day_id)
       return str(len(sessions) + 1)
 
    def validate_session_data(self, session_data):
@@ -123,11 +278,11 @@ class TrackSessionMngr:
             return False, f"Missing required field: {field}"
       return True, "Valid"
 
-   def get_track_day_vehicle(self, track_day_index):
+   def get_track_day_vehicle(self, track_day_id):
       """Get the vehicle for a specific track day."""
-      track_day = self.get_track_day(track_day_index)
+      track_day = self.get_track_day(track_day_id)
       if track_day:
-         return track_day.get("vehicle", "N/A")
+         return track_day.vehicle
       return "N/A"
 
    def update_data_references(self, track_days, vehicles, active_vehicle):
@@ -135,68 +290,28 @@ class TrackSessionMngr:
       self.track_days = track_days
       self.vehicles = vehicles
       self.active_vehicle = active_vehicle
+      self._invalidate_index()
 
-   def export_track_day_to_csv(self, track_day_index, file_path = None):
+   def export_track_day_to_csv(self, track_day_id, file_path = None):
       """
       Export a track day and all its sessions to a CSV file.
 
       Args:
-         track_day_index (int): Index in the filtered track days list.
+         track_day_id (str): Id of the track day.
          file_path (str): Path to the CSV file to write.
 
       Returns:
          bool: True if export was successful, False otherwise.
       """
-      track_day = self.get_track_day(track_day_index)
+      track_day = self.get_track_day(track_day_id)
       if not track_day:
          return False
 
       if file_path is None:
          return False
 
-      # Define CSV columns
-      fieldnames = [
-         "track", "date", "organizer", "vehicle",
-         "session_number", "laps", "weather", "tire_type",
-         "tire_status", "best_lap_time", "comments"
-      ]
-
       try:
-         with open(file_path, mode="w", newline="", encoding="utf-8") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            sessions = track_day.get("sessions", [])
-            if not sessions:
-               # Write track day info with empty session fields
-               writer.writerow({
-                  "track": track_day.get("track", ""),
-                  "date": track_day.get("date", ""),
-                  "organizer": track_day.get("organizer", ""),
-                  "vehicle": track_day.get("vehicle", ""),
-                  "session_number": "",
-                  "laps": "",
-                  "weather": "",
-                  "tire_type": "",
-                  "tire_status": "",
-                  "best_lap_time": "",
-                  "comments": ""
-               })
-            else:
-               for session in sessions:
-                  row = {
-                     "track": track_day.get("track", ""),
-                     "date": track_day.get("date", ""),
-                     "organizer": track_day.get("organizer", ""),
-                     "vehicle": track_day.get("vehicle", ""),
-                     "session_number": session.get("session_number", ""),
-                     "laps": session.get("laps", ""),
-                     "weather": session.get("weather", ""),
-                     "tire_type": session.get("tire_type", ""),
-                     "tire_status": session.get("tire_status", ""),
-                     "best_lap_time": session.get("best_lap_time", ""),
-                     "comments": session.get("comments", "")
-                  }
-                  writer.writerow(row)
+         write_track_day_csv(track_day, file_path)
          return True
       except Exception as e:
          # Todo: Write a proper error log, displayed in the GUI somewhere.
@@ -15,8 +15,11 @@ class MaintenancePage(ctk.CTkFrame):
       super().__init__(master)
       self.app = app
       self.maintenance_manager = MaintenanceMngr(
-         vehicles=app.vehicles,
-         active_vehicle=app.active_vehicle
+         vehicles=app.data_store.view("vehicles"),
+         active_vehicle=app.active_vehicle,
+         entries=app.data_store.view("maintenance_entries"),
+         journal_callback=app.data_store.append_maintenance_record,
+         data_version=lambda: app.data_store.version
       )
       self.current_filter = MaintenanceFilter()
       self.advanced_search_visible = False
@@ -187,19 +190,39 @@ class MaintenancePage(ctk.CTkFrame):
       self.current_filter = MaintenanceFilter()
       self.refresh_maintenance_entries()
 
+   def _data_loading(self):
+      """Show a notice and return True while the maintenance entries or vehicles are still loading."""
+      if self.app.data_store.is_loading("maintenance_entries", "vehicles"):
+         messagebox.showinfo("Loading", "Maintenance entries are still loading, please try again in a moment.")
+         return True
+      return False
+
    def add_new_maintenance_entry(self):
+      if self._data_loading():
+         return
       MaintenanceEntryDialog(self.app, self.maintenance_manager, self._on_entry_saved)
 
    def edit_maintenance_entry(self, entry: MaintenanceEntry):
+      if self._data_loading():
+         return
       MaintenanceEntryDialog(self.app, self.maintenance_manager, self._on_entry_saved, entry)
 
    def delete_maintenance_entry(self, entry: MaintenanceEntry):
+      if self._data_loading():
+         return
       if messagebox.askyesno("Confirm Delete", f"Delete maintenance entry '{entry.title}'?"):
          if self.maintenance_manager.delete_entry(entry):
             self.refresh_maintenance_entries()
          else:
             messagebox.showerror("Error", "Failed to delete entry")
 
+   def on_vehicles_loaded(self):
+      self.maintenance_vehicle_filter.configure(values=["All"] + self.maintenance_manager.get_available_vehicles())
+
+   def on_entries_loaded(self):
+      self.maintenance_manager.reload_entries()
+      self.refresh_maintenance_entries()
+
    def _on_entry_saved(self):
       self.refresh_maintenance_entries()
 
@@ -8,10 +8,11 @@ import rcfunc.gui_utils as gui_utils
 from tkinter import StringVar
 from tkinter import messagebox
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from rcfunc.data_utils import save_data
-from rcfunc.track_session_mngr import TrackSessionMngr
+from rcfunc.csv_export import BatchExport
+from rcfunc.track_session_mngr import TrackSessionMngr, csv_export_directory
 from rcfunc.track_day_report_mngr import TrackDayReportMngr
 from rcfunc.track_day_stats_mngr import TrackDayStatsMngr
+from rcfunc.track_day_models import Session
 
 # TODO: List of todos:
 # - Use GUI utils for scrolling instead
@@ -22,24 +23,34 @@ class TrackSessionsPage(ctk.CTkFrame):
         self.app = app
         self.session_content_frames = {}
 
+        # Live views of the data store, they follow the track days when these are reloaded
+        data_store = self.app.data_store
+        track_days = data_store.view("track_days")
+        vehicles = data_store.view("vehicles")
+
         # TrackSessionMngr for all track day/session logic
         self.track_session_mngr = TrackSessionMngr(
-            track_days=self.app.track_days,
-            vehicles=self.app.vehicles,
+            track_days=track_days,
+            vehicles=vehicles,
             active_vehicle=self.app.active_vehicle,
             weather_options=self.app.weather_options,
-            save_callback=save_data
+            save_callback=data_store.save_track_days,
+            journal_callback=data_store.append_track_day_record
         )
 
         # TrackDayReportMngr for all track day report logic
-        self.track_day_report_mngr = TrackDayReportMngr(self.app.track_days, self.app.vehicles)
+        self.track_day_report_mngr = TrackDayReportMngr(track_days, vehicles, data_version=lambda: data_store.version)
 
         # TrackDayStatsMngr for all track day statistics and analytics
         self.track_day_stats_mngr = TrackDayStatsMngr(
-            track_days=self.app.track_days,
-            vehicles=self.app.vehicles,
-            active_vehicle=self.app.active_vehicle
+            track_days=track_days,
+            vehicles=vehicles,
+            active_vehicle=self.app.active_vehicle,
+            data_version=lambda: data_store.version
         )
+        # The statistics follow track day changes without re-reading every track day
+        data_store.track_day_listeners.append(self.track_day_stats_mngr.track_days_changed)
+        data_store.track_day_listeners.append(self.track_session_mngr.track_days_changed)
 
         self.current_view = "list"
         self.setup_track_sessions_page()
@@ -87,6 +98,16 @@ class TrackSessionsPage(ctk.CTkFrame):
         )
         self.report_button.pack(side="right", padx=(10, 0))
 
+        self.export_all_button = ctk.CTkButton(
+           self.track_sessions_header_frame,
+           text="Export All",
+           fg_color="#6C7A89",
+           hover_color="#34495E",
+           text_color="white",
+           command=self.open_export_all_dialog
+        )
+        self.export_all_button.pack(side="right", padx=(10, 0))
+
         # List view frame
         self.session_frame = ctk.CTkScrollableFrame(self)
         self.session_frame.pack(fill="both", expand=True, padx=10, pady=10)
@@ -149,18 +170,15 @@ class TrackSessionsPage(ctk.CTkFrame):
 
     def update_track_statistics(self):
         """Update all track statistics charts."""
-        self._update_track_frequency_chart()
-        self._update_performance_metrics_chart()
-        self._update_vehicle_activity_chart()
-        self._update_weather_distribution_chart()
+        charts = self.track_day_stats_mngr.compute_all(vehicle=self.app.active_vehicle)
+        self._update_track_frequency_chart(charts["track_frequency"])
+        self._update_performance_metrics_chart(charts["performance_metrics"])
+        self._update_vehicle_activity_chart(charts["vehicle_activity"])
+        self._update_weather_distribution_chart(charts["weather_distribution"])
 
-    def _update_track_frequency_chart(self):
+    def _update_track_frequency_chart(self, chart_data):
         """Update the track frequency chart."""
         self.freq_ax.clear()
-        chart_data = self.track_day_stats_mngr.get_chart_data(
-            "track_frequency",
-            vehicle=self.app.active_vehicle
-        )
         if chart_data.get("labels"):
             self.freq_ax.bar(chart_data["labels"], chart_data["values"], color="#3498DB")
             self.freq_ax.set_title(chart_data["title"], fontsize=14, fontweight="bold")
@@ -170,13 +188,9 @@ class TrackSessionsPage(ctk.CTkFrame):
         self.freq_fig.tight_layout()
         self.freq_canvas.draw()
 
-    def _update_performance_metrics_chart(self):
+    def _update_performance_metrics_chart(self, chart_data):
         """Update the performance metrics chart."""
         self.perf_ax.clear()
-        chart_data = self.track_day_stats_mngr.get_chart_data(
-            "performance_metrics",
-            vehicle=self.app.active_vehicle
-        )
         if chart_data.get("labels"):
             x = np.arange(len(chart_data["labels"]))
             width = 0.35
@@ -202,13 +216,9 @@ class TrackSessionsPage(ctk.CTkFrame):
         self.perf_fig.tight_layout()
         self.perf_canvas.draw()
 
-    def _update_vehicle_activity_chart(self):
+    def _update_vehicle_activity_chart(self, chart_data):
         """Update the vehicle activity chart."""
         self.veh_ax.clear()
-        chart_data = self.track_day_stats_mngr.get_chart_data(
-            "vehicle_activity",
-            vehicle=self.app.active_vehicle
-        )
         if chart_data.get("vehicle_names"):
             x = np.arange(len(chart_data["vehicle_names"]))
             width = 0.35
@@ -234,13 +244,9 @@ class TrackSessionsPage(ctk.CTkFrame):
         self.veh_fig.tight_layout()
         self.veh_canvas.draw()
 
-    def _update_weather_distribution_chart(self):
+    def _update_weather_distribution_chart(self, chart_data):
         """Update the weather distribution pie chart."""
         self.weather_ax.clear()
-        chart_data = self.track_day_stats_mngr.get_chart_data(
-            "weather_distribution",
-            vehicle=self.app.active_vehicle
-        )
         if chart_data.get("labels"):
             self.weather_ax.pie(
                 chart_data["values"],
@@ -253,18 +259,27 @@ class TrackSessionsPage(ctk.CTkFrame):
         self.weather_fig.tight_layout()
         self.weather_canvas.draw()
 
+    def on_track_days_loaded(self):
+        """Refresh the current view once the complete track day history is loaded."""
+        self.display_track_days()
+        if self.current_view == "statistics":
+            self.update_track_statistics()
+
+    def _track_days_loading(self):
+        """Show a notice and return True while the track day history is still loading."""
+        if getattr(self.app, "track_days_loading", False):
+            messagebox.showinfo("Loading", "Track days are still loading, please try again in a moment.")
+            return True
+        return False
+
     def display_track_days(self):
         """Display stored track days as expandable cards."""
         for widget in self.session_frame.winfo_children():
             widget.destroy()
 
-        # Always use up-to-date data from app and update managers
-        self.track_session_mngr.update_data_references(
-            self.app.track_days, self.app.vehicles, self.app.active_vehicle
-        )
-        self.track_day_stats_mngr.update_data_references(
-            self.app.track_days, self.app.vehicles, self.app.active_vehicle
-        )
+        # Track days and vehicles are live views, only the active vehicle has to be passed on
+        self.track_session_mngr.active_vehicle = self.app.active_vehicle
+        self.track_day_stats_mngr.active_vehicle = self.app.active_vehicle
 
         filtered_track_days = self.track_session_mngr.get_filtered_track_days()
 
@@ -278,10 +293,8 @@ class TrackSessionsPage(ctk.CTkFrame):
             no_track_days_label.pack(pady=20)
             return
 
-        # Reverse the order of track days to show the most recent first. New variable to not break original index.
-        reversed_track_day_list = list(reversed(filtered_track_days))
-        for idx, track_day in enumerate(reversed_track_day_list):
-            orig_idx = len(filtered_track_days) - 1 - idx  # Original index in the unfiltered list
+        # Reverse the order of track days to show the most recent first
+        for track_day in reversed(filtered_track_days):
             card = ctk.CTkFrame(self.session_frame, corner_radius=10, border_width=1)
             card.pack(fill="x", pady=5, padx=10)
 
@@ -291,14 +304,14 @@ class TrackSessionsPage(ctk.CTkFrame):
             title_frame = ctk.CTkFrame(header_frame, fg_color="transparent")
             title_frame.pack(side="left", fill="x", expand=True)
 
-            title = ctk.CTkLabel(title_frame, text=f"{track_day['track']} - {track_day['date']}",
+            title = ctk.CTkLabel(title_frame, text=f"{track_day.track} - {track_day.date}",
                                font=("Arial", 16, "bold"))
             title.pack(side="top", anchor="w")
 
-            organizer = ctk.CTkLabel(title_frame, text=f"Organizer: {track_day['organizer']}")
+            organizer = ctk.CTkLabel(title_frame, text=f"Organizer: {track_day.organizer}")
             organizer.pack(side="top", anchor="w")
 
-            vehicle_label = ctk.CTkLabel(title_frame, text=f"Vehicle: {track_day.get('vehicle', 'N/A')}")
+            vehicle_label = ctk.CTkLabel(title_frame, text=f"Vehicle: {track_day.vehicle}")
             vehicle_label.pack(side="top", anchor="w")
 
             buttons_frame = ctk.CTkFrame(header_frame, fg_color="transparent")
@@ -306,32 +319,33 @@ class TrackSessionsPage(ctk.CTkFrame):
 
             delete_button = ctk.CTkButton(buttons_frame, text="Delete",
                                        width=80, height=32,
-                                       command=lambda i=orig_idx: self.delete_track_day(i),
+                                       command=lambda i=track_day.id: self.delete_track_day(i),
                                        fg_color="#E74C3C",
                                        hover_color="#C0392B")
             delete_button.pack(side="left", padx=5)
 
             toggle_button = ctk.CTkButton(buttons_frame, text="View Sessions",
                                         width=120, height=32,
-                                        command=lambda i=orig_idx, c=card: self.toggle_sessions_inline(i, c))
+                                        command=lambda i=track_day.id, c=card: self.toggle_sessions_inline(i, c))
             toggle_button.pack(side="left", padx=5)
 
             content_frame = ctk.CTkFrame(card, fg_color="transparent")
             content_frame.pack(fill="x", padx=10, pady=(0, 10), expand=False)
 
-            self.session_content_frames[orig_idx] = {
+            self.session_content_frames[track_day.id] = {
                 "frame": content_frame,
                 "button": toggle_button,
                 "visible": False
             }
             content_frame.pack_forget()
 
-    def delete_track_day(self, filtered_idx):
+    def delete_track_day(self, track_day_id):
         """Delete a track day with confirmation."""
-        filtered_track_days = self.track_session_mngr.get_filtered_track_days()
-        if not (0 <= filtered_idx < len(filtered_track_days)):
+        if self._track_days_loading():
+            return
+        track_day = self.track_session_mngr.get_track_day(track_day_id)
+        if not track_day:
             return
-        track_day = filtered_track_days[filtered_idx]
 
         dialog = ctk.CTkToplevel(self.app)
         dialog.title("Confirm Delete")
@@ -344,7 +358,7 @@ class TrackSessionsPage(ctk.CTkFrame):
         container.pack(fill="both", expand=True, padx=20, pady=20)
 
         msg = ctk.CTkLabel(container,
-                            text=f"Are you sure you want to delete the track day at {track_day['track']} on {track_day['date']}?\n\nThis will delete ALL sessions from this track day.",
+                            text=f"Are you sure you want to delete the track day at {track_day.track} on {track_day.date}?\n\nThis will delete ALL sessions from this track day.",
                             wraplength=400,
                             font=("Arial", 14))
         msg.pack(pady=20)
@@ -361,8 +375,7 @@ class TrackSessionsPage(ctk.CTkFrame):
         cancel_btn.pack(side="left", padx=5)
 
         def confirm_delete():
-            self.track_session_mngr.delete_track_day(filtered_idx)
-            # Rebuild content frames since indices may have changed
+            self.track_session_mngr.delete_track_day(track_day_id)
             self.session_content_frames = {}
             self.display_track_days()
             dialog.destroy()
@@ -378,8 +391,8 @@ class TrackSessionsPage(ctk.CTkFrame):
         dialog.grab_set()
         dialog.wait_window()
 
-    def toggle_sessions_inline(self, idx, card):
-        content_data = self.session_content_frames[idx]
+    def toggle_sessions_inline(self, track_day_id, card):
+        content_data = self.session_content_frames[track_day_id]
         content_frame = content_data["frame"]
         toggle_button = content_data["button"]
 
@@ -394,15 +407,14 @@ class TrackSessionsPage(ctk.CTkFrame):
                 widget.destroy()
             divider = ctk.CTkFrame(content_frame, height=1, fg_color="#D0D3D4")
             divider.pack(fill="x", pady=5)
-            # Use manager to get sessions for the filtered track day
-            filtered_track_days = self.track_session_mngr.get_filtered_track_days()
-            if 0 <= idx < len(filtered_track_days):
-                self.display_sessions_inline(filtered_track_days[idx], content_frame, idx)
+            track_day = self.track_session_mngr.get_track_day(track_day_id)
+            if track_day:
+                self.display_sessions_inline(track_day, content_frame, track_day_id)
             content_frame.pack(fill="x", padx=10, pady=(0, 10), expand=True)
             toggle_button.configure(text="Hide Sessions", fg_color="#E67E22", hover_color="#D35400")
 
-    def display_sessions_inline(self, track_day, parent_frame, track_day_idx):
-        if not track_day['sessions']:
+    def display_sessions_inline(self, track_day, parent_frame, track_day_id):
+        if not track_day.sessions:
             empty_label = ctk.CTkLabel(parent_frame, text="No sessions recorded yet",
                                     text_color="gray")
             empty_label.pack(pady=10)
@@ -440,7 +452,7 @@ class TrackSessionsPage(ctk.CTkFrame):
             ctk.CTkLabel(header_frame, text="Best Lap", font=("Arial", 11, "bold"),
                     text_color="#2C3E50", fg_color="transparent").grid(row=0, column=5, padx=10, pady=3, sticky="w")
 
-            for i, session in enumerate(track_day['sessions']):
+            for i, session in enumerate(track_day.sessions):
                 row_index = i + 1
                 row_color = "#F5F7FA" if i % 2 == 0 else "#EBEEF2"
                 row_frame = ctk.CTkFrame(table_container, fg_color=row_color, corner_radius=0)
@@ -453,29 +465,29 @@ class TrackSessionsPage(ctk.CTkFrame):
                 row_frame.columnconfigure(4, weight=2)
                 row_frame.columnconfigure(5, weight=2)
 
-                session_num = ctk.CTkLabel(row_frame, text=f"#{session.get('session_number', 'N/A')}",
+                session_num = ctk.CTkLabel(row_frame, text=f"#{session.session_number}",
                                         font=("Arial", 11), fg_color="transparent")
                 session_num.grid(row=0, column=0, padx=20, pady=3, sticky="w")
 
-                laps_label = ctk.CTkLabel(row_frame, text=f"{session.get('laps', 'N/A')}",
+                laps_label = ctk.CTkLabel(row_frame, text=f"{session.laps}",
                                         font=("Arial", 11), fg_color="transparent")
                 laps_label.grid(row=0, column=1, padx=10, pady=3, sticky="w")
 
-                vehicle_label = ctk.CTkLabel(row_frame, text=f"{session.get('vehicle', 'N/A')}",
+                vehicle_label = ctk.CTkLabel(row_frame, text=f"{session.vehicle}",
                                         font=("Arial", 11), fg_color="transparent")
                 vehicle_label.grid(row=0, column=2, padx=10, pady=3, sticky="w")
 
-                weather_label = ctk.CTkLabel(row_frame, text=f"{session.get('weather', 'N/A')}",
+                weather_label = ctk.CTkLabel(row_frame, text=f"{session.weather}",
                                         font=("Arial", 11), fg_color="transparent")
                 weather_label.grid(row=0, column=3, padx=10, pady=3, sticky="w")
 
-                tire_type = session.get('tire_type', 'N/A')
-                tire_status = session.get('tire_status', 'N/A')
+                tire_type = session.tire_type or 'N/A'
+                tire_status = session.tire_status or 'N/A'
                 tire_label = ctk.CTkLabel(row_frame, text=f"{tire_type} | {tire_status}",
                                         font=("Arial", 11), fg_color="transparent")
                 tire_label.grid(row=0, column=4, padx=10, pady=3, sticky="w")
 
-                best_lap = ctk.CTkLabel(row_frame, text=session.get('best_lap_time', 'N/A'),
+                best_lap = ctk.CTkLabel(row_frame, text=session.best_lap_time or 'N/A',
                                     font=("Arial", 11, "bold"), fg_color="transparent")
                 best_lap.grid(row=0, column=5, padx=10, pady=3, sticky="w")
 
@@ -485,12 +497,12 @@ class TrackSessionsPage(ctk.CTkFrame):
                     w.configure(fg_color=c)
                 row_frame.bind("<Enter>", on_enter)
                 row_frame.bind("<Leave>", on_leave)
-                row_frame.bind("<Button-3>", lambda event, s=session, idx=track_day_idx: self.show_session_context_menu(event, s, idx))
+                row_frame.bind("<Button-3>", lambda event, s=session, i=track_day_id: self.show_session_context_menu(event, s, i))
 
         add_button_frame = ctk.CTkFrame(parent_frame, fg_color="transparent")
         add_button_frame.pack(fill="x", pady=5)
 
-        session_numbers = [session.get("session_number", f"Session {i+1}") for i, session in enumerate(track_day['sessions'])]
+        session_numbers = [session.session_number for session in track_day.sessions]
         self.modify_session_var = StringVar(value=session_numbers[0] if session_numbers else "No Sessions")
         modify_session_dropdown = ctk.CTkOptionMenu(
             add_button_frame,
@@ -508,7 +520,7 @@ class TrackSessionsPage(ctk.CTkFrame):
         modify_button = ctk.CTkButton(
             add_button_frame,
             text="Modify Session",
-            command=lambda: self.modify_session_form(track_day_idx, self.modify_session_var.get()),
+            command=lambda: self.modify_session_form(track_day_id, self.modify_session_var.get()),
             fg_color="#6C7A89",
             width=150,
             height=32
@@ -521,24 +533,22 @@ class TrackSessionsPage(ctk.CTkFrame):
             fg_color="#6C7A89",
             width=170,
             height=32,
-            command=lambda: self.open_export_track_day_form(track_day_idx)
+            command=lambda: self.open_export_track_day_form(track_day_id)
         )
         export_button.pack(side="left", padx=5)
 
         add_session_button = ctk.CTkButton(add_button_frame, text="+ Add Session",
                                         width=150, height=32,
-                                        command=lambda: self.add_session_form(track_day_idx),
+                                        command=lambda: self.add_session_form(track_day_id),
                                         fg_color="#2ECC71",
                                         hover_color="#27AE60",
                                         text_color="white",)
         add_session_button.pack(side="right", padx=5, pady=5)
 
-    def modify_session_form(self, track_day_idx, session_number):
-        filtered_track_days = self.track_session_mngr.get_filtered_track_days()
-        if not (0 <= track_day_idx < len(filtered_track_days)):
+    def modify_session_form(self, track_day_id, session_number):
+        if self._track_days_loading():
             return
-        track_day = filtered_track_days[track_day_idx]
-        session = next((s for s in track_day["sessions"] if s.get("session_number") == session_number), None)
+        session = self.track_session_mngr.find_session_by_number(track_day_id, session_number)
         if not session:
             return
 
@@ -555,11 +565,11 @@ class TrackSessionsPage(ctk.CTkFrame):
 
         ctk.CTkLabel(form_frame, text="Number of Laps:", anchor="w", font=("Arial", 12)).pack(fill="x", pady=(field_pady, 2))
         self.laps_entry = ctk.CTkEntry(form_frame, width=450, height=35)
-        self.laps_entry.insert(0, session.get("laps", ""))
+        self.laps_entry.insert(0, session.laps)
         self.laps_entry.pack(fill="x", pady=(0, 10))
 
         ctk.CTkLabel(form_frame, text="Weather:", anchor="w", font=("Arial", 12)).pack(fill="x", pady=(field_pady, 2))
-        self.weather_var = StringVar(value=session.get("weather", self.track_session_mngr.weather_options[0]))
+        self.weather_var = StringVar(value=session.weather or self.track_session_mngr.weather_options[0])
         self.weather_dropdown = ctk.CTkOptionMenu(
             form_frame,
             values=self.track_session_mngr.weather_options,
@@ -583,7 +593,7 @@ class TrackSessionsPage(ctk.CTkFrame):
             fg_color="#F5F7FA",
             border_color="#D0D3D4",
             text_color="#2C3E50")
-        self.tire_type_entry.insert(0, session.get("tire_type", ""))
+        self.tire_type_entry.insert(0, session.tire_type)
         self.tire_type_entry.pack(fill="x", pady=(0, field_pady))
 
         ctk.CTkLabel(form_frame, text="Tire Status:", anchor="w", font=("Arial", 12)).pack(fill="x", pady=(field_pady, 2))
@@ -594,7 +604,7 @@ class TrackSessionsPage(ctk.CTkFrame):
             fg_color="#F5F7FA",
             border_color="#D0D3D4",
             text_color="#2C3E50")
-        self.tire_status_entry.insert(0, session.get("tire_status", ""))
+        self.tire_status_entry.insert(0, session.tire_status)
         self.tire_status_entry.pack(fill="x", pady=(0, field_pady))
 
         ctk.CTkLabel(form_frame, text="Best Lap Time:", anchor="w", font=("Arial", 12)).pack(fill="x", pady=(field_pady, 2))
@@ -605,7 +615,7 @@ class TrackSessionsPage(ctk.CTkFrame):
             fg_color="#F5F7FA",
             border_color="#D0D3D4",
             text_color="#2C3E50")
-        self.best_lap_time_entry.insert(0, session.get("best_lap_time", ""))
+        self.best_lap_time_entry.insert(0, session.best_lap_time)
         self.best_lap_time_entry.pack(fill="x", pady=(0, field_pady))
 
         ctk.CTkLabel(form_frame, text="Comments:", anchor="w", font=("Arial", 12)).pack(fill="x", pady=(field_pady, 2))
@@ -616,13 +626,13 @@ class TrackSessionsPage(ctk.CTkFrame):
             fg_color="#F5F7FA",
             border_color="#D0D3D4",
             text_color="#2C3E50")
-        self.comments_entry.insert(0, session.get("comments", ""))
+        self.comments_entry.insert(0, session.comments)
         self.comments_entry.pack(fill="x", pady=(0, field_pady))
 
         save_button = ctk.CTkButton(
             form_frame,
             text="Save Changes",
-            command=lambda: self.save_modified_session(track_day_idx, session),
+            command=lambda: self.save_modified_session(track_day_id, session),
             fg_color="#2ECC71",
             hover_color="#27AE60",
             width=150,
@@ -633,33 +643,35 @@ class TrackSessionsPage(ctk.CTkFrame):
         self.session_form_window.grab_set()
         self.session_form_window.focus_set()
 
-    def save_modified_session(self, track_day_idx, session):
-        session["laps"] = self.laps_entry.get()
-        session["weather"] = self.weather_var.get()
-        session["tire_type"] = self.tire_type_entry.get()
-        session["tire_status"] = self.tire_status_entry.get()
-        session["best_lap_time"] = self.best_lap_time_entry.get()
-        session["comments"] = self.comments_entry.get()
-        self.track_session_mngr.save_callback(self.track_session_mngr.track_days)
+    def save_modified_session(self, track_day_id, session):
+        self.track_session_mngr.update_session(track_day_id, session.id, {
+            "laps": self.laps_entry.get(),
+            "weather": self.weather_var.get(),
+            "tire_type": self.tire_type_entry.get(),
+            "tire_status": self.tire_status_entry.get(),
+            "best_lap_time": self.best_lap_time_entry.get(),
+            "comments": self.comments_entry.get()
+        })
         self.session_form_window.destroy()
-        content_data = self.session_content_frames.get(track_day_idx)
+        content_data = self.session_content_frames.get(track_day_id)
         if content_data and content_data["visible"]:
-            self.toggle_sessions_inline(track_day_idx, None)
-            self.toggle_sessions_inline(track_day_idx, None)
+            self.toggle_sessions_inline(track_day_id, None)
+            self.toggle_sessions_inline(track_day_id, None)
 
-    def show_session_context_menu(self, event, session, track_day_idx):
+    def show_session_context_menu(self, event, session, track_day_id):
         pass  # Placeholder for future context menu
 
-    def add_session_form(self, track_day_idx):
+    def add_session_form(self, track_day_id):
+        if self._track_days_loading():
+            return
         self.session_form_window = ctk.CTkToplevel(self)
         self.session_form_window.title("Add New Session")
         self.session_form_window.geometry("550x650")
 
-        filtered_track_days = self.track_session_mngr.get_filtered_track_days()
-        if not (0 <= track_day_idx < len(filtered_track_days)):
+        track_day = self.track_session_mngr.get_track_day(track_day_id)
+        if not track_day:
             return
-        track_day = filtered_track_days[track_day_idx]
-        track_day_vehicle = track_day.get("vehicle", "N/A")
+        track_day_vehicle = track_day.vehicle
 
         self.session_form_window.transient(self)
         self.session_form_window.update_idletasks()
@@ -691,14 +703,14 @@ class TrackSessionsPage(ctk.CTkFrame):
 
         ctk.CTkLabel(scrollable_frame, text="Session Number:", anchor="w", font=("Arial", 12)).pack(fill="x", pady=(field_pady, 2))
         session_number_entry = ctk.CTkEntry(scrollable_frame, width=450, height=35)
-        session_number_entry.insert(0, str(len(track_day["sessions"]) + 1))
+        session_number_entry.insert(0, str(len(track_day.sessions) + 1))
         session_number_entry.pack(fill="x", pady=(0, field_pady))
 
         ctk.CTkLabel(scrollable_frame, text="Number of Laps:", anchor="w", font=("Arial", 12)).pack(fill="x", pady=(field_pady, 2))
         laps_entry = ctk.CTkEntry(scrollable_frame, width=450, height=35)
         laps_entry.pack(fill="x", pady=(0, field_pady))
 
-        if track_day_vehicle != "N/A":
+        if track_day_vehicle:
             ctk.CTkLabel(scrollable_frame, text="Vehicle:", anchor="w", font=("Arial", 12)).pack(fill="x", pady=(field_pady, 2))
             vehicle_label = ctk.CTkLabel(
                 scrollable_frame,
@@ -766,7 +778,7 @@ class TrackSessionsPage(ctk.CTkFrame):
         def save_session():
             session_number = session_number_entry.get()
             laps = laps_entry.get()
-            if track_day_vehicle != "N/A":
+            if track_day_vehicle:
                 vehicle = track_day_vehicle
             else:
                 vehicle = vehicle_var.get()
@@ -776,22 +788,22 @@ class TrackSessionsPage(ctk.CTkFrame):
             best_lap_time = best_lap_time_entry.get()
             comments = comments_entry.get()
 
-            new_session = {
-                "session_number": session_number,
-                "laps": laps,
-                "vehicle": vehicle,
-                "weather": weather,
-                "tire_type": tire_type,
-                "tire_status": tire_status,
-                "best_lap_time": best_lap_time,
-                "comments": comments
-            }
+            new_session = Session(
+                session_number=session_number,
+                laps=laps,
+                vehicle=vehicle,
+                weather=weather,
+                tire_type=tire_type,
+                tire_status=tire_status,
+                best_lap_time=best_lap_time,
+                comments=comments
+            )
 
             # Use manager to add session
-            self.track_session_mngr.add_session(track_day_idx, new_session)
+            self.track_session_mngr.add_session(track_day_id, new_session)
             self.session_form_window.destroy()
             self.display_track_days()
-            self.toggle_sessions_inline(track_day_idx, None)
+            self.toggle_sessions_inline(track_day_id, None)
             cleanup_mousewheel_bindings()
 
         cancel_button = ctk.CTkButton(
@@ -822,6 +834,8 @@ class TrackSessionsPage(ctk.CTkFrame):
         self.session_form_window.focus_set()
 
     def create_new_track_day(self):
+        if self._track_days_loading():
+            return
         self.new_window = ctk.CTkToplevel(self)
         self.new_window.title("New Track Day")
         self.new_window.geometry("400x300")
@@ -864,12 +878,12 @@ class TrackSessionsPage(ctk.CTkFrame):
         except ValueError:
             ctk.CTkLabel(self.new_window, text="Please add a vehicle before creating a track day.", text_color="red").pack()
    
-    def open_export_track_day_form(self, track_day_idx):
+    def open_export_track_day_form(self, track_day_id):
 
         # Set default export directory and filename
         default_dir = os.path.join(os.path.expanduser("~"), ".local/racing-companion/exports")
-        track_day = self.track_session_mngr.get_track_day(track_day_idx)
-        default_filename = f"{track_day.get('track', 'track_day')}_{track_day.get('date', 'unknown_date')}.csv"
+        track_day = self.track_session_mngr.get_track_day(track_day_id)
+        default_filename = f"{track_day.track or 'track_day'}_{track_day.date or 'unknown_date'}.csv"
 
         # Create file in order to pre-fill it in user dialog, otherwise it will not show up
         os.makedirs(default_dir, exist_ok=True)
@@ -888,13 +902,104 @@ class TrackSessionsPage(ctk.CTkFrame):
             return  # User cancelled
 
         # Export using the manager
-        success = self.track_session_mngr.export_track_day_to_csv(track_day_idx, file_path)
+        success = self.track_session_mngr.export_track_day_to_csv(track_day_id, file_path)
         if success:
             messagebox.showinfo("Export Successful", f"Track day exported to:\n{file_path}")
         else:
             messagebox.showerror("Export Failed", "Failed to export track day to CSV.")
 
+    def open_export_all_dialog(self):
+        """Export the track days of the active vehicle to CSV in the background, with progress and cancel."""
+        if self._track_days_loading():
+            return
+        track_day_ids = [track_day.id for track_day in self.track_session_mngr.get_filtered_track_days()]
+        if not track_day_ids:
+            messagebox.showinfo("Export", "There are no track days to export.")
+            return
+
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("Export Track Days")
+        dialog.geometry("400x220")
+        dialog.transient(self)
+        dialog.update_idletasks()
+        dialog.grab_set()
+
+        ctk.CTkLabel(
+            dialog,
+            text=f"Export {len(track_day_ids)} track days to:",
+            anchor="w",
+            font=("Arial", 12, "bold")
+        ).pack(fill="x", padx=20, pady=(15, 5))
+        mode_selector = ctk.CTkSegmentedButton(dialog, values=["One file per day", "Single file"])
+        mode_selector.set("One file per day")
+        mode_selector.pack(fill="x", padx=20, pady=5)
+
+        progress_bar = ctk.CTkProgressBar(dialog)
+        progress_bar.set(0)
+        progress_bar.pack(fill="x", padx=20, pady=(15, 5))
+        progress_label = ctk.CTkLabel(dialog, text="")
+        progress_label.pack(fill="x", padx=20)
+
+        button_frame = ctk.CTkFrame(dialog, fg_color="transparent")
+        button_frame.pack(fill="x", padx=20, pady=10)
+        export = None
+
+        def poll_export():
+            progress_bar.set(export.done / export.total)
+            progress_label.configure(text=f"{export.done} / {export.total}")
+            if not export.finished:
+                self.after(100, poll_export)
+                return
+            dialog.destroy()
+            if export.error:
+                messagebox.showerror("Export Failed", f"Failed to export track days to CSV:\n{export.error}")
+            elif export.cancelled:
+                messagebox.showinfo("Export Cancelled", f"Exported {len(export.files)} files before the export was cancelled.")
+            elif export.failed:
+                messagebox.showerror("Export Failed", f"Failed to export {len(export.failed)} of {export.total} track days.")
+            else:
+                messagebox.showinfo("Export Successful", f"Track days exported to:\n{export.target}")
+
+        def start_export():
+            nonlocal export
+            os.makedirs(csv_export_directory, exist_ok=True)
+            combined = mode_selector.get() == "Single file"
+            if combined:
+                target = fd.asksaveasfilename(
+                    parent=dialog,
+                    initialdir=csv_export_directory,
+                    initialfile="track_days.csv",
+                    defaultextension=".csv",
+                    filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+                )
+            else:
+                target = fd.askdirectory(parent=dialog, initialdir=csv_export_directory)
+            if not target:
+                return
+            export = BatchExport(self.track_session_mngr, track_day_ids, target, combined=combined).start()
+            mode_selector.configure(state="disabled")
+            export_button.configure(state="disabled")
+            cancel_button.configure(text="Cancel Export", command=export.cancel)
+            poll_export()
+
+        export_button = ctk.CTkButton(button_frame, text="Export", command=start_export)
+        export_button.pack(side="left", expand=True, padx=5)
+        cancel_button = ctk.CTkButton(button_frame, text="Close", fg_color="#6C7A89", command=dialog.destroy)
+        cancel_button.pack(side="left", expand=True, padx=5)
+
+        def close_dialog():
+            # A running export is cancelled, the dialog closes when it has stopped
+            if export:
+                export.cancel()
+            else:
+                dialog.destroy()
+        dialog.protocol("WM_DELETE_WINDOW", close_dialog)
+
     def open_track_day_report_dialog(self):
+      if self._track_days_loading():
+         return
+      # Years and tracks come from the shard manifest, track days of all vehicles are loaded for the report
+      self.track_day_report_mngr.shards = self.app.data_store.track_day_shards.get_shards()
       dialog = ctk.CTkToplevel(self)
       dialog.title("Track Day Report")
       dialog.geometry("400x420")
@@ -953,7 +1058,7 @@ class TrackSessionsPage(ctk.CTkFrame):
                ctk.CTkLabel(form_frame, text="Select Track Day:", anchor="w", font=("Arial", 12, "bold")).pack(fill="x", pady=(field_pady, 2))
                # Build list of all track days (Same list as displayed)
                track_days = self.app.track_days
-               track_day_options = [f"{td.get('track', 'N/A')} - {td.get('date', 'N/A')}" for td in track_days]
+               track_day_options = [f"{td.track} - {td.date}" for td in track_days]
                specific_track_day_var.set("")
                specific_track_day_menu = ctk.CTkOptionMenu(
                   form_frame,
@@ -1079,7 +1184,7 @@ class TrackSessionsPage(ctk.CTkFrame):
                   selected = specific_track_day_var.get()
                   # Find the track day object
                   track_days = self.app.track_days
-                  td = next((td for td in track_days if f"{td.get('track', 'N/A')} - {td.get('date', 'N/A')}" == selected), None)
+                  td = next((td for td in track_days if f"{td.track} - {td.date}" == selected), None)
                   result = self.track_day_report_mngr.generate_report("specific", track_day=td)
                else:
                   report_type = report_type_var.get()
@@ -1095,6 +1200,8 @@ class TrackSessionsPage(ctk.CTkFrame):
                   vehicle = vehicle_var.get()
                   year = year_var.get() if report_type == "summary" else None
                   track = track_var.get()
+                  # Reports cover every vehicle, the cube is rebuilt for the new list
+                  self.track_day_report_mngr.track_days = self.app.data_store.track_day_shards.all_track_days()
                   result = self.track_day_report_mngr.generate_report(report_type, vehicle, year, track=track)
 
                self.show_report_window(result)
@@ -2,9 +2,8 @@
 # Author: dherslof
 
 import customtkinter as ctk
-from tkinter import StringVar
+from tkinter import StringVar, messagebox
 from datetime import datetime
-from rcfunc.data_utils import save_vehicles
 from rcfunc.vehicle_mngr import VehicleMngr
 
 class WelcomePage(ctk.CTkFrame):
@@ -68,11 +67,28 @@ class WelcomePage(ctk.CTkFrame):
 
         self.display_vehicles()
 
+    def on_vehicles_loaded(self):
+        """Show the vehicles once they are loaded in the background."""
+        self.vehicle_manager.vehicles = self.app.vehicles
+        self.vehicle_manager.vehicle_data = self.app.vehicle_data
+        self.display_vehicles()
+
+    def _vehicles_loading(self):
+        """Show a notice and return True while the vehicles are still loading."""
+        if self.app.data_store.is_loading("vehicles"):
+            messagebox.showinfo("Loading", "Vehicles are still loading, please try again in a moment.")
+            return True
+        return False
+
     def sync_with_app(self):
         """Sync vehicle manager data with app data."""
+        active_vehicle_changed = self.app.active_vehicle != self.vehicle_manager.active_vehicle
         self.app.vehicles = self.vehicle_manager.vehicles
         self.app.vehicle_data = self.vehicle_manager.vehicle_data
         self.app.active_vehicle = self.vehicle_manager.active_vehicle
+        # Only the track day shards of the active vehicle are kept loaded
+        if active_vehicle_changed and hasattr(self.app, "load_track_days"):
+            self.app.load_track_days()
 
     def display_vehicles(self):
         """Display vehicles as cards in the welcome page."""
@@ -170,6 +186,8 @@ class WelcomePage(ctk.CTkFrame):
 
     def show_add_vehicle_dialog(self):
         """Display dialog for adding a new vehicle."""
+        if self._vehicles_loading():
+            return
         dialog = ctk.CTkToplevel(self.app)
         dialog.title("Add New Vehicle")
         dialog.geometry("400x500")
@@ -238,7 +256,7 @@ class WelcomePage(ctk.CTkFrame):
             
             if self.vehicle_manager.add_vehicle(vehicle_name, vehicle_type, model_year, misc):
                 self.sync_with_app()
-                save_vehicles(self.app.vehicles, self.app.vehicle_data)
+                self.app.data_store.save_vehicles()
                 self.display_vehicles()
                 dialog.destroy()
 
@@ -255,6 +273,8 @@ class WelcomePage(ctk.CTkFrame):
 
     def edit_vehicle(self, vehicle):
         """Edit an existing vehicle."""
+        if self._vehicles_loading():
+            return
         dialog = ctk.CTkToplevel(self.app)
         dialog.title("Edit Vehicle")
         dialog.geometry("400x500")
@@ -329,7 +349,7 @@ class WelcomePage(ctk.CTkFrame):
 
             if self.vehicle_manager.edit_vehicle(vehicle, new_name, new_type, new_year, new_misc):
                 self.sync_with_app()
-                save_vehicles(self.app.vehicles, self.app.vehicle_data)
+                self.app.data_store.save_vehicles()
                 self.display_vehicles()
                 dialog.destroy()
 
@@ -346,6 +366,8 @@ class WelcomePage(ctk.CTkFrame):
 
     def delete_vehicle(self, vehicle):
         """Delete a vehicle with confirmation."""
+        if self._vehicles_loading():
+            return
         dialog = ctk.CTkToplevel(self.app)
         dialog.title("Confirm Delete")
         dialog.geometry("400x180")
@@ -375,7 +397,7 @@ class WelcomePage(ctk.CTkFrame):
         def confirm_delete():
             if self.vehicle_manager.delete_vehicle(vehicle):
                 self.sync_with_app()
-                save_vehicles(self.app.vehicles, self.app.vehicle_data)
+                self.app.data_store.save_vehicles()
                 self.display_vehicles()
                 dialog.destroy()
 
@@ -0,0 +1,161 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Unit tests for the background (write-behind) writer
+# License: TBD
+
+import os
+import threading
+
+import pytest
+
+import rcfunc.data_utils as data_utils
+from rcfunc.background_writer import BackgroundWriter
+from rcfunc.track_day_models import Session, TrackDay
+
+
+@pytest.fixture
+def writer():
+   writer = BackgroundWriter(coalesce_delay=0.05)
+   yield writer
+   writer.close(timeout=5)
+
+class TestBackgroundWriter:
+   def test_burst_is_coalesced_into_one_write(self, writer):
+      written = []
+      for i in range(10):
+         writer.submit("file", lambda i=i: written.append(i))
+      assert writer.flush(timeout=5)
+
+      assert written == [9]
+      stats = writer.get_stats()
+      assert stats["submitted"] == 10
+      assert stats["coalesced"] == 9
+      assert stats["writes"] == 1
+      assert stats["queue_depth"] == 0
+      assert stats["max_queue_depth"] == 1
+      assert stats["last_latency"] > 0
+
+   def test_writes_for_different_keys_are_kept(self, writer):
+      written = []
+      writer.submit("a", lambda: written.append("a"))
+      writer.submit("b", lambda: written.append("b"))
+      assert writer.flush(timeout=5)
+      assert written == ["a", "b"]
+      assert writer.get_stats()["max_queue_depth"] == 2
+
+   def test_appends_run_in_order(self, writer):
+      written = []
+      for i in range(3):
+         writer.submit_append("file", lambda i=i: written.append(i), lambda: lambda: written.append("full"))
+      assert writer.flush(timeout=5)
+      assert written == [0, 1, 2]
+
+   def test_append_is_folded_into_pending_full_write(self, writer):
+      written = []
+      writer.submit("file", lambda: written.append("full"))
+      writer.submit_append("file", lambda: written.append("append"), lambda: lambda: written.append("full again"))
+      assert writer.flush(timeout=5)
+      assert written == ["full again"]
+
+   def test_append_during_running_full_write_queues_full_write(self, writer):
+      written = []
+      started = threading.Event()
+      release = threading.Event()
+
+      def slow_write():
+         started.set()
+         release.wait(5)
+         written.append("full")
+
+      writer.submit("file", slow_write)
+      assert started.wait(5)
+      writer.submit_append("file", lambda: written.append("append"), lambda: lambda: written.append("full again"))
+      release.set()
+      assert writer.flush(timeout=5)
+      assert written == ["full", "full again"]
+
+   def test_flush_timeout(self, writer):
+      release = threading.Event()
+      writer.submit("file", lambda: release.wait(5))
+      assert writer.flush(timeout=0.1) is False
+      release.set()
+      assert writer.flush(timeout=5)
+
+   def test_failed_write_is_counted(self, writer):
+      def failing_write():
+         raise OSError("disk full")
+
+      writer.submit("file", failing_write)
+      assert writer.flush(timeout=5)
+      assert writer.get_stats()["failures"] == 1
+
+   def test_submit_after_close_raises(self):
+      writer = BackgroundWriter()
+      writer.close(timeout=5)
+      with pytest.raises(RuntimeError):
+         writer.submit("file", lambda: None)
+
+class TestDataUtilsWithBackgroundWriter:
+   @pytest.fixture(autouse=True)
+   def background_writer(self, writer):
+      data_utils.set_background_writer(writer)
+      yield writer
+      data_utils.set_background_writer(None)
+
+   def test_saves_are_written_on_flush(self, background_writer, tmp_path):
+      track_days_file = str(tmp_path / "track_sessions.json")
+      maintenance_file = str(tmp_path / "maintenance_entries.json")
+      vehicles_file = str(tmp_path / "vehicles.json")
+      track_days = [TrackDay(track="Track1", date="2024-06-12", organizer="Org1", vehicle="Car1")]
+
+      data_utils.save_data(track_days, filename=track_days_file)
+      session = Session(session_number="1")
+      track_days[0].sessions.append(session)
+      data_utils.append_journal_record({"op": "add_session", "track_day_id": track_days[0].id, "session": session}, track_days, filename=track_days_file)
+      data_utils.save_maintenance_entries([{"title": "Oil"}], filename=maintenance_file)
+      data_utils.save_vehicles(["Car1"], {"Car1": {"type": "Car"}}, filename=vehicles_file)
+      assert background_writer.flush(timeout=5)
+
+      # The journal record is folded into the pending snapshot write
+      assert not os.path.exists(data_utils.journal_file_for(track_days_file))
+      assert data_utils.load_data(filename=track_days_file) == track_days
+      assert data_utils.load_maintenance_entries(filename=maintenance_file) == [{"title": "Oil"}]
+      assert data_utils.load_vehicles(filename=vehicles_file) == (["Car1"], {"Car1": {"type": "Car"}})
+      assert sorted(os.listdir(tmp_path)) == [
+         "maintenance_entries.json", "maintenance_entries.json.bin", "track_sessions.json", "track_sessions.json.index",
+         "track_sessions.json.index.bin", "vehicles.json", "vehicles.json.bin"
+      ]
+
+   def test_saves_write_the_data_as_submitted(self, background_writer, tmp_path):
+      track_days_file = str(tmp_path / "track_sessions.json")
+      maintenance_file = str(tmp_path / "maintenance_entries.json")
+      release = threading.Event()
+      background_writer.submit("blocker", lambda: release.wait(5))
+      track_days = [TrackDay(track="Track1", date="2024-06-12", organizer="Org1", vehicle="Car1")]
+      entries = [{"title": "Oil"}]
+      data_utils.save_data(track_days, filename=track_days_file)
+      data_utils.save_maintenance_entries(entries, filename=maintenance_file)
+
+      # Changed while the writes are still queued
+      track_days[0].sessions.append(Session(session_number="1"))
+      track_days.append(TrackDay(track="Track2"))
+      entries[0]["title"] = "Chain"
+      release.set()
+      assert background_writer.flush(timeout=5)
+
+      assert data_utils.load_data(filename=track_days_file) == [TrackDay(track="Track1", date="2024-06-12", organizer="Org1", vehicle="Car1", id=track_days[0].id)]
+      assert data_utils.load_maintenance_entries(filename=maintenance_file) == [{"title": "Oil"}]
+
+   def test_journal_appends_after_flushed_snapshot(self, background_writer, tmp_path):
+      track_days_file = str(tmp_path / "track_sessions.json")
+      track_days = [TrackDay(track="Track1", date="2024-06-12", organizer="Org1", vehicle="Car1")]
+      data_utils.save_data(track_days, filename=track_days_file)
+      assert background_writer.flush(timeout=5)
+
+      session = Session(session_number="1")
+      track_days[0].sessions.append(session)
+      data_utils.append_journal_record({"op": "add_session", "track_day_id": track_days[0].id, "session": session}, track_days, filename=track_days_file)
+      assert background_writer.flush(timeout=5)
+
+      assert os.path.exists(data_utils.journal_file_for(track_days_file))
+      assert data_utils.load_data(filename=track_days_file) == track_days
@@ -0,0 +1,65 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Unit tests for the binary snapshots of the JSON storage files
+# License: TBD
+
+import json
+import marshal
+import os
+
+import pytest
+
+import rcfunc.binary_snapshot as binary_snapshot
+from rcfunc.binary_snapshot import binary_file_for, load_binary, load_json
+from rcfunc.data_utils import write_json_atomic
+
+
+@pytest.fixture
+def entries():
+   return [
+      {"title": "Oil change", "vehicle": "Car1", "date": "2025-05-10", "duration": 1.5, "tags": ["Minor", "Oil"], "done": True},
+      {"title": "Tire change", "vehicle": "Car1", "date": "2025-05-15", "duration": None, "tags": [], "done": False}
+   ]
+
+@pytest.fixture
+def filename(tmp_path, entries):
+   filename = str(tmp_path / "maintenance_entries.json")
+   write_json_atomic(entries, filename)
+   return filename
+
+class TestBinarySnapshot:
+   def test_binary_copy_is_written_with_json(self, filename, entries):
+      assert os.path.exists(binary_file_for(filename))
+      assert load_binary(filename) == entries
+      assert load_json(filename) == entries
+
+   def test_outdated_copy_is_ignored_and_refreshed(self, filename, entries):
+      entries.append({"title": "Brakes"})
+      with open(filename, "w") as file:
+         json.dump(entries, file, indent=4)
+
+      assert load_binary(filename) is None
+      assert load_json(filename) == entries
+      assert load_binary(filename) == entries
+
+   def test_copy_from_other_format_is_ignored(self, filename, entries):
+      stat = os.stat(filename)
+      header = marshal.dumps((("rc-binary-snapshot", 0, (2, 7)), (stat.st_size, stat.st_mtime_ns)))
+      with open(binary_file_for(filename), "wb") as file:
+         file.write(binary_snapshot.HEADER_LENGTH.pack(len(header)) + header + marshal.dumps([]))
+      assert load_binary(filename) is None
+      assert load_json(filename) == entries
+
+   def test_truncated_copy_is_ignored(self, filename, entries):
+      binary_file = binary_file_for(filename)
+      with open(binary_file, "r+b") as file:
+         file.truncate(os.path.getsize(binary_file) - 10)
+      assert load_binary(filename) is None
+      assert load_json(filename) == entries
+
+   def test_disabled(self, tmp_path, entries, monkeypatch):
+      monkeypatch.setattr(binary_snapshot, "ENABLED", False)
+      filename = str(tmp_path / "vehicles.json")
+      write_json_atomic(entries, filename)
+      assert load_json(filename) == entries
+      assert not os.path.exists(binary_file_for(filename))
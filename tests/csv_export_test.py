@@ -0,0 +1,110 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Unit tests for the batch CSV export
+# License: TBD
+
+import csv
+import os
+import threading
+
+import pytest
+
+import rcfunc.csv_export as csv_export
+from rcfunc.csv_export import BatchExport, export_file_name
+from rcfunc.csv_import import import_csv
+from rcfunc.track_day_index import SessionStore, write_snapshot
+from rcfunc.track_day_models import TrackDay
+from rcfunc.track_session_mngr import TrackSessionMngr
+
+
+@pytest.fixture
+def mngr():
+   track_days = [
+      TrackDay.from_dict({
+         "id": f"day{day}", "track": "Track/1" if day < 2 else f"Track{day}", "date": "2024-06-12", "vehicle": "Car1",
+         "sessions": [
+            {"session_number": str(number), "laps": "10", "vehicle": "Car1", "weather": "Sunny", "comments": "Dry, warm"}
+            for number in range(1, day + 1)
+         ]
+      })
+      for day in range(6)
+   ]
+   return TrackSessionMngr(track_days, ["Car1"], None, ["Sunny"], lambda track_days: None)
+
+def read_rows(path):
+   with open(path, newline="", encoding="utf-8") as csvfile:
+      return list(csv.DictReader(csvfile))
+
+class TestBatchExport:
+   def test_one_file_per_track_day(self, mngr, tmp_path):
+      export = BatchExport(mngr, [day.id for day in mngr.track_days] + ["unknown"], str(tmp_path / "season")).start()
+      assert export.wait(10)
+      assert (export.done, export.total, export.failed, export.error) == (7, 7, ["unknown"], None)
+      assert [os.path.basename(path) for path in export.files] == [
+         "Track_1_2024-06-12.csv", "Track_1_2024-06-12_2.csv", "Track2_2024-06-12.csv",
+         "Track3_2024-06-12.csv", "Track4_2024-06-12.csv", "Track5_2024-06-12.csv"
+      ]
+      assert [len(read_rows(path)) for path in export.files] == [1, 1, 2, 3, 4, 5]
+
+   def test_combined_file(self, mngr, tmp_path):
+      path = str(tmp_path / "season.csv")
+      export = BatchExport(mngr, [day.id for day in reversed(mngr.track_days)], path, combined=True, max_workers=2).start()
+      assert export.wait(10)
+      assert export.files == [path] and export.failed == []
+      rows = read_rows(path)
+      assert len(rows) == 16
+      assert [row["track"] for row in rows][:6] == ["Track5"] * 5 + ["Track4"]
+      assert rows[0]["comments"] == "Dry, warm"
+
+      # The combined file imports back
+      target = TrackSessionMngr([], ["Car1"], None, ["Sunny"], lambda track_days: None)
+      result = import_csv(path, target)
+      assert (result.track_days_created, result.sessions_added, result.rejected) == (5, 15, [])
+
+   def test_cancel(self, mngr, tmp_path, monkeypatch):
+      started = threading.Event()
+      release = threading.Event()
+      export_track_day = csv_export._export_track_day
+
+      def slow_export(track_day, file_path):
+         started.set()
+         release.wait(10)
+         return export_track_day(track_day, file_path)
+      monkeypatch.setattr(csv_export, "_export_track_day", slow_export)
+
+      export = BatchExport(mngr, [day.id for day in mngr.track_days] * 10, str(tmp_path / "files"), max_workers=1).start()
+      assert started.wait(10)
+      export.cancel()
+      release.set()
+      assert export.wait(10)
+      assert export.cancelled and export.done < export.total
+      assert len(os.listdir(tmp_path / "files")) == export.done
+
+      path = str(tmp_path / "season.csv")
+      export = BatchExport(mngr, [day.id for day in mngr.track_days], path, combined=True)
+      export.cancel()
+      assert export.start().wait(10)
+      assert export.done == 0 and not os.path.exists(path)
+
+   def test_lazy_track_days_are_only_read(self, tmp_path):
+      track_days = [
+         TrackDay.from_dict({"track": f"Track{i}", "date": "2024-06-12", "vehicle": "Car1", "sessions": [{"session_number": "1", "laps": str(i)}]})
+         for i in range(4)
+      ]
+      filename = str(tmp_path / "track_sessions.json")
+      write_snapshot(track_days, filename)
+      store = SessionStore(filename, max_resident=1)
+      lazy_days = store.load_headers()
+      lazy_days[0].sessions
+      mngr = TrackSessionMngr(lazy_days, ["Car1"], None, ["Sunny"], lambda track_days: None)
+
+      export = BatchExport(mngr, [day.id for day in lazy_days], str(tmp_path / "season.csv"), combined=True).start()
+      assert export.wait(10)
+      assert [row["laps"] for row in read_rows(export.files[0])] == ["0", "1", "2", "3"]
+      # The workers neither loaded nor dropped session lists
+      assert [day.sessions_loaded() for day in lazy_days] == [True, False, False, False]
+      assert store.loads == 1
+
+   def test_export_file_name(self):
+      assert export_file_name(TrackDay(track="Spa: GP", date="2024-06-12")) == "Spa_ GP_2024-06-12.csv"
+      assert export_file_name(TrackDay()) == "track_day_unknown_date.csv"
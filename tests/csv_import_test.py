@@ -0,0 +1,151 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Unit tests for the CSV session import
+# License: TBD
+
+import pytest
+
+from rcfunc.csv_import import import_csv, iso_date, map_columns, parse_rows
+from rcfunc.track_day_models import Session, TrackDay
+from rcfunc.track_session_mngr import TrackSessionMngr
+
+
+@pytest.fixture
+def mngr():
+   track_days = [TrackDay.from_dict({
+      "id": "day1", "track": "Track1", "date": "2024-06-12", "organizer": "Org1", "vehicle": "Car1",
+      "sessions": [{"session_number": "1", "laps": "10", "vehicle": "Car1", "weather": "Sunny", "best_lap_time": "1:42.0"}]
+   })]
+   mngr = TrackSessionMngr(track_days, ["Car1", "Car2"], None, ["Sunny", "Rain"], lambda track_days: None)
+   mngr.saves = 0
+
+   def save(track_days):
+      mngr.saves += 1
+   mngr.save_callback = save
+   return mngr
+
+def write_csv(tmp_path, text, name="import.csv"):
+   path = tmp_path / name
+   path.write_text(text, encoding="utf-8")
+   return str(path)
+
+class TestCsvImport:
+   def test_export_round_trip(self, mngr, tmp_path):
+      mngr.add_session("day1", Session(
+         session_number="2", laps="8", vehicle="Car1", weather="Rain", best_lap_time="1:40.5", comments="Fast, dry line"
+      ))
+      exported = str(tmp_path / "export.csv")
+      assert mngr.export_track_day_to_csv("day1", exported)
+      empty_day = TrackDay(track="Track2", date="2024-07-01", organizer="Org2", vehicle="Car2")
+      other = TrackSessionMngr([empty_day], ["Car2"], None, ["Sunny"], lambda track_days: None)
+      exported_empty = str(tmp_path / "export_empty.csv")
+      assert other.export_track_day_to_csv(empty_day.id, exported_empty)
+
+      target = TrackSessionMngr([], ["Car1", "Car2"], None, ["Sunny"], lambda track_days: None)
+      result = import_csv(exported, target)
+      assert (result.track_days_created, result.sessions_added, result.rejected) == (1, 2, [])
+      imported = target.track_days[0]
+      assert (imported.track, imported.date, imported.organizer, imported.vehicle) == ("Track1", "2024-06-12", "Org1", "Car1")
+      assert [session.to_dict() | {"id": ""} for session in imported.sessions] == [
+         session.to_dict() | {"id": ""} for session in mngr.track_days[0].sessions
+      ]
+
+      result = import_csv(exported_empty, target)
+      assert (result.track_days_created, result.sessions_added) == (1, 0)
+      assert target.track_days[1].track == "Track2" and target.track_days[1].sessions == []
+
+   def test_lap_timer_file_with_a_row_per_lap(self, mngr, tmp_path):
+      path = write_csv(tmp_path, (
+         "Session;Lap;Lap Time;Time of day\n"
+         "1;1;1:45.200;10:01\n"
+         "1;2;1:43.900;10:03\n"
+         "1;3;;10:05\n"
+         "2;1;1:44.000;11:00\n"
+         "2;2;103.500;11:02\n"
+      ))
+      defaults = {"track": "Track3", "date": "20.07.2024", "vehicle": "Car2", "weather": "Sunny"}
+      result = import_csv(path, mngr, defaults=defaults)
+      assert (result.track_days_created, result.sessions_added, result.rejected) == (1, 2, [])
+      track_day = mngr.track_days[1]
+      assert (track_day.track, track_day.date, track_day.vehicle) == ("Track3", "2024-07-20", "Car2")
+      assert [(s.session_number, s.laps, s.best_lap_time, s.weather) for s in track_day.sessions] == [
+         ("1", "3", "1:43.900", "Sunny"), ("2", "2", "103.500", "Sunny")
+      ]
+
+   def test_rejected_rows_have_line_numbers(self, mngr, tmp_path):
+      path = write_csv(tmp_path, (
+         "track,date,vehicle,session_number,laps,weather,best_lap_time\n"
+         "Track1,2024-06-12,Car1,2,12,Sunny,1:41.0\n"
+         "Track1,2024-06-12,Car1,1,9,Sunny,1:45.0\n"
+         "Track1,not a date,Car1,3,9,Sunny,\n"
+         "\n"
+         "Track1,2024-06-12,Car9,3,9,Sunny,\n"
+         "Track1,2024-06-12,Car1,3,many,Sunny,\n"
+         "Track1,2024-06-12,Car1,3,9,,\n"
+         "Track1,2024-06-12,Car1,3,9,Rain,fast\n"
+         "Track1,2024-06-12,Car1,2,7,Rain,\n"
+         '"Track4",13/06/2024,Car2,1,5,"Rain, then dry",\n'
+      ))
+      result = import_csv(path, mngr)
+      assert [(row.line, row.reason) for row in result.rejected] == [
+         (3, "Session 1 of Track1 2024-06-12 already exists"),
+         (4, "Invalid date: not a date"),
+         (6, "Unknown vehicle: Car9"),
+         (7, "Invalid number of laps: many"),
+         (8, "Missing required field: weather"),
+         (9, "Invalid lap time: fast"),
+         (10, "Session 2 of Track1 2024-06-12 already exists"),
+      ]
+      # Added to the existing track day
+      assert mngr.get_session_numbers("day1") == ["1", "2"]
+      assert (result.track_days_created, result.sessions_added) == (1, 2)
+      assert mngr.track_days[1].sessions[0].weather == "Rain, then dry"
+
+   def test_rows_of_other_vehicles_are_rejected(self, mngr, tmp_path):
+      # Only the track days of the active vehicle are loaded, Car2 may have Track1 2024-06-12 too
+      mngr.active_vehicle = "Car1"
+      path = write_csv(tmp_path, (
+         "track,date,vehicle,session_number,laps,weather\n"
+         "Track1,2024-06-12,Car2,1,9,Sunny\n"
+         "Track1,2024-06-12,Car1,2,9,Sunny\n"
+      ))
+      result = import_csv(path, mngr)
+      assert [(row.line, row.reason) for row in result.rejected] == [(2, "Vehicle Car2 is not the active vehicle Car1")]
+      assert (result.track_days_created, result.sessions_added) == (0, 1)
+      assert [day.id for day in mngr.track_days] == ["day1"]
+
+   def test_one_save_per_batch(self, mngr, tmp_path):
+      lines = ["track,date,vehicle,session,laps,weather"]
+      lines += [f"Track{day},2024-08-{day + 1:02d},Car1,{session},5,Sunny" for day in range(5) for session in (1, 2)]
+      path = write_csv(tmp_path, "\n".join(lines) + "\n")
+      result = import_csv(path, mngr, batch_size=4)
+      assert (result.track_days_created, result.sessions_added) == (5, 10)
+      assert mngr.saves == 3
+      # A track day split over batches gets all its sessions
+      assert [len(day.sessions) for day in mngr.track_days[1:]] == [2] * 5
+
+      # New and existing track days in one batch
+      lines = ["track,date,vehicle,session,laps,weather", "Track1,2024-06-12,Car1,2,5,Sunny", "Track9,2024-09-01,Car1,1,5,Sunny"]
+      result = import_csv(write_csv(tmp_path, "\n".join(lines) + "\n", "more.csv"), mngr)
+      assert (result.track_days_created, result.sessions_added) == (1, 2)
+      assert mngr.saves == 4
+      assert mngr.get_session_numbers("day1") == ["1", "2"]
+
+   def test_rows_are_parsed_lazily(self):
+      read = []
+
+      def lines():
+         for line in ["track,date\n", "Track1,2024-06-12\n", "Track2,2024-06-13\n"]:
+            read.append(line)
+            yield line
+      rows = parse_rows(lines(), defaults={"vehicle": "Car1"})
+      assert next(rows) == (2, {"vehicle": "Car1", "track": "Track1", "date": "2024-06-12"})
+      assert len(read) == 2
+
+   def test_column_names(self):
+      assert map_columns(["Circuit", "Date", "Best Lap", "Session #", "Tyres", "Unknown", "session"]) == [
+         "track", "date", "best_lap_time", "session_number", "tire_type", None, None
+      ]
+      assert [iso_date(text) for text in ("2024-06-12T10:00", "12/06/2024", "2024/06/12", "12.6.2024", "June")] == [
+         "2024-06-12", "2024-06-12", "2024-06-12", "2024-06-12", None
+      ]
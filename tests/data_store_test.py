@@ -0,0 +1,188 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Unit tests for the shared data store
+# License: TBD
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+import rcfunc.data_utils as data_utils
+from rcfunc.data_store import DataStore
+from rcfunc.maintenance_mngr import MaintenanceMngr
+from rcfunc.track_day_report_mngr import TrackDayReportMngr
+from rcfunc.track_day_stats_mngr import TrackDayStatsMngr
+from rcfunc.track_day_shards import TrackDayShards
+from rcfunc.track_session_mngr import TrackSessionMngr
+
+
+def make_day(track, date, vehicle):
+   return {
+      "track": track,
+      "date": date,
+      "organizer": "Org1",
+      "vehicle": vehicle,
+      "sessions": [{"session_number": "1", "laps": "10", "vehicle": vehicle, "weather": "Sunny"}]
+   }
+
+@pytest.fixture
+def store(tmp_path):
+   vehicles_file = str(tmp_path / "vehicles.json")
+   maintenance_file = str(tmp_path / "maintenance_entries.json")
+   legacy_file = str(tmp_path / "track_sessions.json")
+   with open(vehicles_file, "w") as file:
+      json.dump({"vehicles": ["Car1", "Car2"], "vehicle_data": {}}, file)
+   with open(maintenance_file, "w") as file:
+      json.dump([{"title": "Oil change", "vehicle": "Car1", "date": "2025-05-10"}], file)
+   with open(legacy_file, "w") as file:
+      json.dump([make_day("Track1", "2025-05-01", "Car1"), make_day("Track2", "2026-04-12", "Car2")], file)
+   shards = TrackDayShards(str(tmp_path / "track_days"), legacy_file)
+   return DataStore(vehicles_file, maintenance_file, shards)
+
+class TestDataStore:
+   def test_files_are_parsed_once(self, store):
+      data_utils.clear_parse_cache()
+      with patch("rcfunc.data_utils.load_json", wraps=data_utils.load_json) as load:
+         shared = DataStore(store.vehicles_file, store.maintenance_file, store.track_day_shards)
+         with patch("rcfunc.maintenance_mngr.load_maintenance_entries") as load_entries:
+            MaintenanceMngr(shared.view("vehicles"), entries=shared.view("maintenance_entries"))
+            load_entries.assert_not_called()
+      assert sorted(call.args[0] for call in load.call_args_list) == [store.maintenance_file, store.vehicles_file]
+
+   def test_loaded_collections(self, store):
+      assert store.vehicles == ["Car1", "Car2"]
+      assert [entry["title"] for entry in store.maintenance_entries] == ["Oil change"]
+
+   def test_views_follow_reloaded_track_days(self, store):
+      track_days = store.view("track_days")
+      list(store.iter_load_track_days())
+      assert [day.track for day in track_days] == ["Track1", "Track2"]
+      list(store.iter_load_track_days("Car2"))
+      assert [day.track for day in track_days] == ["Track2"]
+      assert track_days == store.track_days
+
+   def test_version_counts_changes(self, store):
+      version = store.version
+      vehicles = store.view("vehicles")
+      vehicles.append("Car3")
+      assert store.version == version + 1
+      assert store.vehicles == ["Car1", "Car2", "Car3"]
+      store.set_vehicles(["Car4"], {})
+      assert store.version == version + 2
+      assert list(vehicles) == ["Car4"]
+
+   def test_unknown_view(self, store):
+      with pytest.raises(ValueError):
+         store.view("sessions")
+
+   def test_session_manager_on_views(self, store):
+      list(store.iter_load_track_days("Car1"))
+      mngr = TrackSessionMngr(
+         store.view("track_days"), store.view("vehicles"), "Car1", ["Sunny"],
+         store.save_track_days, store.append_track_day_record
+      )
+      version = store.version
+      mngr.create_track_day("Track3", "2026-08-01", "Org1", "Car1")
+      assert store.version > version
+      assert [day.track for day in store.track_days] == ["Track1", "Track3"]
+      assert [day.track for day in store.track_day_shards.all_track_days()] == ["Track1", "Track3", "Track2"]
+
+   def test_track_day_listeners_follow_changes(self, store):
+      list(store.iter_load_track_days())
+      stats_mngr = TrackDayStatsMngr(store.view("track_days"), store.view("vehicles"))
+      store.track_day_listeners.append(stats_mngr.track_days_changed)
+      mngr = TrackSessionMngr(
+         store.view("track_days"), store.view("vehicles"), None, ["Sunny"],
+         store.save_track_days, store.append_track_day_record
+      )
+      frame = stats_mngr.get_frame()
+      mngr.delete_track_day(store.view("track_days")[0].id)
+      mngr.create_track_day("Track3", "2026-08-01", "Org1", "Car2")
+      # Updated in place, not rebuilt
+      assert stats_mngr.get_frame() is frame
+      assert stats_mngr.get_chart_data("vehicle_activity")["days_count"] == [2]
+
+      list(store.iter_load_track_days("Car2"))
+      assert stats_mngr.get_frame() is not frame
+
+   def test_cached_results_follow_the_store_version(self, store):
+      list(store.iter_load_track_days())
+      stats_mngr = TrackDayStatsMngr(store.view("track_days"), store.view("vehicles"), data_version=lambda: store.version)
+      store.track_day_listeners.append(stats_mngr.track_days_changed)
+      report_mngr = TrackDayReportMngr(store.view("track_days"), store.view("vehicles"), data_version=lambda: store.version)
+      mngr = TrackSessionMngr(
+         store.view("track_days"), store.view("vehicles"), None, ["Sunny"],
+         store.save_track_days, store.append_track_day_record
+      )
+      for _ in range(2):
+         assert stats_mngr.get_chart_data("vehicle_activity")["days_count"] == [1, 1]
+         report = report_mngr.generate_report("summary", "Car1")
+      assert stats_mngr.cache_info()["hits"] == 1 and report_mngr.cache_info()["hits"] == 1
+
+      mngr.create_track_day("Track3", "2026-08-01", "Org1", "Car1")
+      assert stats_mngr.get_chart_data("vehicle_activity")["days_count"] == [2, 1]
+      assert report_mngr.generate_report("summary", "Car1") != report
+      assert stats_mngr.cache_info()["misses"] == 2 and report_mngr.cache_info()["misses"] == 2
+
+      with patch("rcfunc.maintenance_mngr.save_maintenance_entries"):
+         maintenance_mngr = MaintenanceMngr(
+            store.view("vehicles"), "Car1", entries=store.view("maintenance_entries"), data_version=lambda: store.version
+         )
+         assert maintenance_mngr.get_chart_data("pie") is maintenance_mngr.get_chart_data("pie")
+         maintenance_mngr.add_entry({
+            "title": "Brakes", "vehicle": "Car1", "date": "2025-06-01", "duration": "2 hours",
+            "description": "", "handbook_ref": "", "tags": ["Brakes"]
+         })
+      assert "Brakes" in maintenance_mngr.get_chart_data("pie")["labels"]
+      assert maintenance_mngr.cache_info()["misses"] == 2
+
+   def test_maintenance_manager_updates_store(self, store):
+      with patch("rcfunc.maintenance_mngr.save_maintenance_entries"):
+         mngr = MaintenanceMngr(store.view("vehicles"), "Car1", entries=store.view("maintenance_entries"))
+         version = store.version
+         mngr.add_entry({
+            "title": "Brakes", "vehicle": "Car1", "date": "2025-06-01", "duration": "2 hours",
+            "description": "", "handbook_ref": "", "tags": []
+         })
+      assert [entry["title"] for entry in store.maintenance_entries] == ["Oil change", "Brakes"]
+      assert store.version > version
+      assert mngr.get_available_vehicles() == ["Car1", "Car2"]
+
+class TestBackgroundLoading:
+   def test_collections_are_handed_over_when_collected(self, store):
+      # Leaving the executor waits for the loads to finish
+      with ThreadPoolExecutor(max_workers=3) as executor:
+         loading = DataStore(store.vehicles_file, store.maintenance_file, store.track_day_shards, executor=executor)
+      assert loading.loading
+      assert loading.vehicles == [] and loading.maintenance_entries == []
+
+      assert loading.is_loading("vehicles") and loading.is_loading("maintenance_entries", "vehicles")
+
+      assert sorted(loading.collect_loaded()) == ["maintenance_entries", "track_days", "vehicles"]
+      assert not loading.loading
+      assert not loading.is_loading("vehicles", "maintenance_entries")
+      assert loading.collect_loaded() == []
+      assert loading.vehicles == ["Car1", "Car2"]
+      assert [entry["title"] for entry in loading.maintenance_entries] == ["Oil change"]
+      assert sorted(loading.load_times) == ["maintenance_entries", "track_days", "vehicles"]
+
+   def test_track_days_are_parsed_in_background(self, store, monkeypatch):
+      with ThreadPoolExecutor(max_workers=3) as executor:
+         loading = DataStore(store.vehicles_file, store.maintenance_file, store.track_day_shards, executor=executor)
+         # Streaming the track days waits for the parsed shards and doesn't read them again
+         monkeypatch.setattr(data_utils, "load_track_day_headers", None)
+         assert [day.track for day in loading.iter_load_track_days()] == ["Track1", "Track2"]
+      assert "track_days" not in loading.collect_loaded()
+
+   def test_load_error_leaves_collection_empty(self, store, capsys):
+      with ThreadPoolExecutor(max_workers=3) as executor:
+         with open(store.maintenance_file, "w") as file:
+            file.write("{broken")
+         data_utils.clear_parse_cache()
+         loading = DataStore(store.vehicles_file, store.maintenance_file, store.track_day_shards, executor=executor)
+      loading.collect_loaded()
+      assert loading.maintenance_entries == []
+      assert loading.vehicles == ["Car1", "Car2"]
+      assert "Error loading maintenance_entries" in capsys.readouterr().out
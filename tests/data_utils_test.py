@@ -3,10 +3,18 @@
 # Description: Unit tests for data_utils module
 # License: TBD
 
+import json
 import unittest
 import os
+from unittest.mock import patch
 
+import rcfunc.data_utils as data_utils
 from rcfunc.data_utils import save_vehicles, load_vehicles, save_maintenance_entries, load_maintenance_entries, save_data, load_data
+from rcfunc.data_utils import append_journal_record, compact_data, journal_file_for
+from rcfunc.data_utils import load_track_day_headers
+from rcfunc.track_day_index import index_file_for
+from rcfunc.track_day_models import Session, TrackDay, encode_model
+from rcfunc.binary_snapshot import binary_file_for
 
 
 class TestDataUtils(unittest.TestCase):
@@ -66,7 +74,7 @@ class TestDataUtils(unittest.TestCase):
       ]
 
       self.test_track_days_file = self.test_workdir + "/test_track_days.json"
-      self.test_track_days = [
+      self.test_track_days = [TrackDay.from_dict(day) for day in [
          {
             "track": "Test-Track1",
             "date": "2025-10515",
@@ -103,16 +111,26 @@ class TestDataUtils(unittest.TestCase):
                   }
             ]
          }
-      ]
+      ]]
 
    def tearDown(self):
-      try:
-         # Remove test files if they exist
-         os.remove(self.test_vehicle_file)
-         os.remove(self.test_maintenance_file)
-         os.remove(self.test_track_days_file)
-      except FileNotFoundError:
-         pass
+      data_utils.clear_parse_cache()
+      # Remove test files if they exist
+      test_files = [
+         self.test_vehicle_file,
+         self.test_maintenance_file,
+         self.test_track_days_file,
+         journal_file_for(self.test_track_days_file),
+         index_file_for(self.test_track_days_file),
+         binary_file_for(self.test_vehicle_file),
+         binary_file_for(self.test_maintenance_file),
+         binary_file_for(index_file_for(self.test_track_days_file)),
+      ]
+      for test_file in test_files:
+         try:
+            os.remove(test_file)
+         except FileNotFoundError:
+            pass
 
       # Remove test directory if it exists
       try:
@@ -190,6 +208,143 @@ class TestDataUtils(unittest.TestCase):
          loaded_days = load_data(filename=self.test_track_days_file)
          self.assertEqual(loaded_days, [])
 
+   # Test cases for the track day journal
+   def test_journal_records_are_replayed_on_load(self):
+         save_data(self.test_track_days, filename=self.test_track_days_file)
+         new_day = TrackDay(track="Test-Track3", date="2025-06-01", organizer="Me", vehicle="Yamaha R1")
+         session = Session(session_number="1", laps="10", vehicle="Yamaha R1", weather="Sunny")
+
+         append_journal_record({"op": "create_track_day", "track_day": new_day}, None, filename=self.test_track_days_file)
+         append_journal_record({"op": "add_session", "track_day_id": new_day.id, "session": session}, None, filename=self.test_track_days_file)
+         append_journal_record({"op": "update_session", "track_day_id": self.test_track_days[0].id, "session_number": "1", "session": {"laps": "40"}}, None, filename=self.test_track_days_file)
+         append_journal_record({"op": "delete_track_day", "track_day_id": self.test_track_days[1].id}, None, filename=self.test_track_days_file)
+
+         loaded_days = load_data(filename=self.test_track_days_file)
+         self.assertEqual([d.track for d in loaded_days], ["Test-Track1", "Test-Track3"])
+         self.assertEqual(loaded_days[0].sessions[0].laps, "40")
+         self.assertEqual(loaded_days[1].sessions, [session])
+
+   def test_journal_records_by_position_are_replayed(self):
+         # Journals from before track day ids
+         save_data(self.test_track_days, filename=self.test_track_days_file)
+         new_day = TrackDay(track="Test-Track3", date="2025-06-01", organizer="Me", vehicle="Yamaha R1")
+         session = Session(session_number="1", laps="10", vehicle="Yamaha R1", weather="Sunny")
+
+         append_journal_record({"op": "create_track_day", "track_day": new_day}, None, filename=self.test_track_days_file)
+         append_journal_record({"op": "add_session", "index": 2, "session": session}, None, filename=self.test_track_days_file)
+         append_journal_record({"op": "update_session", "index": 0, "session_number": "1", "session": {"laps": "40"}}, None, filename=self.test_track_days_file)
+         append_journal_record({"op": "delete_track_day", "index": 1}, None, filename=self.test_track_days_file)
+
+         loaded_days = load_data(filename=self.test_track_days_file)
+         self.assertEqual([d.track for d in loaded_days], ["Test-Track1", "Test-Track3"])
+         self.assertEqual(loaded_days[0].sessions[0].laps, "40")
+         self.assertEqual(loaded_days[1].sessions, [session])
+
+   def test_bulk_journal_record_is_replayed_whole(self):
+         save_data(self.test_track_days, filename=self.test_track_days_file)
+         new_day = TrackDay(track="Test-Track3", date="2025-06-01", organizer="Me", vehicle="Yamaha R1")
+         session = Session(session_number="2", laps="10", vehicle="Yamaha R1", weather="Sunny")
+         record = {"op": "add_bulk", "track_days": [new_day], "sessions": {self.test_track_days[0].id: [session]}}
+
+         append_journal_record(record, None, filename=self.test_track_days_file)
+         loaded_days = load_data(filename=self.test_track_days_file)
+         self.assertEqual([d.track for d in loaded_days], ["Test-Track1", "Test-Track2", "Test-Track3"])
+         self.assertEqual(loaded_days[0].sessions[-1], session)
+
+         # A torn batch leaves nothing of it
+         compact_data(filename=self.test_track_days_file)
+         line = json.dumps(record, default=encode_model)
+         with open(journal_file_for(self.test_track_days_file), "a") as file:
+            file.write(line[:len(line) // 2])
+         self.assertEqual(load_data(filename=self.test_track_days_file), loaded_days)
+
+   def test_journal_without_snapshot(self):
+         new_day = TrackDay(track="Test-Track3", date="2025-06-01", organizer="Me", vehicle="Yamaha R1")
+         append_journal_record({"op": "create_track_day", "track_day": new_day}, None, filename=self.test_track_days_file)
+         self.assertEqual(load_data(filename=self.test_track_days_file), [new_day])
+
+   def test_journal_torn_tail_is_ignored(self):
+         save_data(self.test_track_days, filename=self.test_track_days_file)
+         append_journal_record({"op": "delete_track_day", "track_day_id": self.test_track_days[0].id}, None, filename=self.test_track_days_file)
+         with open(journal_file_for(self.test_track_days_file), "a") as file:
+            file.write('{"op": "delete_tra')
+         loaded_days = load_data(filename=self.test_track_days_file)
+         self.assertEqual(loaded_days, self.test_track_days[1:])
+
+   def test_compact_data_folds_journal_into_snapshot(self):
+         save_data(self.test_track_days, filename=self.test_track_days_file)
+         append_journal_record({"op": "delete_track_day", "track_day_id": self.test_track_days[0].id}, None, filename=self.test_track_days_file)
+         compact_data(filename=self.test_track_days_file)
+         self.assertFalse(os.path.exists(journal_file_for(self.test_track_days_file)))
+         self.assertEqual(load_data(filename=self.test_track_days_file), self.test_track_days[1:])
+
+   def test_journal_threshold_triggers_compaction(self):
+         original_threshold = data_utils.JOURNAL_COMPACT_THRESHOLD
+         data_utils.JOURNAL_COMPACT_THRESHOLD = 2
+         try:
+            track_days = []
+            for i in range(2):
+               new_day = TrackDay(track=f"Track{i}", date="2025-06-01", organizer="Me", vehicle="Yamaha R1")
+               track_days.append(new_day)
+               append_journal_record({"op": "create_track_day", "track_day": new_day}, track_days, filename=self.test_track_days_file)
+            self.assertFalse(os.path.exists(journal_file_for(self.test_track_days_file)))
+            self.assertEqual(load_data(filename=self.test_track_days_file), track_days)
+         finally:
+            data_utils.JOURNAL_COMPACT_THRESHOLD = original_threshold
+
+   # Test cases for lazy session loading
+   def test_load_track_day_headers_indexes_old_file(self):
+         os.makedirs(self.test_workdir, exist_ok=True)
+         with open(self.test_track_days_file, "w") as file:
+            json.dump([day.to_dict() for day in self.test_track_days], file, indent=4)
+         track_days = load_track_day_headers(filename=self.test_track_days_file)
+         self.assertTrue(os.path.exists(index_file_for(self.test_track_days_file)))
+         self.assertFalse(track_days[0].sessions_loaded())
+         self.assertEqual([day.to_dict() for day in track_days], [day.to_dict() for day in self.test_track_days])
+         self.assertEqual(load_data(filename=self.test_track_days_file), self.test_track_days)
+
+   def test_load_track_day_headers_replays_journal(self):
+         save_data(self.test_track_days, filename=self.test_track_days_file)
+         session = Session(session_number="2", laps="10", vehicle="Yamaha R1", weather="Sunny")
+         append_journal_record({"op": "add_session", "track_day_id": self.test_track_days[0].id, "session": session}, None, filename=self.test_track_days_file)
+         track_days = load_track_day_headers(filename=self.test_track_days_file, max_resident=1)
+         self.assertEqual(track_days[1].sessions, self.test_track_days[1].sessions)
+         # The modified session list is pinned and doesn't count towards max_resident
+         self.assertEqual(track_days[0].sessions[-1], session)
+         self.assertTrue(track_days[0].sessions_loaded())
+         self.assertTrue(track_days[1].sessions_loaded())
+
+         save_data(track_days, filename=self.test_track_days_file)
+         self.assertEqual(load_data(filename=self.test_track_days_file)[0].sessions[-1], session)
+
+   # Test cases for the parse cache
+   def test_cached_load_returns_own_copy(self):
+         save_maintenance_entries(self.test_maintenance_entries, filename=self.test_maintenance_file)
+         first = load_maintenance_entries(filename=self.test_maintenance_file)
+         first[0]["title"] = "Changed"
+         with patch.object(data_utils, "load_json") as load_json:
+            second = load_maintenance_entries(filename=self.test_maintenance_file)
+         load_json.assert_not_called()
+         self.assertEqual(second, self.test_maintenance_entries)
+         self.assertIsNot(second[0], first[0])
+
+   def test_save_invalidates_cache(self):
+         save_vehicles(self.test_vehicle_list, self.test_vehicle_data, filename=self.test_vehicle_file)
+         load_vehicles(filename=self.test_vehicle_file)
+         save_vehicles(["Car1"], {}, filename=self.test_vehicle_file)
+         self.assertEqual(load_vehicles(filename=self.test_vehicle_file), (["Car1"], {}))
+
+   def test_cache_follows_file_changes(self):
+         save_data(self.test_track_days, filename=self.test_track_days_file)
+         self.assertEqual(load_data(filename=self.test_track_days_file), self.test_track_days)
+         # Changes not made through data_utils are picked up from the file identity
+         with open(self.test_track_days_file, "w") as file:
+            json.dump([self.test_track_days[0].to_dict()], file)
+         self.assertEqual(load_data(filename=self.test_track_days_file), self.test_track_days[:1])
+         with open(journal_file_for(self.test_track_days_file), "a") as file:
+            file.write(json.dumps({"op": "delete_track_day", "track_day_id": self.test_track_days[0].id}) + "\n")
+         self.assertEqual(load_data(filename=self.test_track_days_file), [])
+
 
 if __name__ == "__main__":
     unittest.main()
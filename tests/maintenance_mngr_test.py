@@ -39,6 +39,21 @@ class TestMaintenanceMngr:
          assert updated.title == "Major Oil Change"
          assert updated in manager.get_all_entries()
 
+   def test_entries_have_ids(self, manager, sample_entry):
+      with patch("rcfunc.maintenance_mngr.save_maintenance_entries"):
+         first = manager.add_entry(sample_entry)
+         second = manager.add_entry(sample_entry)
+         # Equal content, still different entries
+         assert first.id != second.id and first != second
+         updated = manager.update_entry(second, dict(sample_entry, title="Brakes"))
+         assert updated.id == second.id
+         assert [entry.title for entry in manager.get_all_entries()] == ["Oil Change", "Brakes"]
+         assert manager.delete_entry(first) is True
+         assert manager.update_entry(updated, sample_entry).title == "Oil Change"
+         with pytest.raises(ValueError):
+            manager.update_entry(first, sample_entry)
+      assert MaintenanceEntry.from_dict(first.to_dict()) == first
+
    def test_delete_entry(self, manager, sample_entry):
       with patch("rcfunc.maintenance_mngr.save_maintenance_entries"):
          entry = manager.add_entry(sample_entry)
@@ -92,3 +107,45 @@ class TestMaintenanceMngr:
 
    def test_get_active_vehicle(self, manager):
       assert manager.get_active_vehicle() == "Car1"
+
+   def test_entries_from_shared_list(self, sample_entry):
+      entries = [sample_entry]
+      with patch("rcfunc.maintenance_mngr.load_maintenance_entries") as load, \
+          patch("rcfunc.maintenance_mngr.save_maintenance_entries"):
+         manager = MaintenanceMngr(vehicles=["Car1"], active_vehicle="Car1", entries=entries)
+         load.assert_not_called()
+         assert [entry.title for entry in manager.get_all_entries()] == ["Oil Change"]
+         manager.add_entry(dict(sample_entry, title="Brakes"))
+      assert [entry["title"] for entry in entries] == ["Oil Change", "Brakes"]
+
+   def test_delete_and_update_keep_the_order(self, sample_entry):
+      entries = [dict(sample_entry, title=title, id=title) for title in ("A", "B", "C", "D")]
+      with patch("rcfunc.maintenance_mngr.save_maintenance_entries"):
+         manager = MaintenanceMngr(vehicles=["Car1"], entries=entries)
+         a, b, c, d = manager.get_all_entries()
+         assert manager.delete_entry(b) is True
+         manager.update_entry(c, dict(sample_entry, title="C2"))
+         assert manager.delete_entry(a) is True
+         manager.add_entry(dict(sample_entry, title="E", id="E"))
+         assert manager.delete_entry(b) is False
+      assert [entry.title for entry in manager.get_all_entries()] == ["C2", "D", "E"]
+      assert [entry["title"] for entry in entries] == ["C2", "D", "E"]
+      assert [entry["id"] for entry in entries] == ["C", "D", "E"]
+
+   def test_journal_callback_gets_only_the_changed_entry(self, sample_entry):
+      entries = [dict(sample_entry, id="entry1")]
+      records = []
+      with patch("rcfunc.maintenance_mngr.save_maintenance_entries") as save:
+         manager = MaintenanceMngr(
+            vehicles=["Car1"], entries=entries, journal_callback=lambda record, raw_entries: records.append(record)
+         )
+         entry = manager.add_entry(dict(sample_entry, title="Brakes"))
+         manager.update_entry(manager.get_all_entries()[0], dict(sample_entry, title="Oil"))
+         manager.delete_entry(entry)
+      save.assert_not_called()
+      assert records == [
+         {"op": "add_maintenance_entry", "entry": entry.to_dict()},
+         {"op": "update_maintenance_entry", "entry": dict(sample_entry, title="Oil", id="entry1")},
+         {"op": "delete_maintenance_entry", "id": entry.id}
+      ]
+      assert entries == [dict(sample_entry, title="Oil", id="entry1")]
@@ -0,0 +1,36 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Unit tests for the versioned result cache
+# License: TBD
+
+from rcfunc.result_cache import ResultCache
+
+
+class TestResultCache:
+   def test_results_are_kept_for_a_version(self):
+      version = [0]
+      calls = []
+
+      def compute(key):
+         calls.append(key)
+         return f"result {key}"
+      cache = ResultCache(lambda: version[0], maxsize=2)
+      assert [cache.get(key, lambda key=key: compute(key)) for key in ("a", "b", "a")] == ["result a", "result b", "result a"]
+      assert calls == ["a", "b"]
+      assert cache.info() == {"hits": 1, "misses": 2, "size": 2, "maxsize": 2}
+
+      # The least recently used result is dropped
+      cache.get("c", lambda: compute("c"))
+      cache.get("a", lambda: compute("a"))
+      cache.get("b", lambda: compute("b"))
+      assert calls == ["a", "b", "c", "b"]
+
+      version[0] += 1
+      cache.get("a", lambda: compute("a"))
+      assert calls[-1] == "a"
+      assert cache.info()["size"] == 1
+
+   def test_nothing_is_cached_without_version(self):
+      cache = ResultCache()
+      assert [cache.get("a", lambda: []) for _ in range(2)] == [[], []]
+      assert cache.info() == {"hits": 0, "misses": 2, "size": 0, "maxsize": cache.maxsize}
@@ -0,0 +1,93 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Unit tests for the columnar session table
+# License: TBD
+
+from datetime import date
+
+import pytest
+
+from rcfunc.session_frame import NO_CODE, SessionFrame
+from rcfunc.track_day_models import Session, TrackDay
+
+
+@pytest.fixture
+def track_days():
+   return [TrackDay.from_dict(day) for day in [
+      {"track": "Track1", "date": "2024-06-12", "vehicle": "Car1", "sessions": [
+         {"session_number": "1", "laps": "10", "weather": "Sunny", "best_lap_time": "1:42.0"},
+         {"session_number": "2", "laps": "", "weather": "Rain"}
+      ]},
+      {"track": "Track2", "date": "unknown", "vehicle": "Car2", "sessions": []},
+      {"track": "Track1", "date": "2025-05-01", "vehicle": "Car2", "sessions": [
+         {"session_number": "1", "laps": "7", "weather": "Sunny"}
+      ]},
+   ]]
+
+def decoded(frame):
+   """Get the columns of a frame with the codes replaced by their labels, codes depend on the history of the frame."""
+   columns = {name: getattr(frame, name).tolist() for name in SessionFrame.DAY_COLUMNS + SessionFrame.SESSION_COLUMNS}
+   for names, categories in ((("day_vehicle", "vehicle"), frame.vehicles), (("day_track", "track"), frame.tracks),
+                             (("weather",), frame.weather_types)):
+      for name in names:
+         columns[name] = [categories.labels[code] for code in columns[name]]
+   return columns
+
+def assert_same_columns(frame, other):
+   assert decoded(frame) == decoded(other)
+
+class TestSessionFrame:
+   def test_columns(self, track_days):
+      frame = SessionFrame(track_days)
+      assert len(frame) == 3
+      assert frame.day_sessions.tolist() == [2, 0, 1]
+      assert frame.day_year.tolist() == [2024, NO_CODE, 2025]
+      assert frame.day.tolist() == [0, 0, 2]
+      assert frame.laps.tolist() == [10, 0, 7]
+      assert frame.best_lap_ms.tolist() == [102000, NO_CODE, NO_CODE]
+      assert [frame.weather_types.labels[code] for code in frame.weather] == ["Sunny", "Rain", "Sunny"]
+      assert [frame.vehicles.labels[code] for code in frame.vehicle] == ["Car1", "Car1", "Car2"]
+      assert frame.date.tolist() == [date(2024, 6, 12).toordinal()] * 2 + [date(2025, 5, 1).toordinal()]
+
+   def test_day_mask(self, track_days):
+      frame = SessionFrame(track_days)
+      assert frame.day_mask("Car2").tolist() == [False, True, True]
+      assert frame.day_mask("Car2", "2025").tolist() == [False, False, True]
+      assert not frame.day_mask("Unknown").any()
+      assert frame.day_mask().all()
+
+   def test_journal_records_match_rebuild(self, track_days):
+      frame = SessionFrame(track_days)
+
+      track_days[1].sessions.append(Session(session_number="1", laps="3", weather="Fog"))
+      frame.apply_journal_record({"op": "add_session", "track_day_id": track_days[1].id}, track_days)
+      assert_same_columns(frame, SessionFrame(track_days))
+
+      track_days[0].sessions[0].update({"laps": "12", "best_lap_time": "1:40.0"})
+      frame.apply_journal_record({"op": "update_session", "track_day_id": track_days[0].id}, track_days)
+      assert frame.best_lap_ms[0] == 100000
+
+      new_day = TrackDay(track="Track3", date="2026-01-01", vehicle="Car3", sessions=[Session(laps="5")])
+      track_days.append(new_day)
+      frame.apply_journal_record({"op": "create_track_day", "track_day": new_day}, track_days)
+      deleted = track_days.pop(0)
+      frame.apply_journal_record({"op": "delete_track_day", "track_day_id": deleted.id}, track_days)
+      assert_same_columns(frame, SessionFrame(track_days))
+      assert frame.day.tolist() == [0, 1, 2]
+      assert frame.day_ids == [day.id for day in track_days]
+
+      new_day.sessions.append(Session(laps="4"))
+      frame.apply_journal_record({"op": "add_session", "track_day_id": new_day.id}, track_days)
+      assert_same_columns(frame, SessionFrame(track_days))
+
+      bulk_day = TrackDay(track="Track4", date="2026-02-01", vehicle="Car1", sessions=[Session(laps="6")])
+      track_days.append(bulk_day)
+      track_days[0].sessions.append(Session(laps="2"))
+      frame.apply_journal_record({"op": "add_bulk", "track_days": [bulk_day], "sessions": {track_days[0].id: []}}, track_days)
+      assert_same_columns(frame, SessionFrame(track_days))
+
+   def test_empty(self):
+      frame = SessionFrame([])
+      assert len(frame) == 0 and len(frame.day) == 0
+      with pytest.raises(ValueError):
+         frame.apply_journal_record({"op": "unknown"}, [])
@@ -0,0 +1,204 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Unit tests for the SQLite storage backend
+# License: TBD
+
+import pytest
+
+import rcfunc.data_utils as data_utils
+from rcfunc.sqlite_storage import SqliteStorage, get_storage, main, migrate_from_json
+from rcfunc.track_day_models import Session, TrackDay
+from rcfunc.track_day_shards import TrackDayShards
+
+
+@pytest.fixture
+def track_days():
+   return [TrackDay.from_dict(day) for day in [
+      {
+         "track": "Track1",
+         "date": "2024-06-12",
+         "organizer": "Org1",
+         "vehicle": "Car1",
+         "sessions": [
+            {"session_number": "1", "laps": "10", "vehicle": "Car1", "weather": "Sunny", "best_lap_time": "1:42.0"},
+            {"session_number": "2", "laps": "8", "vehicle": "Car1", "weather": "Rain", "best_lap_time": "1:50.0"}
+         ]
+      },
+      {
+         "track": "Track2",
+         "date": "2023-07-15",
+         "organizer": "Org2",
+         "vehicle": "Car2",
+         "sessions": []
+      },
+      {
+         "track": "Track1",
+         "date": "2023-08-20",
+         "organizer": "Org1",
+         "vehicle": "Car1",
+         "sessions": [{"session_number": "1", "laps": "12", "vehicle": "Car1", "weather": "Cloudy"}]
+      }
+   ]]
+
+@pytest.fixture
+def storage(tmp_path):
+   storage = SqliteStorage(str(tmp_path / "rc.db"))
+   yield storage
+   storage.close()
+
+class TestSqliteStorage:
+   def test_save_and_load_track_days(self, storage, track_days):
+      storage.save_track_days(track_days)
+      assert storage.load_track_days() == track_days
+
+   def test_load_track_days_filters(self, storage, track_days):
+      storage.save_track_days(track_days)
+      assert storage.load_track_days(vehicle="Car1") == [track_days[0], track_days[2]]
+      assert storage.load_track_days(year="2023") == track_days[1:]
+      assert storage.load_track_days(vehicle="Car1", year=2023, track="Track1") == [track_days[2]]
+      assert storage.load_track_days(track="Track3") == []
+
+   def test_apply_journal_records(self, storage, track_days):
+      storage.save_track_days(track_days)
+      # Records in the stored format, as read from the journal
+      new_day = {"id": "day3", "track": "Track3", "date": "2025-01-01", "organizer": "Org3", "vehicle": "Car2", "sessions": []}
+      new_session = {"id": "session1", "session_number": "1", "laps": "5", "vehicle": "Car2", "weather": "Sunny"}
+
+      storage.apply_journal_record({"op": "create_track_day", "track_day": new_day})
+      storage.apply_journal_record({"op": "add_session", "track_day_id": "day3", "session": new_session})
+      storage.apply_journal_record({"op": "update_session", "track_day_id": track_days[0].id, "session_number": "2", "session": {"laps": "9"}})
+      storage.apply_journal_record({
+         "op": "update_session", "track_day_id": track_days[0].id, "session_id": track_days[0].sessions[0].id, "session_number": "1",
+         "session": {"session_number": "3"}
+      })
+      storage.apply_journal_record({"op": "delete_track_day", "track_day_id": track_days[1].id})
+
+      loaded = storage.load_track_days()
+      assert [d.track for d in loaded] == ["Track1", "Track1", "Track3"]
+      assert loaded[0].sessions[1].laps == "9"
+      assert [session.session_number for session in loaded[0].sessions] == ["3", "2"]
+      assert loaded[2].sessions == [Session.from_dict(new_session)]
+      with pytest.raises(KeyError):
+         storage.apply_journal_record({"op": "delete_track_day", "track_day_id": "unknown"})
+
+   def test_apply_bulk_journal_record(self, storage, track_days):
+      storage.save_track_days(track_days)
+      new_day = {"id": "day3", "track": "Track3", "date": "2025-01-01", "organizer": "Org3", "vehicle": "Car2", "sessions": []}
+      new_session = {"id": "session1", "session_number": "1", "laps": "5", "vehicle": "Car2", "weather": "Sunny"}
+      storage.apply_journal_record({"op": "add_bulk", "track_days": [new_day], "sessions": {track_days[1].id: [new_session]}})
+
+      loaded = storage.load_track_days()
+      assert [d.track for d in loaded] == ["Track1", "Track2", "Track1", "Track3"]
+      assert loaded[1].sessions == [Session.from_dict(new_session)]
+
+      # Nothing of a batch with an unknown track day is applied
+      with pytest.raises(KeyError):
+         storage.apply_journal_record({"op": "add_bulk", "track_days": [dict(new_day, id="day4")], "sessions": {"unknown": []}})
+      assert storage.load_track_days() == loaded
+
+   def test_apply_unknown_journal_record(self, storage):
+      with pytest.raises(ValueError):
+         storage.apply_journal_record({"op": "unknown"})
+
+   def test_save_and_load_vehicles(self, storage):
+      vehicles = ["Car1", "Car2"]
+      vehicle_data = {"Car1": {"type": "Car", "year": 2020, "misc": ""}, "Car2": {"type": "Quad", "year": 2021, "misc": "x"}}
+      storage.save_vehicles(vehicles, vehicle_data)
+      assert storage.load_vehicles() == (vehicles, vehicle_data)
+
+   def test_save_and_load_maintenance_entries(self, storage):
+      entries = [
+         {"title": "Oil", "vehicle": "Car1", "date": "2024-01-10", "tags": ["Oil"]},
+         {"title": "Tires", "vehicle": "Car2", "date": "2024-03-01", "tags": []},
+         {"title": "Brakes", "vehicle": "Car1", "date": "2024-05-20", "tags": ["Brakes"]}
+      ]
+      storage.save_maintenance_entries(entries)
+      assert storage.load_maintenance_entries() == entries
+      assert storage.load_maintenance_entries(vehicle="Car1") == [entries[0], entries[2]]
+      assert storage.load_maintenance_entries(start_date="2024-02-01", end_date="2024-04-01") == [entries[1]]
+
+   def test_apply_maintenance_records(self, storage):
+      entries = [
+         {"id": "entry1", "title": "Oil", "vehicle": "Car1", "date": "2024-01-10"},
+         {"id": "entry2", "title": "Oil", "vehicle": "Car1", "date": "2024-01-10"}
+      ]
+      storage.save_maintenance_entries(entries)
+      new_entry = {"id": "entry3", "title": "Brakes", "vehicle": "Car2", "date": "2024-05-20"}
+
+      storage.apply_maintenance_record({"op": "add_maintenance_entry", "entry": new_entry})
+      # Equal entries are told apart by their id
+      storage.apply_maintenance_record({"op": "update_maintenance_entry", "entry": dict(entries[1], vehicle="Car2")})
+      storage.apply_maintenance_record({"op": "delete_maintenance_entry", "id": "entry1"})
+      storage.apply_maintenance_record({"op": "delete_maintenance_entry", "id": "unknown"})
+
+      assert storage.load_maintenance_entries() == [dict(entries[1], vehicle="Car2"), new_entry]
+      assert [entry["id"] for entry in storage.load_maintenance_entries(vehicle="Car2")] == ["entry2", "entry3"]
+      with pytest.raises(ValueError):
+         storage.apply_maintenance_record({"op": "unknown"})
+
+   def test_migrate_from_json(self, storage, track_days, tmp_path):
+      track_days_file = str(tmp_path / "track_sessions.json")
+      vehicles_file = str(tmp_path / "vehicles.json")
+      maintenance_file = str(tmp_path / "maintenance_entries.json")
+      data_utils.save_data(track_days, filename=track_days_file)
+      data_utils.save_vehicles(["Car1"], {"Car1": {"type": "Car"}}, filename=vehicles_file)
+      data_utils.save_maintenance_entries([{"title": "Oil", "vehicle": "Car1", "date": "2024-01-10"}], filename=maintenance_file)
+
+      counts = migrate_from_json(storage, track_days_file, vehicles_file, maintenance_file)
+
+      assert counts == (3, 1, 1)
+      assert storage.load_track_days() == track_days
+      assert storage.load_vehicles() == (["Car1"], {"Car1": {"type": "Car"}})
+
+   def test_migrate_from_track_day_shards(self, storage, track_days, tmp_path):
+      shards = TrackDayShards(str(tmp_path / "track_days"), str(tmp_path / "track_sessions.json"))
+      shards.save(track_days)
+
+      counts = migrate_from_json(storage, shards.directory, str(tmp_path / "vehicles.json"), str(tmp_path / "maintenance_entries.json"))
+
+      assert counts == (3, 0, 0)
+      assert storage.load_track_days() == shards.all_track_days()
+
+   def test_migrate_command_reads_single_track_day_file(self, track_days, tmp_path, monkeypatch):
+      track_days_file = str(tmp_path / "track_sessions.json")
+      data_utils.save_data(track_days, filename=track_days_file)
+      monkeypatch.setattr(data_utils, "data_file", track_days_file)
+      monkeypatch.setattr(data_utils, "track_days_dir", str(tmp_path / "track_days"))
+      monkeypatch.setattr(data_utils, "vehicles_file", str(tmp_path / "vehicles.json"))
+      monkeypatch.setattr(data_utils, "maintenance_file", str(tmp_path / "maintenance_entries.json"))
+
+      assert main(["migrate", "--database", str(tmp_path / "migrated.db")]) == 0
+
+      storage = SqliteStorage(str(tmp_path / "migrated.db"))
+      assert storage.load_track_days() == track_days
+      storage.close()
+
+   def test_data_utils_dispatches_to_sqlite_backend(self, track_days, tmp_path, monkeypatch):
+      track_days_file = str(tmp_path / "track_sessions.json")
+      monkeypatch.setattr(data_utils, "STORAGE_BACKEND", "sqlite")
+      monkeypatch.setattr(data_utils, "sqlite_file", str(tmp_path / "backend.db"))
+      monkeypatch.setattr(data_utils, "data_file", track_days_file)
+
+      data_utils.save_data(track_days, filename=track_days_file)
+      data_utils.append_journal_record({"op": "delete_track_day", "track_day_id": track_days[0].id}, track_days, filename=track_days_file)
+
+      assert data_utils.load_data(filename=track_days_file) == track_days[1:]
+      assert not (tmp_path / "track_sessions.json").exists()
+      get_storage(data_utils.sqlite_file).close()
+
+   def test_maintenance_records_dispatch_to_sqlite_backend(self, tmp_path, monkeypatch):
+      maintenance_file = str(tmp_path / "maintenance_entries.json")
+      monkeypatch.setattr(data_utils, "STORAGE_BACKEND", "sqlite")
+      monkeypatch.setattr(data_utils, "sqlite_file", str(tmp_path / "backend.db"))
+      monkeypatch.setattr(data_utils, "maintenance_file", maintenance_file)
+      entries = [{"id": "entry1", "title": "Oil"}]
+
+      data_utils.append_maintenance_record({"op": "add_maintenance_entry", "entry": entries[0]}, entries, filename=maintenance_file)
+      assert data_utils.load_maintenance_entries(filename=maintenance_file) == entries
+      assert not (tmp_path / "maintenance_entries.json").exists()
+      get_storage(data_utils.sqlite_file).close()
+
+      # The JSON backend has no journal, the whole file is written
+      monkeypatch.setattr(data_utils, "STORAGE_BACKEND", "json")
+      data_utils.append_maintenance_record({"op": "add_maintenance_entry", "entry": entries[0]}, entries, filename=maintenance_file)
+      assert data_utils.load_maintenance_entries(filename=maintenance_file) == entries
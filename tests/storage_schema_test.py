@@ -0,0 +1,176 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Unit tests for the storage schema versions and migrations
+# License: TBD
+
+import json
+import os
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+
+import rcfunc.data_utils as data_utils
+from rcfunc.sqlite_storage import SqliteStorage
+from rcfunc.storage_schema import SCHEMA_VERSION, VERSION_KEY, check_version, upgrade_records, upgrade_vehicles
+from rcfunc.track_day_shards import TrackDayShards
+
+
+@pytest.fixture(autouse=True)
+def clear_parse_cache():
+   data_utils.clear_parse_cache()
+
+def read_json(filename):
+   with open(filename, "r") as file:
+      return json.load(file)
+
+def write_json(data, filename):
+   with open(filename, "w") as file:
+      json.dump(data, file)
+
+class TestMigrations:
+   def test_track_day_fields_are_completed(self):
+      track_days = [{"track": "Track1", "date": "2024-06-12", "extra": 1, "sessions": [{"session_number": 1, "laps": None}]}]
+      upgraded = upgrade_records("track_day", track_days, 0)
+      assert upgraded == [{
+         "track": "Track1", "date": "2024-06-12", "organizer": "", "vehicle": "", "extra": 1, "id": upgraded[0]["id"],
+         "sessions": [{
+            "session_number": "1", "laps": "", "vehicle": "", "weather": "", "tire_type": "",
+            "tire_status": "", "best_lap_time": "", "comments": "", "id": upgraded[0]["sessions"][0]["id"]
+         }]
+      }]
+      # Upgraded records are left alone
+      assert upgrade_records("track_day", list(track_days), SCHEMA_VERSION) == track_days
+
+   def test_track_days_and_sessions_get_ids(self):
+      track_days = [{"id": "day1", "sessions": [{"id": "session1"}, {}]}, {"sessions": []}]
+      upgraded = upgrade_records("track_day", track_days, 1)
+      assert upgraded[0]["id"] == "day1" and upgraded[0]["sessions"][0]["id"] == "session1"
+      ids = [upgraded[0]["sessions"][1]["id"], upgraded[1]["id"]]
+      assert all(ids) and len(set(ids)) == 2
+      assert upgrade_records("track_day_header", [{"track": "Track1"}], 1)[0]["id"]
+      assert upgrade_records("session", [{"id": "session1"}], 1) == [{"id": "session1"}]
+      # Kinds without a migration from a version are unchanged by it
+      assert upgrade_records("vehicle", [{"type": "Car"}], 1) == [{"type": "Car"}]
+      assert upgrade_records("track_day", [{"id": "day1", "sessions": []}], 2) == [{"id": "day1", "sessions": []}]
+      assert upgrade_records("maintenance_entry", [{"id": "entry1"}, {}], 2)[1]["id"]
+
+   def test_maintenance_entry_fields_are_completed(self):
+      upgraded = upgrade_records("maintenance_entry", [{"title": "Oil", "duration": None, "tags": "Oil"}], 0)
+      assert upgraded == [{
+         "title": "Oil", "vehicle": "", "date": "", "duration": "", "description": "", "handbook_ref": "", "tags": [],
+         "id": upgraded[0]["id"]
+      }]
+
+   def test_every_vehicle_gets_data(self):
+      vehicles, vehicle_data = upgrade_vehicles(["Car1", "Car2"], {"Car1": {"type": "Bike", "year": "2019"}}, 0)
+      assert vehicles == ["Car1", "Car2"]
+      assert vehicle_data["Car1"] == {"type": "Bike", "year": 2019, "misc": ""}
+      assert vehicle_data["Car2"]["type"] == "Car" and isinstance(vehicle_data["Car2"]["year"], int)
+
+   def test_newer_version_is_refused(self):
+      check_version(SCHEMA_VERSION, "file")
+      with pytest.raises(ValueError):
+         check_version(SCHEMA_VERSION + 1, "file")
+
+class TestVersionedFiles:
+   def test_unversioned_maintenance_file_is_upgraded_once(self, tmp_path):
+      filename = str(tmp_path / "maintenance_entries.json")
+      write_json([{"title": "Oil", "vehicle": "Car1", "date": "2025-05-10"}], filename)
+
+      entries = data_utils.load_maintenance_entries(filename=filename)
+      assert entries[0]["tags"] == [] and entries[0]["description"] == ""
+      assert read_json(filename) == {VERSION_KEY: SCHEMA_VERSION, "maintenance_entries": entries}
+
+      data_utils.clear_parse_cache()
+      with patch("rcfunc.data_utils.write_json_atomic") as write:
+         assert data_utils.load_maintenance_entries(filename=filename) == entries
+      write.assert_not_called()
+
+   def test_unversioned_vehicles_file_is_upgraded(self, tmp_path):
+      filename = str(tmp_path / "vehicles.json")
+      write_json({"vehicles": ["Car1"], "vehicle_data": {}}, filename)
+
+      vehicles, vehicle_data = data_utils.load_vehicles(filename=filename)
+      assert vehicles == ["Car1"] and vehicle_data["Car1"]["type"] == "Car"
+      assert read_json(filename)[VERSION_KEY] == SCHEMA_VERSION
+
+   def test_saved_files_have_header(self, tmp_path):
+      vehicles_file = str(tmp_path / "vehicles.json")
+      maintenance_file = str(tmp_path / "maintenance_entries.json")
+      data_utils.save_vehicles([], {}, filename=vehicles_file)
+      data_utils.save_maintenance_entries([], filename=maintenance_file)
+      assert read_json(vehicles_file)[VERSION_KEY] == SCHEMA_VERSION
+      assert read_json(maintenance_file)[VERSION_KEY] == SCHEMA_VERSION
+
+   def test_file_from_newer_version_is_not_touched(self, tmp_path):
+      filename = str(tmp_path / "maintenance_entries.json")
+      content = {VERSION_KEY: SCHEMA_VERSION + 1, "maintenance_entries": []}
+      write_json(content, filename)
+      with pytest.raises(ValueError):
+         data_utils.load_maintenance_entries(filename=filename)
+      assert read_json(filename) == content
+
+   def test_track_day_shards_are_upgraded(self, tmp_path):
+      legacy_file = str(tmp_path / "track_sessions.json")
+      shards_dir = str(tmp_path / "track_days")
+      write_json([{"track": "Track1", "date": "2025-05-01", "vehicle": "Car1", "sessions": [{"laps": 3}]}], legacy_file)
+
+      shards = TrackDayShards(shards_dir, legacy_file)
+      assert shards.load()[0].sessions[0].laps == "3"
+      assert read_json(shards.manifest_file)[VERSION_KEY] == SCHEMA_VERSION
+
+      # A manifest from before versioning, with a shard that was never upgraded
+      shard_file = os.path.join(shards_dir, shards.get_shards()[0]["file"])
+      manifest = read_json(shards.manifest_file)
+      del manifest[VERSION_KEY]
+      write_json(manifest, shards.manifest_file)
+      write_json([{"track": "Track1", "date": "2025-05-01", "vehicle": "Car1", "sessions": [{"laps": 4}]}], shard_file)
+
+      reloaded = TrackDayShards(shards_dir, legacy_file).load()
+      assert reloaded[0].organizer == "" and reloaded[0].sessions[0].laps == "4"
+      assert read_json(shards.manifest_file)[VERSION_KEY] == SCHEMA_VERSION
+      assert read_json(shard_file)[0]["sessions"][0]["comments"] == ""
+
+   def test_sqlite_database_is_upgraded(self, tmp_path):
+      filename = str(tmp_path / "racing_companion.db")
+      SqliteStorage(filename).close()
+      conn = sqlite3.connect(filename)
+      with conn:
+         conn.execute("PRAGMA user_version = 0")
+         conn.execute("INSERT INTO vehicles (name, position, data) VALUES ('Car1', 0, 'null')")
+         conn.execute("INSERT INTO maintenance_entries (position, data) VALUES (0, ?)", (json.dumps({"title": "Oil"}),))
+      conn.close()
+
+      storage = SqliteStorage(filename)
+      try:
+         assert storage.load_vehicles()[1]["Car1"]["type"] == "Car"
+         entry = storage.load_maintenance_entries()[0]
+         assert entry["tags"] == [] and entry["id"]
+         (entry_id,) = storage._conn.execute("SELECT entry_id FROM maintenance_entries").fetchone()
+         assert entry_id == entry["id"]
+         (version,) = storage._conn.execute("PRAGMA user_version").fetchone()
+         assert version == SCHEMA_VERSION
+      finally:
+         storage.close()
+
+   def test_sqlite_maintenance_entry_id_column_is_added(self, tmp_path):
+      filename = str(tmp_path / "racing_companion.db")
+      conn = sqlite3.connect(filename)
+      with conn:
+         # Table of a version 2 database
+         conn.execute(
+            "CREATE TABLE maintenance_entries (id INTEGER PRIMARY KEY, position INTEGER NOT NULL, vehicle TEXT, date TEXT, data TEXT NOT NULL)"
+         )
+         conn.execute("INSERT INTO maintenance_entries (position, data) VALUES (0, ?)", (json.dumps({"title": "Oil"}),))
+         conn.execute("PRAGMA user_version = 2")
+      conn.close()
+
+      storage = SqliteStorage(filename)
+      try:
+         entry = storage.load_maintenance_entries()[0]
+         assert entry["title"] == "Oil" and entry["id"]
+         storage.apply_maintenance_record({"op": "update_maintenance_entry", "entry": dict(entry, title="Brakes")})
+         assert storage.load_maintenance_entries()[0]["title"] == "Brakes"
+      finally:
+         storage.close()
@@ -0,0 +1,168 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Unit tests for the track day cube
+# License: TBD
+
+import random
+
+import pytest
+
+from rcfunc.track_day_aggregates import CubeTotals, TrackDayCube
+from rcfunc.track_day_models import Session, TrackDay
+
+
+@pytest.fixture
+def track_days():
+   return [TrackDay.from_dict(day) for day in [
+      {"track": "Track1", "date": "2024-06-12", "vehicle": "Car1", "sessions": [
+         {"session_number": "1", "laps": "10", "weather": "Sunny", "best_lap_time": "1:42.0"},
+         {"session_number": "2", "laps": "", "weather": "Rain", "best_lap_time": "1:50.0"}
+      ]},
+      {"track": "Track2", "date": "unknown", "vehicle": "Car2", "sessions": []},
+      {"track": "Track1", "date": "2024-08-01", "vehicle": "Car1", "sessions": [
+         {"session_number": "1", "laps": "7", "weather": "Sunny", "best_lap_time": "1:41.5"},
+         {"session_number": "2", "laps": "8", "weather": "Sunny", "best_lap_time": "1:41.5"}
+      ]},
+   ]]
+
+def cells(cube):
+   return (
+      {key: (cell.days, cell.sessions, cell.laps, [lap for lap, _ in cell.best_laps]) for key, cell in cube.cells.items()},
+      dict(cube.days_by_track)
+   )
+
+class TestTrackDayCube:
+   def test_cells(self, track_days):
+      cube = TrackDayCube(track_days)
+      assert len(cube) == 3
+      assert cells(cube) == (
+         {
+            ("Car1", "2024", "Track1", "Sunny"): (2, 3, 25, [101500, 101500, 102000]),
+            ("Car1", "2024", "Track1", "Rain"): (1, 1, 0, [110000]),
+         },
+         {("Car1", "2024", "Track1"): 2, ("Car2", None, "Track2"): 1}
+      )
+
+   def test_totals(self, track_days):
+      cube = TrackDayCube(track_days)
+      totals = cube.totals()
+      assert (totals.days, totals.sessions, totals.laps) == (3, 4, 25)
+      # The first of equally fast sessions
+      assert cube.session(totals.best_lap) == (track_days[2], track_days[2].sessions[0])
+      assert cube.totals(weather="Rain").days == 1
+      assert cube.totals("Car2", "unknown").days == 1
+      assert cube.totals("Car1", 2023) == CubeTotals()
+      assert {key: group.days for key, group in cube.totals_by("weather", track="Track1").items()} == {"Sunny": 2, "Rain": 1}
+      assert {key: group.sessions for key, group in cube.totals_by("vehicle").items()} == {"Car1": 4, "Car2": 0}
+      assert sorted(cube.totals_by("year"), key=str) == ["2024", None]
+
+   def test_journal_records_match_rebuild(self, track_days):
+      cube = TrackDayCube(track_days)
+      new_day = TrackDay(track="Track3", date="2025-01-01", vehicle="Car2")
+      track_days.append(new_day)
+      cube.apply_journal_record({"op": "create_track_day", "track_day": new_day}, track_days)
+      track_days[3].sessions.append(Session(session_number="1", laps="5", weather="Rain", best_lap_time="59.0"))
+      cube.apply_journal_record({"op": "add_session", "track_day_id": new_day.id}, track_days)
+      track_days[0].sessions[0].update({"laps": "3", "weather": "Rain", "best_lap_time": "1:40.0"})
+      cube.apply_journal_record({"op": "update_session", "track_day_id": track_days[0].id}, track_days)
+      deleted = track_days.pop(1)
+      cube.apply_journal_record({"op": "delete_track_day", "track_day_id": deleted.id}, track_days)
+      bulk_day = TrackDay(track="Track1", date="2024-09-01", vehicle="Car1", sessions=[Session(laps="2", weather="Sunny")])
+      track_days.append(bulk_day)
+      track_days[1].sessions.append(Session(laps="6", weather="Fog"))
+      cube.apply_journal_record({"op": "add_bulk", "track_days": [bulk_day], "sessions": {track_days[1].id: []}}, track_days)
+      assert cells(cube) == cells(TrackDayCube(track_days))
+      assert cube.session(cube.totals("Car1").best_lap)[1] is track_days[0].sessions[0]
+      assert cube.session(cube.totals().best_lap)[0] is new_day
+
+      with pytest.raises(ValueError):
+         cube.apply_journal_record({"op": "unknown"}, track_days)
+
+def scan_totals(track_days, vehicle=None, year=None, track=None, weather=None):
+   """The totals of the track days matching the filters, by looking at every track day."""
+   days = sessions = laps = 0
+   best_lap = None
+   for day in track_days:
+      day_year = day.date[:4] if day.date[:4].isdigit() else None
+      if vehicle and day.vehicle != vehicle or track and day.track != track:
+         continue
+      if year and day_year != (str(year) if str(year).isdigit() else None):
+         continue
+      matching = [session for session in day.sessions if not weather or session.weather == weather]
+      if weather and not matching:
+         continue
+      days += 1
+      sessions += len(matching)
+      laps += sum(int(session.laps) if session.laps.isdigit() else 0 for session in matching)
+      lap_times = [session.best_lap_ms for session in matching if session.best_lap_ms is not None]
+      if lap_times and (best_lap is None or min(lap_times) < best_lap):
+         best_lap = min(lap_times)
+   return days, sessions, laps, best_lap
+
+def cube_totals(totals):
+   return totals.days, totals.sessions, totals.laps, totals.best_lap[0] if totals.best_lap else None
+
+class TestRandomizedTrackDayCube:
+   VEHICLES = ["Car1", "Car2", "Car3"]
+   TRACKS = ["Track1", "Track2"]
+   WEATHER = ["Sunny", "Rain", ""]
+   DATES = ["2023-05-01", "2024-06-12", "2024-09-30", "unknown", ""]
+
+   def random_session(self, rng):
+      return Session(
+         laps=rng.choice(["3", "12", "7", "", "many"]),
+         weather=rng.choice(self.WEATHER),
+         # Few distinct times for equally fast sessions, some without a valid time
+         best_lap_time=rng.choice(["1:41.5", "1:42.0", "59.9", "", "dnf"])
+      )
+
+   def random_track_day(self, rng):
+      return TrackDay(
+         track=rng.choice(self.TRACKS), date=rng.choice(self.DATES), vehicle=rng.choice(self.VEHICLES),
+         sessions=[self.random_session(rng) for _ in range(rng.randint(0, 4))]
+      )
+
+   def test_journal_records_match_scan(self):
+      rng = random.Random(2024)
+      track_days = [self.random_track_day(rng) for _ in range(20)]
+      cube = TrackDayCube(track_days)
+      for _ in range(300):
+         operation = rng.choice(["create", "delete", "add_session", "update_session", "bulk"])
+         if operation == "create":
+            track_day = self.random_track_day(rng)
+            track_days.append(track_day)
+            record = {"op": "create_track_day", "track_day": track_day}
+         elif operation == "delete" and track_days:
+            record = {"op": "delete_track_day", "track_day_id": track_days.pop(rng.randrange(len(track_days))).id}
+         elif operation == "add_session" and track_days:
+            track_day = rng.choice(track_days)
+            track_day.sessions.append(self.random_session(rng))
+            record = {"op": "add_session", "track_day_id": track_day.id}
+         elif operation == "update_session" and any(day.sessions for day in track_days):
+            track_day = rng.choice([day for day in track_days if day.sessions])
+            changed = self.random_session(rng)
+            rng.choice(track_day.sessions).update({"laps": changed.laps, "weather": changed.weather, "best_lap_time": changed.best_lap_time})
+            record = {"op": "update_session", "track_day_id": track_day.id}
+         elif operation == "bulk" and track_days:
+            new_days = [self.random_track_day(rng) for _ in range(rng.randint(0, 3))]
+            changed_days = rng.sample(track_days, min(len(track_days), 2))
+            for track_day in changed_days:
+               track_day.sessions.extend(self.random_session(rng) for _ in range(2))
+            track_days.extend(new_days)
+            record = {"op": "add_bulk", "track_days": new_days, "sessions": {day.id: [] for day in changed_days}}
+         else:
+            continue
+         cube.apply_journal_record(record, track_days)
+
+         assert len(cube) == len(track_days)
+         for filters in (
+            {}, {"vehicle": rng.choice(self.VEHICLES)}, {"year": rng.choice(["2023", 2024, "unknown"])},
+            {"track": rng.choice(self.TRACKS), "weather": rng.choice(self.WEATHER[:2])},
+            {"vehicle": rng.choice(self.VEHICLES), "year": "2024", "weather": "Rain"},
+         ):
+            totals = cube.totals(**filters)
+            assert cube_totals(totals) == scan_totals(track_days, **filters), filters
+            if totals.best_lap:
+               assert cube.session(totals.best_lap)[1].best_lap_ms == totals.best_lap[0]
+         for vehicle, totals in cube.totals_by("vehicle").items():
+            assert cube_totals(totals) == scan_totals(track_days, vehicle=vehicle)
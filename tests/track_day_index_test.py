@@ -0,0 +1,135 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Unit tests for the track day header index and lazy session loading
+# License: TBD
+
+import json
+import os
+
+import pytest
+
+from rcfunc.track_day_index import (
+   LazyTrackDay, SessionStore, index_file_for, pin_sessions, snapshot_track_days, write_snapshot, write_track_day_snapshot
+)
+from rcfunc.track_day_models import Session, TrackDay, encode_model
+from rcfunc.track_session_mngr import TrackSessionMngr
+
+
+@pytest.fixture
+def track_days():
+   return [
+      TrackDay.from_dict({
+         "track": f"Track{i}",
+         "date": f"2024-06-{i + 10}",
+         "organizer": "Org1",
+         "vehicle": "Car1",
+         "sessions": [{"session_number": "1", "laps": str(i), "vehicle": "Car1", "weather": "Sunny", "comments": "Ünïcode"}]
+      })
+      for i in range(4)
+   ]
+
+@pytest.fixture
+def stored(track_days):
+   return [day.to_dict() for day in track_days]
+
+@pytest.fixture
+def filename(tmp_path, track_days):
+   filename = str(tmp_path / "track_sessions.json")
+   write_snapshot(track_days, filename)
+   return filename
+
+class TestTrackDayIndex:
+   def test_snapshot_is_plain_json(self, filename, stored):
+      with open(filename, "r") as file:
+         assert json.load(file) == stored
+      assert os.path.exists(index_file_for(filename))
+
+   def test_headers_load_without_sessions(self, filename, track_days, stored):
+      store = SessionStore(filename)
+      lazy_days = store.load_headers()
+
+      assert all(isinstance(day, LazyTrackDay) and not day.sessions_loaded() for day in lazy_days)
+      assert [day.track for day in lazy_days] == [day.track for day in track_days]
+      assert store.loads == 0
+      assert lazy_days[2].sessions == track_days[2].sessions
+      assert lazy_days[3].sessions == track_days[3].sessions
+      assert store.loads == 2
+      assert [day.to_dict() for day in lazy_days] == stored
+      assert json.loads(json.dumps(lazy_days, default=encode_model)) == stored
+
+   def test_least_recently_used_sessions_are_dropped(self, filename):
+      store = SessionStore(filename, max_resident=2)
+      lazy_days = store.load_headers()
+      for day in (lazy_days[0], lazy_days[1], lazy_days[0], lazy_days[2]):
+         day.sessions
+
+      assert [day.sessions_loaded() for day in lazy_days] == [True, False, True, False]
+      assert store.resident_count() == 2
+      assert store.loads == 3
+
+   def test_pinned_sessions_are_kept_and_written(self, filename, track_days):
+      store = SessionStore(filename, max_resident=1)
+      lazy_days = store.load_headers()
+      new_session = Session(session_number="2", laps="5")
+      lazy_days[0].sessions.append(new_session)
+      pin_sessions(lazy_days[0])
+      for day in lazy_days[1:]:
+         day.sessions
+      assert lazy_days[0].sessions_loaded()
+
+      write_snapshot(lazy_days, filename)
+      track_days[0].sessions.append(new_session)
+      stored = [day.to_dict() for day in track_days]
+      with open(filename, "r") as file:
+         assert json.load(file) == stored
+      # Byte ranges follow the new file, unmodified session lists weren't parsed for the write
+      assert store.loads == 4
+      assert [day.to_dict() for day in lazy_days] == stored
+      assert SessionStore(filename).load_headers()[0].sessions == track_days[0].sessions
+
+   def test_snapshot_keeps_later_changes_pinned(self, filename, stored):
+      store = SessionStore(filename, max_resident=1)
+      lazy_days = store.load_headers()
+      lazy_days[0].sessions.append(Session(session_number="2"))
+      pin_sessions(lazy_days[0])
+      snapshot = snapshot_track_days(lazy_days)
+
+      # Modified after the snapshot was taken, before it is written
+      lazy_days[0].sessions.append(Session(session_number="3"))
+      pin_sessions(lazy_days[0])
+      lazy_days[1].sessions.append(Session(session_number="2"))
+      pin_sessions(lazy_days[1])
+      write_track_day_snapshot(snapshot, filename)
+
+      with open(filename, "r") as file:
+         written = json.load(file)
+      assert [len(day["sessions"]) for day in written] == [2, 1, 1, 1]
+      assert written[1:] == stored[1:]
+      for day in lazy_days[2:]:
+         day.sessions
+      assert [len(day.sessions) for day in lazy_days] == [3, 2, 1, 1]
+
+   def test_index_of_changed_file_is_ignored(self, filename, stored):
+      with open(filename, "w") as file:
+         json.dump(stored[:1], file)
+      assert SessionStore(filename).load_headers() is None
+
+   def test_track_day_without_sessions(self, tmp_path):
+      filename = str(tmp_path / "track_sessions.json")
+      track_days = [TrackDay(track="Track1"), TrackDay()]
+      write_snapshot(track_days, filename)
+      lazy_days = SessionStore(filename).load_headers()
+      assert [day.to_dict() for day in lazy_days] == [day.to_dict() for day in track_days]
+
+   def test_manager_pins_modified_sessions(self, filename):
+      store = SessionStore(filename, max_resident=1)
+      lazy_days = store.load_headers()
+      mngr = TrackSessionMngr(lazy_days, ["Car1"], None, ["Sunny"], lambda track_days: None)
+      first_id, second_id = lazy_days[0].id, lazy_days[1].id
+      mngr.add_session(first_id, Session(session_number="2", laps="5", vehicle="Car1", weather="Sunny"))
+      mngr.update_session(second_id, lazy_days[1].sessions[0].id, {"laps": "9"})
+      for day in lazy_days[2:]:
+         day.sessions
+
+      assert mngr.get_session_numbers(first_id) == ["1", "2"]
+      assert mngr.find_session_by_number(second_id, "1").laps == "9"
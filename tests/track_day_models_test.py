@@ -0,0 +1,86 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Unit tests for the track day and session models
+# License: TBD
+
+import json
+
+import pytest
+
+from rcfunc.track_day_models import Session, TrackDay, encode_model, parse_lap_time
+
+
+@pytest.fixture
+def stored_day():
+   return {
+      "id": "day1",
+      "track": "Track1",
+      "date": "2024-06-12",
+      "organizer": "Org1",
+      "vehicle": "Car1",
+      "transponder": "1234",
+      "sessions": [{
+         "id": "session1", "session_number": "1", "laps": "10", "vehicle": "Car1", "weather": "Sunny", "tire_type": "Slicks",
+         "tire_status": "New", "best_lap_time": "1:42.0", "comments": "", "fuel": "10"
+      }]
+   }
+
+class TestTrackDayModels:
+   def test_round_trip_keeps_unknown_fields(self, stored_day):
+      track_day = TrackDay.from_dict(stored_day)
+      assert track_day.track == "Track1"
+      assert track_day.sessions[0].best_lap_time == "1:42.0"
+      assert track_day.extra == {"transponder": "1234"}
+      assert track_day.sessions[0].extra == {"fuel": "10"}
+      assert track_day.to_dict() == stored_day
+
+   def test_missing_fields_are_empty(self):
+      track_day = TrackDay.from_dict({"id": "day1", "track": "Track1", "sessions": [{"id": "session1", "session_number": "1"}]})
+      assert track_day == TrackDay(track="Track1", sessions=[Session(session_number="1", id="session1")], id="day1")
+      assert track_day.extra is None and track_day.sessions[0].extra is None
+
+   def test_ids(self, stored_day):
+      # New and stored records without an id get a unique one
+      assert TrackDay().id != TrackDay().id
+      del stored_day["id"], stored_day["sessions"][0]["id"]
+      track_day = TrackDay.from_dict(stored_day)
+      assert track_day.id and track_day.sessions[0].id
+      # Equal content, different records
+      assert TrackDay.from_dict(stored_day) != track_day
+      track_day.sessions[0].update({"id": "other", "laps": "11"})
+      assert track_day.sessions[0].id != "other" and track_day.sessions[0].laps == "11"
+
+   def test_header_dict_has_no_sessions(self, stored_day):
+      header = TrackDay.from_dict(stored_day).header_dict()
+      del stored_day["sessions"]
+      assert header == stored_day
+
+   def test_session_update(self):
+      session = Session(session_number="1", laps="10")
+      session.update({"laps": "12", "fuel": "8"})
+      assert session.laps == "12"
+      assert session.to_dict()["fuel"] == "8"
+
+   def test_lap_time_in_milliseconds(self):
+      assert parse_lap_time("1:42.5") == 102500
+      assert parse_lap_time("59.999") == 59999
+      assert parse_lap_time("2:03") == 123000
+      assert [parse_lap_time(text) for text in ("", "N/A", "1.42.0", "1:2:3", "inf")] == [None] * 5
+
+      session = Session.from_dict({"session_number": "1", "best_lap_time": "1:42.5"})
+      assert session.best_lap_ms == 102500
+      session.update({"best_lap_time": "1:41.0"})
+      assert session.best_lap_ms == 101000
+      # Derived, not stored
+      assert "best_lap_ms" not in session.to_dict()
+
+   def test_slots(self):
+      with pytest.raises(AttributeError):
+         Session().unknown = 1
+      assert not hasattr(TrackDay(), "__dict__")
+
+   def test_encode_model(self, stored_day):
+      record = {"op": "create_track_day", "track_day": TrackDay.from_dict(stored_day)}
+      assert json.loads(json.dumps(record, default=encode_model)) == {"op": "create_track_day", "track_day": stored_day}
+      with pytest.raises(TypeError):
+         json.dumps(object(), default=encode_model)
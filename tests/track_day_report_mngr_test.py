@@ -1,10 +1,12 @@
 import pytest
+from rcfunc.track_day_models import Session, TrackDay
 from rcfunc.track_day_report_mngr import TrackDayReportMngr
+from rcfunc.track_session_mngr import TrackSessionMngr
 
 class TestTrackDayReportMngr:
     @pytest.fixture(autouse=True)
     def setup(self):
-        self.track_days = [
+        self.track_days = [TrackDay.from_dict(day) for day in [
             {
                 "track": "Track1",
                 "date": "2024-06-12",
@@ -30,7 +32,7 @@ class TestTrackDayReportMngr:
                     {"session_number": "2", "laps": "8", "vehicle": "Car1", "weather": "Rain"}
                 ]
             }
-        ]
+        ]]
         self.vehicles = ["Car1", "Car2"]
         self.mngr = TrackDayReportMngr(self.track_days, self.vehicles)
 
@@ -85,4 +87,73 @@ class TestTrackDayReportMngr:
         tracks = self.mngr.get_available_tracks(vehicle="Car1", year="2024")
         assert tracks == ["Track1"]
         tracks_none = self.mngr.get_available_tracks(vehicle="Car2", year="2024")
-        assert tracks_none == []
\ No newline at end of file
+        assert tracks_none == []
+    def test_lap_times_compare_numerically(self):
+        track_days = [TrackDay.from_dict({"track": "Track1", "date": "2024-06-12", "vehicle": "Car1", "sessions": [
+            {"session_number": "1", "best_lap_time": "1:00.100"},
+            {"session_number": "2", "best_lap_time": "59.900"},
+            {"session_number": "3", "best_lap_time": "9:59.000"},
+        ]})]
+        mngr = TrackDayReportMngr(track_days, self.vehicles)
+        assert "Best Lap Time: 59.900 (Date: 2024-06-12, Session: 2," in mngr.generate_report("summary", "Car1", track="Track1")
+
+        result = mngr.generate_report("extensive", "Car1")
+        assert "Worst lap: 9:59.000 (Session 3)" in result
+        assert "Improvement: 539.100 seconds" in result
+
+        track_days[0].sessions[0].update({"best_lap_time": "58.000"})
+        # A change made outside of TrackSessionMngr journaling, the cube is rebuilt
+        mngr.track_days_changed()
+        assert "Best Lap Time: 58.000 (Date: 2024-06-12, Session: 1," in mngr.generate_report("summary", "Car1", track="Track1")
+
+    def test_summary_follows_journaled_changes(self):
+        session_mngr = TrackSessionMngr(
+            self.track_days, self.vehicles, None, ["Sunny"], None,
+            journal_callback=lambda record, track_days: self.mngr.track_days_changed(record)
+        )
+        assert "Track Days: 2\n  Sessions: 2\n  Total Laps: 18" in self.mngr.generate_report("summary", "Car1")
+        cube = self.mngr.get_cube()
+        track_day = session_mngr.create_track_day("Track3", "2024-09-01", "Org1", "Car1")
+        session_mngr.add_session(track_day.id, Session(session_number="1", laps="4", vehicle="Car1", weather="Sunny", best_lap_time="1:10.0"))
+        assert self.mngr.get_cube() is cube
+
+        report = self.mngr.generate_report("summary", "Car1", year="2024")
+        assert "Track Days: 2\n  Sessions: 2\n  Total Laps: 14" in report
+        assert "Unique Tracks Visited: 2 (Track1, Track3)" in report
+        assert "Best Lap Time: 1:10.0 (Date: 2024-09-01, Session: 1," in self.mngr.generate_report("summary", "Car1", track="Track3")
+        assert "Number of Days: 1" in self.mngr.generate_report("summary", track="Track3")
+
+    def test_new_track_day_list_rebuilds_cube(self):
+        cube = self.mngr.get_cube()
+        # Same length as before, like the list of all vehicles handed in before every report
+        self.mngr.track_days = self.track_days[:2] + [TrackDay(track="Track3", date="2024-09-01", vehicle="Car1")]
+        assert self.mngr.get_cube() is not cube
+        assert "Unique Tracks Visited: 2 (Track1, Track3)" in self.mngr.generate_report("summary", "Car1")
+
+    def test_extensive_personal_best_from_track_lap_index(self):
+        track_days = [TrackDay.from_dict(day) for day in [
+            {"track": "Track1", "date": "2024-06-12", "vehicle": "Car1", "sessions": [
+                {"session_number": "1", "best_lap_time": "1:02.000"}, {"session_number": "2", "best_lap_time": "1:01.000"}
+            ]},
+            {"track": "Track1", "date": "2024-07-01", "vehicle": "Car2", "sessions": [
+                {"session_number": "1", "best_lap_time": "1:00.500"}, {"session_number": "2", "best_lap_time": ""}
+            ]},
+            {"track": "Track2", "date": "2024-07-02", "vehicle": "Car1", "sessions": []},
+        ]]
+        mngr = TrackDayReportMngr(track_days, self.vehicles)
+        personal_best, laps = mngr.track_lap_index()["Track1"]
+        assert laps == [60500, 61000, 62000]
+        assert mngr.get_cube().session(personal_best) == (track_days[1], track_days[1].sessions[0])
+
+        result = mngr.generate_report("extensive", "Car1")
+        assert "Personal best on Track1: 1:00.500 (Date: 2024-07-01, Session 1)" in result
+        assert "Best lap difference to personal best: +0.500 seconds" in result
+        assert "Best lap faster than 33% of the 3 timed sessions on Track1" in result
+        assert "Personal best on Track2" not in result
+
+        # A lap time that can't be parsed has nothing to compare with the personal best
+        track_days[0].sessions = [Session(session_number="1", best_lap_time="fast")]
+        mngr.track_days = track_days
+        result = mngr.generate_report("extensive", "Car1")
+        assert "Personal best on Track1: 1:00.500" in result
+        assert "Best lap difference" not in result and "inf" not in result
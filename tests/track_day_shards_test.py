@@ -0,0 +1,184 @@
+# This file is part of the Racing-Companion project.
+#
+# Description: Unit tests for the per vehicle and year track day shards
+# License: TBD
+
+import json
+import os
+
+import pytest
+
+import rcfunc.data_utils as data_utils
+from rcfunc.track_day_models import Session, TrackDay
+from rcfunc.track_day_report_mngr import TrackDayReportMngr
+from rcfunc.track_day_shards import TrackDayShards
+from rcfunc.track_session_mngr import TrackSessionMngr
+
+
+def make_day(track, date, vehicle, laps="10"):
+   return {
+      "id": f"{vehicle}-{date}",
+      "track": track,
+      "date": date,
+      "organizer": "Org1",
+      "vehicle": vehicle,
+      "sessions": [{
+         "id": f"{vehicle}-{date}-1", "session_number": "1", "laps": laps, "vehicle": vehicle, "weather": "Sunny",
+         "tire_type": "", "tire_status": "", "best_lap_time": "", "comments": ""
+      }]
+   }
+
+@pytest.fixture
+def track_days():
+   return [
+      make_day("Track1", "2025-05-01", "Car1"),
+      make_day("Track2", "2026-04-12", "Car1"),
+      make_day("Track1", "2026-06-20", "Car2"),
+      make_day("Track3", "2026-07-02", "Car1"),
+   ]
+
+@pytest.fixture
+def legacy_file(tmp_path, track_days):
+   legacy_file = str(tmp_path / "track_sessions.json")
+   with open(legacy_file, "w") as file:
+      json.dump(track_days, file, indent=4)
+   return legacy_file
+
+@pytest.fixture
+def shards_dir(tmp_path):
+   return str(tmp_path / "track_days")
+
+def to_dicts(track_days):
+   return [day.to_dict() for day in track_days]
+
+def read_manifest(shards_dir):
+   with open(os.path.join(shards_dir, "manifest.json"), "r") as file:
+      return json.load(file)
+
+class TestTrackDayShards:
+   def test_legacy_file_is_split(self, shards_dir, legacy_file, track_days):
+      shards = TrackDayShards(shards_dir, legacy_file)
+      loaded = shards.load()
+
+      assert to_dicts(loaded) == [track_days[0], track_days[1], track_days[3], track_days[2]]
+      assert not os.path.exists(legacy_file)
+      assert os.path.exists(legacy_file + ".migrated")
+      assert [(s["vehicle"], s["year"], s["file"], s["count"]) for s in read_manifest(shards_dir)["shards"]] == [
+         ("Car1", "2025", "Car1/2025.json", 1),
+         ("Car1", "2026", "Car1/2026.json", 2),
+         ("Car2", "2026", "Car2/2026.json", 1),
+      ]
+      assert to_dicts(TrackDayShards(shards_dir, legacy_file).load()) == to_dicts(loaded)
+
+   def test_load_opens_only_shards_of_vehicle(self, shards_dir, legacy_file, track_days, monkeypatch):
+      TrackDayShards(shards_dir, legacy_file).load()
+      opened = []
+      load_track_day_headers = data_utils.load_track_day_headers
+
+      def recording_load(filename):
+         opened.append(os.path.relpath(filename, shards_dir))
+         return load_track_day_headers(filename=filename)
+
+      monkeypatch.setattr(data_utils, "load_track_day_headers", recording_load)
+      shards = TrackDayShards(shards_dir, legacy_file)
+      assert to_dicts(shards.load("Car2")) == [track_days[2]]
+      assert opened == [os.path.join("Car2", "2026.json")]
+
+      # The manifest answers without opening shards
+      assert [s["tracks"] for s in shards.get_shards()] == [["Track1"], ["Track2", "Track3"], ["Track1"]]
+      assert opened == [os.path.join("Car2", "2026.json")]
+
+   def test_preload_parses_shards_of_vehicle(self, shards_dir, legacy_file, track_days, monkeypatch):
+      TrackDayShards(shards_dir, legacy_file).load()
+      shards = TrackDayShards(shards_dir, legacy_file)
+      progress = []
+      shards.preload("Car1", progress=lambda loaded, total: progress.append((loaded, total)))
+      assert progress == [(1, 2), (2, 2)]
+
+      monkeypatch.setattr(data_utils, "load_track_day_headers", None)
+      assert to_dicts(shards.load("Car1")) == [track_days[0], track_days[1], track_days[3]]
+
+   def test_session_edit_journals_only_its_shard(self, shards_dir, legacy_file):
+      shards = TrackDayShards(shards_dir, legacy_file)
+      loaded = shards.load("Car1")
+      mngr = TrackSessionMngr(loaded, ["Car1", "Car2"], "Car1", ["Sunny"], shards.save, shards.append_journal_record)
+
+      # The second track day of the Car1/2026 shard
+      assert mngr.update_session("Car1-2026-07-02", "Car1-2026-07-02-1", {"laps": "99"})
+
+      journals = [
+         os.path.relpath(os.path.join(root, name), shards_dir)
+         for root, _, names in os.walk(shards_dir) for name in names if name.endswith(data_utils.JOURNAL_SUFFIX)
+      ]
+      assert journals == [os.path.join("Car1", "2026.json" + data_utils.JOURNAL_SUFFIX)]
+      reloaded = TrackDayShards(shards_dir, legacy_file).load("Car1")
+      assert reloaded[2].sessions[0].laps == "99"
+      assert reloaded[1].sessions[0].laps == "10"
+
+   def test_bulk_is_journaled_per_shard(self, shards_dir, legacy_file):
+      shards = TrackDayShards(shards_dir, legacy_file)
+      loaded = shards.load("Car1")
+      mngr = TrackSessionMngr(loaded, ["Car1", "Car2"], None, ["Sunny"], shards.save, shards.append_journal_record)
+      new_days = [TrackDay(track="Track4", date="2026-08-01", vehicle="Car2"), TrackDay(track="Track5", date="2027-01-01", vehicle="Car1")]
+      new_session = Session(session_number="2", laps="8", vehicle="Car1", weather="Sunny")
+      mngr.apply_bulk(new_days, {"Car1-2025-05-01": [new_session]})
+
+      journals = sorted(
+         os.path.relpath(os.path.join(root, name), shards_dir)
+         for root, _, names in os.walk(shards_dir) for name in names if name.endswith(data_utils.JOURNAL_SUFFIX)
+      )
+      assert journals == [
+         os.path.join(vehicle, year + ".json" + data_utils.JOURNAL_SUFFIX)
+         for vehicle, year in (("Car1", "2025"), ("Car1", "2027"), ("Car2", "2026"))
+      ]
+      assert [(s["vehicle"], s["year"], s["count"]) for s in shards.get_shards()] == [
+         ("Car1", "2025", 1), ("Car1", "2026", 2), ("Car1", "2027", 1), ("Car2", "2026", 2)
+      ]
+      reloaded = TrackDayShards(shards_dir, legacy_file).load()
+      assert [session.session_number for session in reloaded[0].sessions] == ["1", "2"]
+      assert [day.track for day in reloaded] == ["Track1", "Track2", "Track3", "Track5", "Track1", "Track4"]
+
+   def test_create_and_delete_update_manifest(self, shards_dir, legacy_file, track_days):
+      shards = TrackDayShards(shards_dir, legacy_file)
+      loaded = shards.load("Car1")
+      mngr = TrackSessionMngr(loaded, ["Car1", "Car2"], None, ["Sunny"], shards.save, shards.append_journal_record)
+
+      # A track day of a vehicle that isn't loaded goes next to the existing ones of its shard
+      mngr.create_track_day("Track4", "2026-08-01", "Org1", "Car2")
+      mngr.create_track_day("Track5", "2027-01-01", "Org1", "Car1")
+      mngr.delete_track_day("Car1-2025-05-01")
+
+      assert [(s["vehicle"], s["year"], s["count"]) for s in shards.get_shards()] == [
+         ("Car1", "2026", 2), ("Car1", "2027", 1), ("Car2", "2026", 2)
+      ]
+      assert TrackDayShards(shards_dir, legacy_file).get_shards() == shards.get_shards()
+      assert [day.track for day in TrackDayShards(shards_dir, legacy_file).load()] == [
+         "Track2", "Track3", "Track5", "Track1", "Track4"
+      ]
+
+   def test_save_keeps_shards_of_other_vehicles(self, shards_dir, legacy_file, track_days):
+      shards = TrackDayShards(shards_dir, legacy_file)
+      loaded = shards.load("Car1")
+      shards.save(loaded[1:] + [TrackDay.from_dict(make_day("Track4", "2026-08-01", "Car2"))])
+
+      assert [day.track for day in TrackDayShards(shards_dir, legacy_file).load()] == [
+         "Track2", "Track3", "Track1", "Track4"
+      ]
+
+   def test_new_storage_without_legacy_file(self, shards_dir, tmp_path):
+      shards = TrackDayShards(shards_dir, str(tmp_path / "missing.json"))
+      assert shards.load() == []
+      shards.append_journal_record({"op": "create_track_day", "track_day": TrackDay.from_dict(make_day("Track1", "2026-01-01", "My Car!"))}, None)
+      assert shards.get_shards()[0]["file"] == os.path.join("My_Car", "2026.json")
+
+class TestReportMngrWithShards:
+   def test_years_and_tracks_from_manifest(self, shards_dir, legacy_file, track_days):
+      shards = TrackDayShards(shards_dir, legacy_file)
+      shards.load()
+      report_mngr = TrackDayReportMngr([], ["Car1", "Car2"], shards=shards.get_shards())
+      scan_mngr = TrackDayReportMngr([TrackDay.from_dict(day) for day in track_days], ["Car1", "Car2"])
+
+      for vehicle in (None, "Car1", "Car2"):
+         assert report_mngr.get_available_years(vehicle) == scan_mngr.get_available_years(vehicle)
+         for year in (None, "2025", "2026"):
+            assert report_mngr.get_available_tracks(vehicle, year) == scan_mngr.get_available_tracks(vehicle, year)
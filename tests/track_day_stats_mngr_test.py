@@ -1,12 +1,14 @@
 import pytest
 
+from rcfunc.track_day_models import Session, TrackDay
 from rcfunc.track_day_stats_mngr import TrackDayStatsMngr
+from rcfunc.track_session_mngr import TrackSessionMngr
 
 
 class TestTrackDayStatsMngr:
     @pytest.fixture(autouse=True)
     def setup(self):
-        self.track_days = [
+        self.track_days = [TrackDay.from_dict(day) for day in [
             {
                 "track": "Track A",
                 "date": "2024-05-10",
@@ -42,9 +44,9 @@ class TestTrackDayStatsMngr:
                 "vehicle": "Car2",
                 "sessions": [],
             },
-        ]
+        ]]
         self.vehicles = ["Car1", "Car2"]
-        self.mngr = TrackDayStatsMngr(self.track_days, self.vehicles, active_vehicle="Car1")
+        self.mngr = TrackDayStatsMngr(self.track_days, self.vehicles, active_vehicle="Car1", check_consistency=True)
 
     def test_track_frequency_data_all(self):
         data = self.mngr.get_chart_data("track_frequency")
@@ -95,6 +97,39 @@ class TestTrackDayStatsMngr:
     def test_get_available_vehicles(self):
         assert self.mngr.get_available_vehicles() == ["Car1", "Car2"]
 
+    def test_compute_all(self):
+        charts = self.mngr.compute_all(vehicle="Car1", year="2024")
+        assert list(charts) == ["track_frequency", "performance_metrics", "vehicle_activity", "weather_distribution"]
+        for chart_type, data in charts.items():
+            assert data == self.mngr.get_chart_data(chart_type, vehicle="Car1", year="2024")
+        assert charts["vehicle_activity"]["sessions_count"] == [2]
+        assert charts["performance_metrics"]["avg_laps"] == [18.0]
+
+    def test_cube_follows_mutations(self):
+        session_mngr = TrackSessionMngr(
+            self.track_days, self.vehicles, None, ["Sunny"], None,
+            journal_callback=lambda record, track_days: self.mngr.track_days_changed(record)
+        )
+        cube = self.mngr.get_cube()
+        track_day = session_mngr.create_track_day("Track B", "2024-07-01", "Org2", "Car1")
+        session_mngr.add_session(track_day.id, Session(session_number="1", laps="6", vehicle="Car1", weather="Rain"))
+        session = self.track_days[0].sessions[0]
+        session_mngr.update_session(self.track_days[0].id, session.id, {"laps": "4", "weather": "Rain"})
+        session_mngr.delete_track_day(self.track_days[1].id)
+        assert self.mngr.get_cube() is cube
+
+        # check_consistency compares every filter with the full recompute
+        for vehicle in (None, "Car1", "Car2"):
+            for year in (None, "2023", "2024"):
+                self.mngr.compute_all(vehicle, year)
+        data = self.mngr.get_chart_data("weather_distribution", vehicle="Car1", year="2024")
+        assert data["values"] == [1, 2]
+
+        # A difference is reported
+        cube.cells["Car1", "2024", "Track A", "Rain"].laps += 1
+        with pytest.raises(RuntimeError):
+            self.mngr.compute_all("Car1")
+
     def test_get_chart_data_unknown_type(self):
         assert self.mngr.get_chart_data("unknown") == {}
 
@@ -120,7 +155,7 @@ class TestTrackDayStatsMngr:
         assert weather["values"] == []
 
     def test_update_data_references(self):
-        new_days = [
+        new_days = [TrackDay.from_dict(
             {
                 "track": "Track D",
                 "date": "2025-01-01",
@@ -128,9 +163,15 @@ class TestTrackDayStatsMngr:
                 "vehicle": "Car3",
                 "sessions": [{"session_number": "1", "laps": "7", "vehicle": "Car3", "weather": "Sunny"}],
             }
-        ]
+        )]
         new_vehicles = ["Car3"]
 
+        # Results cached for an unchanged data version are dropped with the old references
+        cached = TrackDayStatsMngr(self.track_days, self.vehicles, data_version=lambda: 1)
+        assert cached.get_chart_data("track_frequency")["labels"]
+        cached.update_data_references(new_days, new_vehicles, "Car3")
+        assert cached.get_chart_data("track_frequency")["labels"] == ["Track D"]
+
         self.mngr.update_data_references(new_days, new_vehicles, "Car3")
 
         data = self.mngr.get_chart_data("track_frequency", vehicle="Car3")
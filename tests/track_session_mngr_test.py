@@ -6,29 +6,32 @@ import pytest
 import os
 import csv
 import tempfile
+from rcfunc.track_day_models import Session, TrackDay
 from rcfunc.track_session_mngr import TrackSessionMngr
 
 class TestTrackSessionMngr:
    @pytest.fixture(autouse=True)
    def setup(self):
-      self.track_days = [
+      self.track_days = [TrackDay.from_dict(day) for day in [
          {
+            "id": "day1",
             "track": "Track1",
             "date": "2024-06-12",
             "organizer": "Org1",
             "vehicle": "Car1",
             "sessions": [
-               {"session_number": "1", "laps": "10", "vehicle": "Car1", "weather": "Sunny"}
+               {"id": "session1", "session_number": "1", "laps": "10", "vehicle": "Car1", "weather": "Sunny"}
             ]
          },
          {
+            "id": "day2",
             "track": "Track2",
             "date": "2024-06-13",
             "organizer": "Org2",
             "vehicle": "Car2",
             "sessions": []
          }
-      ]
+      ]]
       self.vehicles = ["Car1", "Car2"]
       self.active_vehicle = "Car1"
       self.weather_options = ["Sunny", "Rain"]
@@ -48,7 +51,24 @@ class TestTrackSessionMngr:
    def test_get_filtered_track_days(self):
       filtered = self.mngr.get_filtered_track_days()
       assert len(filtered) == 1
-      assert filtered[0]["vehicle"] == "Car1"
+      assert filtered[0].vehicle == "Car1"
+
+   def test_filtered_track_days_follow_changes(self):
+      filtered = self.mngr.get_filtered_track_days()
+      # Kept between calls
+      assert self.mngr.get_filtered_track_days() is filtered
+      new_day = self.mngr.create_track_day("Track3", "2024-06-14", "Org3", "Car1")
+      self.mngr.create_track_day("Track4", "2024-06-15", "Org4", "Car2")
+      assert [day.track for day in self.mngr.get_filtered_track_days()] == ["Track1", "Track3"]
+      self.mngr.delete_track_day("day1")
+      assert self.mngr.get_filtered_track_days() == [new_day]
+      self.mngr.active_vehicle = "Car2"
+      assert [day.track for day in self.mngr.get_filtered_track_days()] == ["Track2", "Track4"]
+
+      self.mngr.update_data_references([TrackDay(track="Track5", vehicle="Car2")], self.vehicles, "Car2")
+      assert [day.track for day in self.mngr.get_filtered_track_days()] == ["Track5"]
+      self.mngr.active_vehicle = None
+      assert self.mngr.get_filtered_track_days() is self.mngr.track_days
 
    def test_has_track_days(self):
       assert self.mngr.has_track_days() is True
@@ -56,22 +76,36 @@ class TestTrackSessionMngr:
       assert self.mngr.has_track_days() is False
 
    def test_get_track_day(self):
-      assert self.mngr.get_track_day(0)["track"] == "Track1"
-      assert self.mngr.get_track_day(1) is None
+      assert self.mngr.get_track_day("day1").track == "Track1"
+      # Ids are not filtered by the active vehicle
+      assert self.mngr.get_track_day("day2").track == "Track2"
+      assert self.mngr.get_track_day("unknown") is None
+
+   def test_index_follows_track_days(self):
+      # Equal track days keep their own ids
+      copy = TrackDay.from_dict(dict(self.track_days[0].to_dict(), id="day3"))
+      self.mngr.track_days.append(copy)
+      assert self.mngr.get_track_day("day3") is copy
+      self.mngr.delete_track_day("day1")
+      assert self.mngr.get_track_day("day3") is copy and self.mngr.get_track_day("day1") is None
 
-   def test_get_track_day_index_in_original_list(self):
-      assert self.mngr.get_track_day_index_in_original_list(0) == 0
-      assert self.mngr.get_track_day_index_in_original_list(1) == -1
+      reloaded = [TrackDay(track="Track4", id="day4")]
+      self.mngr.track_days = reloaded
+      self.mngr.track_days_changed()
+      assert self.mngr.get_track_day("day4") is reloaded[0]
+      assert self.mngr.get_track_day("day3") is None
 
    def test_delete_track_day(self):
-      deleted = self.mngr.delete_track_day(0)
-      assert deleted["track"] == "Track1"
+      deleted = self.mngr.delete_track_day("day1")
+      assert deleted.track == "Track1"
       assert self.saved == self.mngr.track_days
-      assert self.mngr.delete_track_day(0) is None
+      assert self.mngr.delete_track_day("day1") is None
 
    def test_create_track_day(self):
       new_day = self.mngr.create_track_day("Track3", "2024-06-14", "Org3", "Car2")
       assert new_day in self.mngr.track_days
+      assert new_day == TrackDay(track="Track3", date="2024-06-14", organizer="Org3", vehicle="Car2", id=new_day.id)
+      assert self.mngr.get_track_day(new_day.id) is new_day
       assert self.saved == self.mngr.track_days
 
    def test_create_track_day_no_vehicle(self):
@@ -80,48 +114,123 @@ class TestTrackSessionMngr:
          self.mngr.create_track_day("Track4", "2024-06-15", "Org4", "No Vehicles Available")
 
    def test_get_sessions(self):
-      sessions = self.mngr.get_sessions(0)
+      sessions = self.mngr.get_sessions("day1")
       assert isinstance(sessions, list)
-      assert sessions[0]["session_number"] == "1"
-      assert self.mngr.get_sessions(1) == []
+      assert sessions[0].session_number == "1"
+      assert self.mngr.get_sessions("day2") == []
 
    def test_has_sessions(self):
-      assert self.mngr.has_sessions(0) is True
-      assert self.mngr.has_sessions(1) is False
+      assert self.mngr.has_sessions("day1") is True
+      assert self.mngr.has_sessions("day2") is False
 
    def test_get_session_numbers(self):
-      nums = self.mngr.get_session_numbers(0)
+      nums = self.mngr.get_session_numbers("day1")
       assert nums == ["1"]
-      assert self.mngr.get_session_numbers(1) == []
+      assert self.mngr.get_session_numbers("day2") == []
 
    def test_find_session_by_number(self):
-      session = self.mngr.find_session_by_number(0, "1")
-      assert session["laps"] == "10"
-      assert self.mngr.find_session_by_number(0, "2") is None
+      session = self.mngr.find_session_by_number("day1", "1")
+      assert session.laps == "10"
+      assert self.mngr.find_session_by_number("day1", "2") is None
+
+   def test_find_session(self):
+      assert self.mngr.find_session("day1", "session1").laps == "10"
+      assert self.mngr.find_session("day1", "unknown") is None
+      assert self.mngr.find_session("day2", "session1") is None
 
    def test_update_session(self):
-      updated = self.mngr.update_session(0, "1", {"laps": "12"})
+      updated = self.mngr.update_session("day1", "session1", {"laps": "12"})
       assert updated is True
-      assert self.mngr.get_sessions(0)[0]["laps"] == "12"
+      assert self.mngr.get_sessions("day1")[0].laps == "12"
       assert self.saved == self.mngr.track_days
 
    def test_update_session_not_found(self):
-      updated = self.mngr.update_session(0, "99", {"laps": "12"})
+      updated = self.mngr.update_session("day1", "unknown", {"laps": "12"})
       assert updated is False
 
    def test_add_session(self):
-      result = self.mngr.add_session(0, {"session_number": "2", "laps": "8", "vehicle": "Car1", "weather": "Rain"})
+      result = self.mngr.add_session("day1", Session(session_number="2", laps="8", vehicle="Car1", weather="Rain"))
       assert result is True
-      assert len(self.mngr.get_sessions(0)) == 2
+      assert len(self.mngr.get_sessions("day1")) == 2
       assert self.saved == self.mngr.track_days
 
-   def test_add_session_invalid_index(self):
-      result = self.mngr.add_session(99, {"session_number": "1"})
+   def test_add_session_unknown_id(self):
+      result = self.mngr.add_session("unknown", Session(session_number="1"))
       assert result is False
 
+   def test_add_sessions_bulk(self):
+      saves = []
+      self.mngr.save_callback = saves.append
+      sessions = [Session(session_number=str(number), laps="8", vehicle="Car1", weather="Rain") for number in (2, 3, 4)]
+      assert self.mngr.add_sessions_bulk("day1", sessions) is True
+      assert self.mngr.get_session_numbers("day1") == ["1", "2", "3", "4"]
+      assert len(saves) == 1
+      assert self.mngr.add_sessions_bulk("unknown", sessions) is False
+
+   def test_add_sessions_bulk_is_all_or_nothing(self):
+      sessions = [Session(session_number="2", laps="8", vehicle="Car1", weather="Rain"), Session(session_number="3")]
+      with pytest.raises(ValueError):
+         self.mngr.add_sessions_bulk("day1", sessions)
+      assert self.mngr.get_session_numbers("day1") == ["1"]
+      assert self.saved is None
+
+      def failing_save(track_days):
+         raise OSError("disk full")
+      self.mngr.save_callback = failing_save
+      with pytest.raises(OSError):
+         self.mngr.add_sessions_bulk("day1", sessions[:1])
+      assert self.mngr.get_session_numbers("day1") == ["1"]
+
+   def test_create_track_days_bulk(self):
+      saves = []
+      self.mngr.save_callback = saves.append
+      new_days = [
+         TrackDay(track="Track3", date="2024-07-01", vehicle="Car1",
+                  sessions=[Session(session_number="1", laps="5", vehicle="Car1", weather="Sunny")]),
+         TrackDay(track="Track4", date="2024-07-02", vehicle="Car2")
+      ]
+      assert self.mngr.create_track_days_bulk(new_days) == new_days
+      assert [day.track for day in self.mngr.get_filtered_track_days()] == ["Track1", "Track3"]
+      assert self.mngr.get_track_day(new_days[1].id) is new_days[1]
+      assert len(saves) == 1
+
+   def test_create_track_days_bulk_is_all_or_nothing(self):
+      valid_day = TrackDay(track="Track3", date="2024-07-01", vehicle="Car1")
+      for invalid_day in (
+         TrackDay(track="Track4", date="2024-07-02"),
+         TrackDay(track="Track4", date="2024-07-02", vehicle="Car1", sessions=[Session(session_number="1")]),
+         TrackDay(track="Track4", date="2024-07-02", vehicle="Car1", id="day1"),
+         valid_day
+      ):
+         with pytest.raises(ValueError):
+            self.mngr.create_track_days_bulk([valid_day, invalid_day])
+      assert [day.id for day in self.mngr.track_days] == ["day1", "day2"]
+      assert self.saved is None
+
+      def failing_save(track_days):
+         raise OSError("disk full")
+      self.mngr.save_callback = failing_save
+      with pytest.raises(OSError):
+         self.mngr.create_track_days_bulk([valid_day])
+      assert [day.id for day in self.mngr.track_days] == ["day1", "day2"]
+      assert self.mngr.get_track_day(valid_day.id) is None
+      assert [day.track for day in self.mngr.get_filtered_track_days()] == ["Track1"]
+
+   def test_apply_bulk(self):
+      new_day = TrackDay(track="Track3", date="2024-07-01", vehicle="Car1")
+      new_session = Session(session_number="2", laps="8", vehicle="Car1", weather="Rain")
+      with pytest.raises(ValueError):
+         self.mngr.apply_bulk([new_day], {"unknown": [new_session]})
+      assert len(self.mngr.track_days) == 2 and self.saved is None
+
+      self.mngr.apply_bulk([new_day], {"day1": [new_session]})
+      assert self.mngr.get_track_day(new_day.id) is new_day
+      assert self.mngr.get_session_numbers("day1") == ["1", "2"]
+      assert self.saved == self.mngr.track_days
+
    def test_get_next_session_number(self):
-      assert self.mngr.get_next_session_number(0) == "2"
-      assert self.mngr.get_next_session_number(1) == "1"
+      assert self.mngr.get_next_session_number("day1") == "2"
+      assert self.mngr.get_next_session_number("day2") == "1"
 
    def test_validate_session_data(self):
       valid, msg = self.mngr.validate_session_data({
@@ -135,8 +244,8 @@ class TestTrackSessionMngr:
       assert "Missing required field" in msg
 
    def test_get_track_day_vehicle(self):
-      assert self.mngr.get_track_day_vehicle(0) == "Car1"
-      assert self.mngr.get_track_day_vehicle(99) == "N/A"
+      assert self.mngr.get_track_day_vehicle("day1") == "Car1"
+      assert self.mngr.get_track_day_vehicle("unknown") == "N/A"
 
    def test_update_data_references(self):
       new_days = []
@@ -146,11 +255,45 @@ class TestTrackSessionMngr:
       assert self.mngr.vehicles == new_vehicles
       assert self.mngr.active_vehicle == "Car3"
 
+   def test_journal_callback_receives_mutation_records(self):
+      records = []
+      self.mngr.journal_callback = lambda record, track_days: records.append(record)
+      self.mngr.add_session("day2", Session(session_number="1", laps="8", vehicle="Car2", weather="Rain", id="session2"))
+      self.mngr.update_session("day2", "session2", {"laps": "9"})
+      self.mngr.create_track_day("Track3", "2024-06-14", "Org3", "Car1")
+      self.mngr.delete_track_day("day2")
+
+      assert [r["op"] for r in records] == ["add_session", "update_session", "create_track_day", "delete_track_day"]
+      # Journal records address track days by id
+      assert records[0]["track_day_id"] == "day2"
+      assert records[1] == {
+         "op": "update_session", "track_day_id": "day2", "session_id": "session2", "session_number": "1", "session": {"laps": "9"}
+      }
+      assert records[2]["track_day"].track == "Track3"
+      assert records[3] == {"op": "delete_track_day", "track_day_id": "day2"}
+      assert self.saved is None
+
+   def test_bulk_is_journaled_as_one_record(self):
+      records = []
+      self.mngr.journal_callback = lambda record, track_days: records.append(record)
+      new_day = TrackDay(track="Track3", date="2024-07-01", vehicle="Car1")
+      new_session = Session(session_number="2", laps="8", vehicle="Car1", weather="Rain")
+      self.mngr.apply_bulk([new_day], {"day1": [new_session]})
+      assert records == [{"op": "add_bulk", "track_days": [new_day], "sessions": {"day1": [new_session]}}]
+      assert self.saved is None
+
+      def failing_journal(record, track_days):
+         raise OSError("disk full")
+      self.mngr.journal_callback = failing_journal
+      with pytest.raises(OSError):
+         self.mngr.add_sessions_bulk("day2", [Session(session_number="1", laps="8", vehicle="Car2", weather="Rain")])
+      assert self.mngr.get_sessions("day2") == []
+
    def test_export_track_day_to_csv(self):
         with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmpfile:
             tmp_path = tmpfile.name
         try:
-            result = self.mngr.export_track_day_to_csv(0, tmp_path)
+            result = self.mngr.export_track_day_to_csv("day1", tmp_path)
             assert result is True
 
             # Check that the file exists and has expected content
@@ -159,18 +302,18 @@ class TestTrackSessionMngr:
                 reader = csv.DictReader(csvfile)
                 rows = list(reader)
                 # Should have as many rows as sessions in track day 0
-                assert len(rows) == len(self.track_days[0]["sessions"])
-                assert rows[0]["track"] == self.track_days[0]["track"]
-                assert rows[0]["session_number"] == self.track_days[0]["sessions"][0]["session_number"]
+                assert len(rows) == len(self.track_days[0].sessions)
+                assert rows[0]["track"] == self.track_days[0].track
+                assert rows[0]["session_number"] == self.track_days[0].sessions[0].session_number
         finally:
             os.remove(tmp_path)
 
-   def test_export_track_day_to_csv_invalid_index(self):
+   def test_export_track_day_to_csv_unknown_id(self):
         with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmpfile:
             tmp_path = tmpfile.name
         try:
-            # Export with invalid index
-            result = self.mngr.export_track_day_to_csv(99, tmp_path)
+            # Export with unknown id
+            result = self.mngr.export_track_day_to_csv("unknown", tmp_path)
             assert result is False
             # File should be empty or not written
             with open(tmp_path, "r", encoding="utf-8") as f:
@@ -181,19 +324,11 @@ class TestTrackSessionMngr:
 
    def test_export_track_day_to_csv_no_sessions(self):
     # Add a track day with no sessions
-    self.mngr.track_days.append({
-        "track": "Track3",
-        "date": "2024-06-15",
-        "organizer": "Org3",
-        "vehicle": "Car3",
-        "sessions": []
-    })
-    self.mngr.active_vehicle = "Car3"  # Ensure filtering includes the new track day
-    idx = 0  # It's the only one for Car3
+    self.mngr.track_days.append(TrackDay(track="Track3", date="2024-06-15", organizer="Org3", vehicle="Car3", id="day3"))
     with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmpfile:
         tmp_path = tmpfile.name
     try:
-        result = self.mngr.export_track_day_to_csv(idx, tmp_path)
+        result = self.mngr.export_track_day_to_csv("day3", tmp_path)
         assert result is True
         with open(tmp_path, newline='', encoding='utf-8') as csvfile:
             reader = csv.DictReader(csvfile)
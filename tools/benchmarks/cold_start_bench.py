@@ -0,0 +1,136 @@
+#!/usr/bin/python3
+# This file is part of the Racing-Companion project.
+#
+# Description: Benchmark of loading the storage files at start-up, JSON versus binary snapshots.
+# License: TBD
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+REPO_DIR = os.path.realpath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, REPO_DIR)
+
+from rcfunc import binary_snapshot, data_utils  # noqa: E402
+from rcfunc.track_day_shards import TrackDayShards  # noqa: E402
+
+TRACKS = ["Mantorp Park", "Knutstorp", "Anderstorp", "Falkenberg", "Gelleråsen", "Kinnekulle"]
+WEATHER = ["Sunny", "Cloudy", "Overcast", "Light Rain", "Heavy Rain"]
+
+def generate_data(track_day_count, session_count, vehicle_count):
+   """Generate random vehicles, track days and maintenance entries, with ids like the stored ones."""
+   rng = random.Random(42)
+
+   def new_id():
+      # Like storage_schema.new_id(), but the same for every run
+      return uuid.UUID(int=rng.getrandbits(128), version=4).hex
+
+   vehicles = [f"Vehicle {i + 1}" for i in range(vehicle_count)]
+   vehicle_data = {v: {"type": "Motorcycle", "year": "2024", "misc": ""} for v in vehicles}
+   track_days = []
+   for i in range(track_day_count):
+      vehicle = rng.choice(vehicles)
+      track_days.append({
+         "id": new_id(),
+         "track": rng.choice(TRACKS),
+         "date": f"{2015 + i * 12 // track_day_count}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+         "organizer": "Benchmark Racing",
+         "vehicle": vehicle,
+         "sessions": [
+            {
+               "id": new_id(),
+               "session_number": str(s + 1),
+               "laps": str(rng.randint(3, 15)),
+               "vehicle": vehicle,
+               "weather": rng.choice(WEATHER),
+               "tire_type": "Slick",
+               "tire_status": "Used",
+               "best_lap_time": f"1:{rng.randint(30, 59)}.{rng.randint(0, 999):03d}",
+               "comments": "Generated by the cold start benchmark"
+            }
+            for s in range(session_count)
+         ]
+      })
+   maintenance_entries = [
+      {
+         "id": new_id(),
+         "title": f"Service {i}",
+         "vehicle": rng.choice(vehicles),
+         "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+         "duration": "1h",
+         "handbook_ref": "",
+         "description": "Generated by the cold start benchmark",
+         "tags": ["Minor"]
+      }
+      for i in range(track_day_count // 4)
+   ]
+   return vehicles, vehicle_data, track_days, maintenance_entries
+
+def best_time(function, repeat):
+   times = []
+   for _ in range(repeat):
+      start = time.perf_counter()
+      function()
+      times.append(time.perf_counter() - start)
+   return min(times)
+
+def main(argv=None):
+   parser = argparse.ArgumentParser(description="Racing Companion cold start benchmark")
+   parser.add_argument("--track-days", type=int, default=2000, help="Number of generated track days")
+   parser.add_argument("--sessions", type=int, default=8, help="Sessions per track day")
+   parser.add_argument("--vehicles", type=int, default=4, help="Number of generated vehicles")
+   parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement, the best one is reported")
+   args = parser.parse_args(argv)
+
+   vehicles, vehicle_data, track_days, maintenance_entries = generate_data(args.track_days, args.sessions, args.vehicles)
+   with tempfile.TemporaryDirectory(prefix="rc-bench-") as directory:
+      legacy_file = os.path.join(directory, "track_sessions.json")
+      vehicles_file = os.path.join(directory, "vehicles.json")
+      maintenance_file = os.path.join(directory, "maintenance_entries.json")
+      shards_dir = os.path.join(directory, "track_days")
+
+      # The single indented track day file used before sharding
+      with open(legacy_file, "w") as file:
+         json.dump(track_days, file, indent=4)
+      data_utils.write_json_atomic(track_days, legacy_file + ".copy")
+      data_utils.save_vehicles(vehicles, vehicle_data, filename=vehicles_file)
+      data_utils.save_maintenance_entries(maintenance_entries, filename=maintenance_file)
+      TrackDayShards(shards_dir, legacy_file).load()
+
+      def load_indented_json():
+         with open(legacy_file + ".migrated", "r") as file:
+            json.load(file)
+
+      def load_binary_copy():
+         binary_snapshot.load_binary(legacy_file + ".copy")
+
+      def start_up():
+         data_utils.load_vehicles(filename=vehicles_file)
+         data_utils.load_maintenance_entries(filename=maintenance_file)
+         TrackDayShards(shards_dir, legacy_file).load()
+
+      results = [
+         ("All track days, indented JSON", best_time(load_indented_json, args.repeat)),
+         ("All track days, binary snapshot", best_time(load_binary_copy, args.repeat)),
+      ]
+      binary_snapshot.ENABLED = False
+      results.append(("Start-up, JSON only", best_time(start_up, args.repeat)))
+      binary_snapshot.ENABLED = True
+      results.append(("Start-up, binary snapshots", best_time(start_up, args.repeat)))
+
+      size = os.path.getsize(legacy_file + ".migrated")
+      binary_size = os.path.getsize(binary_snapshot.binary_file_for(legacy_file + ".copy"))
+
+   print(f"{args.track_days} track days, {args.sessions} sessions each, {args.vehicles} vehicles")
+   print(f"Track day file: {size / 1024:.0f} KiB as indented JSON, {binary_size / 1024:.0f} KiB as binary snapshot")
+   for name, seconds in results:
+      print(f"{name:<34} {seconds * 1000:8.2f} ms")
+   return 0
+
+if __name__ == "__main__":
+   raise SystemExit(main())
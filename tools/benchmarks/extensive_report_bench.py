@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+# This file is part of the Racing-Companion project.
+#
+# Description: Benchmark of the personal best lookups of the extensive report, scanning all track days versus the track lap index.
+# License: TBD
+
+import argparse
+import os
+import sys
+import time
+
+REPO_DIR = os.path.realpath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, REPO_DIR)
+
+from cold_start_bench import generate_data  # noqa: E402
+from rcfunc.track_day_models import TrackDay  # noqa: E402
+from rcfunc.track_day_report_mngr import TrackDayReportMngr  # noqa: E402
+
+def scan_personal_bests(track_days):
+   """Personal best of the track of every track day, scanning all track days for each like the report did before the index."""
+   bests = []
+   for day in track_days:
+      all_laps = []
+      for d in track_days:
+         if d.track == day.track:
+            for s in d.sessions:
+               if s.best_lap_time:
+                  all_laps.append((TrackDayReportMngr._lap_ms(s), s.best_lap_time, d.date, s.session_number))
+      bests.append(min(all_laps, key=lambda x: x[0])[0] if all_laps else None)
+   return bests
+
+def index_personal_bests(track_days):
+   """Personal best of the track of every track day, looked up in the track lap index."""
+   mngr = TrackDayReportMngr(track_days, [])
+   index = mngr.track_lap_index()
+   return [index[day.track][0][0] if day.track in index else None for day in track_days]
+
+def best_of(function, repeat):
+   """Get the result of function() and the best time of repeat runs, in seconds."""
+   times = []
+   for _ in range(repeat):
+      start = time.perf_counter()
+      result = function()
+      times.append(time.perf_counter() - start)
+   return result, min(times)
+
+def main(argv=None):
+   parser = argparse.ArgumentParser(description="Racing Companion extensive report benchmark")
+   parser.add_argument("--track-days", type=int, nargs="+", default=[1000, 2500, 5000], help="Numbers of generated track days")
+   parser.add_argument("--sessions", type=int, default=5, help="Sessions per track day")
+   parser.add_argument("--vehicles", type=int, default=4, help="Number of generated vehicles")
+   parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement, the best is reported")
+   args = parser.parse_args(argv)
+
+   print(f"{'Track days':>10} {'Scan':>10} {'Index':>10} {'Report':>10}")
+   for count in args.track_days:
+      _, vehicles, track_days, _ = generate_data(count, args.sessions, args.vehicles)
+      track_days = [TrackDay.from_dict(day) for day in track_days]
+      scanned, scan_seconds = best_of(lambda: scan_personal_bests(track_days), args.repeat)
+      indexed, index_seconds = best_of(lambda: index_personal_bests(track_days), args.repeat)
+      if scanned != indexed:
+         print("Error: the scan and the index found different personal bests")
+         return 1
+      # The complete extensive report, with a new manager so the cube is built in every run
+      _, report_seconds = best_of(lambda: TrackDayReportMngr(track_days, list(vehicles)).generate_report("extensive"), args.repeat)
+      print(f"{count:>10} {scan_seconds * 1000:8.1f}ms {index_seconds * 1000:8.1f}ms {report_seconds * 1000:8.1f}ms")
+   return 0
+
+if __name__ == "__main__":
+   raise SystemExit(main())
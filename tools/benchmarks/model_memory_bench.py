@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+# This file is part of the Racing-Companion project.
+#
+# Description: Benchmark of the memory held by track days as dictionaries versus TrackDay and Session models.
+# License: TBD
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+REPO_DIR = os.path.realpath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, REPO_DIR)
+
+from cold_start_bench import generate_data  # noqa: E402
+from rcfunc.track_day_models import TrackDay  # noqa: E402
+
+def measure(build):
+   """Get the bytes still allocated after build() and the seconds it took."""
+   gc.collect()
+   tracemalloc.start()
+   start = time.perf_counter()
+   result = build()
+   seconds = time.perf_counter() - start
+   gc.collect()
+   size, _ = tracemalloc.get_traced_memory()
+   tracemalloc.stop()
+   del result
+   return size, seconds
+
+def main(argv=None):
+   parser = argparse.ArgumentParser(description="Racing Companion track day model memory benchmark")
+   parser.add_argument("--track-days", type=int, default=12500, help="Number of generated track days")
+   parser.add_argument("--sessions", type=int, default=8, help="Sessions per track day")
+   parser.add_argument("--vehicles", type=int, default=4, help="Number of generated vehicles")
+   args = parser.parse_args(argv)
+
+   _, _, track_days, _ = generate_data(args.track_days, args.sessions, args.vehicles)
+   # Both representations are built from the stored JSON, like they are when loading
+   text = json.dumps(track_days)
+   del track_days
+
+   results = [
+      ("Dictionaries", measure(lambda: json.loads(text))),
+      ("TrackDay/Session models", measure(lambda: [TrackDay.from_dict(day) for day in json.loads(text)])),
+   ]
+
+   print(f"{args.track_days} track days, {args.sessions} sessions each ({args.track_days * args.sessions} sessions)")
+   baseline = results[0][1][0]
+   for name, (size, seconds) in results:
+      print(f"{name:<26} {size / 2**20:8.1f} MiB ({size / baseline:4.0%})  {seconds * 1000:8.1f} ms")
+   return 0
+
+if __name__ == "__main__":
+   raise SystemExit(main())